@@ -0,0 +1,292 @@
+"""
+Asyncio fetch engine shared by the category scrapers.
+
+Category pages are fetched concurrently while keeping the original scrape semantics:
+pages are still *processed* strictly in pagination order, so the first-seen-wins
+dedupe by ``product_url`` and the resulting item order are unchanged.
+
+The engine drives a regular ``requests.Session`` from a thread pool, so it needs no
+dependencies beyond the ones the scrapers already use.
+
+Usage:
+    pages = crawl_pages(
+        start_url,
+        handle_page,             # (FetchResult) -> next page URL or None
+        max_pages=10,
+        page_url_for=woocommerce_page_url,
+        concurrency=4,
+        delay=0.5,
+    )
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from http_cache import HttpCache
+from rate_limit import DomainRateLimiter, RateLimitedAdapter
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 15
+DEFAULT_CONCURRENCY = 4
+
+PageUrlBuilder = Callable[[str, int], str]
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a single page fetch."""
+
+    url: str
+    status: Optional[int] = None
+    text: str = ""
+    error: Optional[str] = None
+    # True when the server answered 304 and ``text`` came from the HTTP cache.
+    not_modified: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Handlers may be coroutines (e.g. to wait on a bounded queue); they are awaited in page order.
+PageHandler = Callable[[FetchResult], Union[Optional[str], Awaitable[Optional[str]]]]
+
+
+class HostLimiter:
+    """Per-host concurrency cap plus a minimum interval between request starts."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, delay: float = 0.0):
+        self.concurrency = max(1, concurrency)
+        self.delay = max(0.0, delay)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_start: Dict[str, float] = {}
+
+    def semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[host]
+
+    async def wait_turn(self, host: str) -> None:
+        """Sleep until ``delay`` seconds have passed since the previous request to ``host``."""
+
+        if self.delay <= 0:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            wait = self._last_start.get(host, 0.0) + self.delay - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = time.monotonic()
+
+
+class AsyncFetcher:
+    """Fetch URLs concurrently through a pooled ``requests.Session``."""
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        delay: float = 0.0,
+        timeout: float = REQUEST_TIMEOUT,
+        session: Optional[requests.Session] = None,
+        cache: Optional[HttpCache] = None,
+        rate_limiter: Optional[DomainRateLimiter] = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = HostLimiter(concurrency=concurrency, delay=delay)
+        self._own_session = session is None
+        self.session = session or requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        if self._own_session:
+            # Throttling answers (429/503) slow the host down and are retried instead of ending the crawl.
+            adapter = RateLimitedAdapter(
+                rate_limiter or DomainRateLimiter(), pool_connections=4, pool_maxsize=self.limiter.concurrency
+            )
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.limiter.concurrency)
+
+    def _get(self, url: str) -> FetchResult:
+        conditional = self.cache.conditional_headers(url) if self.cache else {}
+        try:
+            resp = self.session.get(url, timeout=self.timeout, headers=conditional or None)
+            if resp.status_code == 304 and self.cache is not None:
+                body = self.cache.load_body(url)
+                if body is not None:
+                    return FetchResult(url=url, status=304, text=body, not_modified=True)
+                resp = self.session.get(url, timeout=self.timeout)
+            resp.raise_for_status()
+        except requests.RequestException as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            return FetchResult(url=url, status=status, error=str(exc))
+
+        if self.cache is not None:
+            self.cache.store(url, resp.text, resp.headers)
+        return FetchResult(url=url, status=resp.status_code, text=resp.text)
+
+    async def fetch(self, url: str) -> FetchResult:
+        host = urlsplit(url).netloc
+        async with self.limiter.semaphore(host):
+            await self.limiter.wait_turn(host)
+            logger.info("Fetching page: %s", url)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._get, url)
+
+    async def fetch_many(self, urls: List[str]) -> List[FetchResult]:
+        """Fetch all ``urls`` concurrently; results keep the input order."""
+
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._own_session:
+            self.session.close()
+
+
+def woocommerce_page_url(first_page_url: str, page: int) -> str:
+    """Build WooCommerce-style pagination URLs (``.../page/N/?query``)."""
+
+    parts = urlsplit(first_page_url)
+    path = re.sub(r"/page/\d+/?$", "/", parts.path)
+    if not path.endswith("/"):
+        path += "/"
+    if page > 1:
+        path = f"{path}page/{page}/"
+    return urlunsplit((parts.scheme, parts.netloc, path, parts.query, parts.fragment))
+
+
+def query_page_url(param: str) -> PageUrlBuilder:
+    """Return a builder that paginates through a query parameter (e.g. ``?pageno=N``)."""
+
+    def build(first_page_url: str, page: int) -> str:
+        parts = urlsplit(first_page_url)
+        query_params = dict((k, v[0]) for k, v in parse_qs(parts.query).items())
+        if page > 1:
+            query_params[param] = str(page)
+        else:
+            query_params.pop(param, None)
+        new_query = urlencode(query_params, doseq=True)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, new_query, parts.fragment))
+
+    return build
+
+
+async def crawl(
+    fetcher: AsyncFetcher,
+    start_url: str,
+    handle_page: PageHandler,
+    max_pages: int,
+    page_url_for: Optional[PageUrlBuilder],
+    resume_url: Optional[str] = None,
+    pages_done: int = 0,
+    prefetch: bool = True,
+) -> int:
+    """Coroutine behind ``crawl_pages`` for callers that already run an event loop.
+
+    To continue an interrupted crawl, pass the page to fetch next as ``resume_url``
+    and the number of pages already handled as ``pages_done``; page URLs are still
+    predicted from ``start_url`` and ``max_pages`` counts the earlier pages too.
+    """
+
+    page_num = pages_done + 1
+    next_url: Optional[str] = resume_url or start_url
+    predictable = prefetch and page_url_for is not None
+    # Pages fetched per round. It starts at one and grows with every page that links
+    # to a next one, so a crawl that stops early has not fetched pages ahead of it.
+    ahead = 1
+
+    while next_url and pages_done < max_pages:
+        window = [next_url]
+        if predictable:
+            remaining = max_pages - pages_done
+            for offset in range(1, min(ahead, remaining)):
+                window.append(page_url_for(start_url, page_num + offset))  # type: ignore[misc]
+
+        results = await fetcher.fetch_many(window)
+
+        for index, result in enumerate(results):
+            if not result.ok:
+                logger.error("Failed to fetch %s: %s", result.url, result.error)
+                return pages_done
+
+            found_next = handle_page(result)
+            if inspect.isawaitable(found_next):
+                found_next = await found_next
+            pages_done += 1
+            page_num += 1
+
+            if pages_done >= max_pages:
+                logger.info("Reached max page limit (%d); stopping pagination", max_pages)
+                return pages_done
+            if not found_next:
+                return pages_done
+
+            next_url = found_next
+            ahead = min(fetcher.limiter.concurrency, ahead + 1)
+            if index + 1 < len(window) and found_next != window[index + 1]:
+                # The site links somewhere we did not predict; follow its links one by one.
+                logger.info("Pagination link %s differs from predicted URL; following links sequentially", found_next)
+                predictable = False
+                break
+
+    return pages_done
+
+
+def crawl_pages(
+    start_url: str,
+    handle_page: PageHandler,
+    max_pages: int,
+    page_url_for: Optional[PageUrlBuilder] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    delay: float = 0.0,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = REQUEST_TIMEOUT,
+    cache: Optional[HttpCache] = None,
+    session: Optional[requests.Session] = None,
+    rate_limiter: Optional[DomainRateLimiter] = None,
+    prefetch: bool = True,
+) -> int:
+    """Crawl paginated category pages, prefetching up to ``concurrency`` pages ahead.
+
+    ``handle_page`` is called once per page in pagination order with the page's
+    ``FetchResult`` and returns the next page URL (or ``None`` to stop). With a
+    ``cache``, requests are revalidated and 304 answers are flagged ``not_modified``. When ``page_url_for`` is given, upcoming pages are
+    predicted and fetched concurrently; otherwise links are followed one at a time.
+    The prefetch window opens one page per confirmed next link; pass ``prefetch=False``
+    when ``handle_page`` is likely to stop the crawl early (e.g. incremental runs).
+    Pass ``session`` to reuse a caller's connection pool (it is left open), or
+    ``rate_limiter`` to replace the default per-host limits of a new one.
+    Returns the number of pages processed.
+    """
+
+    async def run() -> int:
+        fetcher = AsyncFetcher(
+            headers=headers,
+            concurrency=concurrency,
+            delay=delay,
+            timeout=timeout,
+            session=session,
+            cache=cache,
+            rate_limiter=rate_limiter,
+        )
+        try:
+            return await crawl(fetcher, start_url, handle_page, max_pages, page_url_for, prefetch=prefetch)
+        finally:
+            fetcher.close()
+
+    return asyncio.run(run())
@@ -27,7 +27,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from keyword_manager import KeywordManager
-from generate_seo_blog import SEOBlogGenerator, WordPressPublisher
+from generate_seo_blog import REQUEST_TIMEOUT, SEOBlogGenerator, WordPressPublisher
+from wp_client import WordPressClient
 
 # Configure logging
 LOG_DIR = Path(__file__).parent / "logs"
@@ -140,7 +141,9 @@ def main():
         
         # Generate blog post
         logger.info("Generating blog post with AI...")
-        generator = SEOBlogGenerator(api_key)
+        # One pooled client for the ranking lookup and the publish call
+        wp_client = WordPressClient(WP_BASE_URL, timeout=REQUEST_TIMEOUT)
+        generator = SEOBlogGenerator(api_key, wp_client=wp_client)
         post_data = generator.generate_blog_post(keyword)
         
         logger.info("Blog post generated successfully:")
@@ -158,8 +161,9 @@ def main():
             logger.info(f"  Status: {args.status}")
         else:
             logger.info("Publishing to WordPress...")
-            publisher = WordPressPublisher(WP_BASE_URL)
+            publisher = WordPressPublisher(WP_BASE_URL, client=wp_client)
             result = publisher.publish_post(post_data, args.status)
+            wp_client.log_timings()
             
             logger.info("Post published successfully:")
             logger.info(f"  Post ID: {result.get('post_id', 'N/A')}")
@@ -0,0 +1,12 @@
+"""
+Offline replay benchmarks for the shop scrapers.
+
+``fixtures/`` holds list pages (and kuma-doll detail pages) for every shop, served
+by a local HTTP server (server.py) so the scrapers can be measured without touching
+the live shops. ``run.py`` times each shop's ``scrape_items`` and ``parse_item``
+against them and writes the results as JSON:
+
+    python -m benchmarks.run                       # all shops, results/<timestamp>.json
+    python -m benchmarks.run --shops yourdoll --repeat 5 --compare benchmarks/results/old.json
+    python -m benchmarks.fixtures record           # refresh fixtures from the live shops
+"""
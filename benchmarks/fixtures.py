@@ -0,0 +1,331 @@
+"""
+HTML fixtures replayed by the benchmarks.
+
+Every shop is served under ``/<shop>`` on the local fixture server, keeping the
+live path and query: ``https://sweet-doll.com/product-category/sedoll/page/2/`` is
+replayed as ``/sweet-doll/product-category/sedoll/page/2/``. ``manifest.json`` maps
+those routes (and route prefixes, e.g. all kuma-doll detail pages) to files.
+
+    python -m benchmarks.fixtures synthesize       # regenerate the bundled pages
+    python -m benchmarks.fixtures record --pages 3 # replace them with live pages
+
+The bundled pages are synthesized from each shop's markup (same selectors, lazy-load
+attributes and page chrome as the live themes), so they work offline and stay
+deterministic. ``record`` downloads the real pages instead (kuma-doll through
+Playwright) and rewrites their links to the local routes.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from site_adapters import ADAPTERS, RENDER_PLAYWRIGHT, SiteAdapter
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+MANIFEST_NAME = "manifest.json"
+PAGES_DEFAULT = 3
+ITEMS_PER_PAGE = 24
+DETAIL_PAGES_DEFAULT = 8
+SEED = 20240601
+
+NAMES = ["Aoi", "Hana", "Yui", "Rin", "Mio", "Saki", "Emi", "Nana", "Rina", "Miku", "Sora", "Kana"]
+BODIES = ["158cm Eカップ", "163cm Fカップ", "148cm Cカップ", "165cm Gカップ", "155cm Dカップ"]
+MATERIALS = ["TPE", "シリコン", "TPE+シリコンヘッド"]
+
+
+def local_route(shop: str, live_url: str) -> str:
+    """Route under which the fixture server replays ``live_url`` of ``shop``."""
+
+    parts = urlsplit(live_url)
+    return f"/{shop}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+
+def local_url(base_url: str, shop: str, live_url: str) -> str:
+    return base_url.rstrip("/") + local_route(shop, live_url)
+
+
+def load_manifest(directory: Path = FIXTURE_DIR) -> Dict[str, object]:
+    with open(directory / MANIFEST_NAME, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _save_manifest(manifest: Dict[str, object], directory: Path) -> None:
+    with open(directory / MANIFEST_NAME, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def _chrome(title: str, body: str, rng: random.Random) -> str:
+    """Wrap ``body`` in the header / footer noise a real shop page carries."""
+
+    nav = "".join(
+        f'<li class="menu-item menu-item-{n}"><a href="/category/{n}/">カテゴリー {n}</a></li>' for n in range(40)
+    )
+    scripts = "".join(
+        f'<script type="text/javascript" id="wp-script-{n}">'
+        f'var cfg{n} = {{"ajax":"/wp-admin/admin-ajax.php","nonce":"{rng.getrandbits(40):x}"}};</script>'
+        for n in range(12)
+    )
+    footer = "".join(f'<p class="footer-note">お知らせ {n}: 送料無料キャンペーン実施中</p>' for n in range(20))
+    return (
+        "<!DOCTYPE html>\n<html lang=\"ja\"><head><meta charset=\"utf-8\">"
+        f"<title>{title}</title><link rel=\"stylesheet\" href=\"/wp-content/themes/style.css\">{scripts}</head>"
+        f"<body><header class=\"site-header\"><nav><ul class=\"menu\">{nav}</ul></nav></header>"
+        f"<main class=\"site-content\">{body}</main>"
+        f"<footer class=\"site-footer\">{footer}</footer></body></html>\n"
+    )
+
+
+def _product(rng: random.Random, number: int) -> Dict[str, object]:
+    return {
+        "id": 1000 + number,
+        "title": f"{rng.choice(NAMES)} {rng.choice(BODIES)} {rng.choice(MATERIALS)} No.{1000 + number}",
+        "price": rng.randrange(98_000, 420_000, 50),
+    }
+
+
+def _woocommerce_item(shop: str, product: Dict[str, object]) -> str:
+    pid = product["id"]
+    href = f"/{shop}/product/doll-{pid}/"
+    image = f"/{shop}/wp-content/uploads/2024/05/doll-{pid}"
+    return (
+        f'<div class="product-grid-item product wd-hover-quick type-product post-{pid} status-publish instock">'
+        '<div class="product-wrapper"><div class="product-element-top wd-quick-shop">'
+        f'<a href="{href}" class="product-image-link">'
+        f'<img width="600" height="900" src="data:image/svg+xml,%3Csvg%3E%3C/svg%3E" '
+        f'data-lazy-src="{image}-600x900.jpg" '
+        f'data-lazy-srcset="{image}-300x450.jpg 300w, {image}-600x900.jpg 600w, {image}-1000x1500.jpg 1000w" '
+        'class="attachment-woocommerce_thumbnail size-woocommerce_thumbnail" alt="">'
+        f'<noscript><img src="{image}-600x900.jpg" alt=""></noscript></a>'
+        '<div class="wrapp-swatches"></div></div>'
+        '<div class="product-element-bottom">'
+        f'<h3 class="wd-entities-title"><a href="{href}">{product["title"]}</a></h3>'
+        '<div class="wd-product-cats"><a href="/product-category/tpe/" rel="tag">TPE</a></div>'
+        '<span class="price"><span class="woocommerce-Price-amount amount"><bdi>'
+        f'{product["price"]:,}<span class="woocommerce-Price-currencySymbol">円</span></bdi></span></span>'
+        "</div></div></div>"
+    )
+
+
+def _happiness_item(shop: str, product: Dict[str, object]) -> str:
+    pid = product["id"]
+    return (
+        '<li class="ec-shelfGrid__item">'
+        f'<a href="/{shop}/products/detail/{pid}">'
+        '<p class="ec-shelfGrid__item-image">'
+        f'<img src="/{shop}/html/upload/save_image/{pid}_main.jpg" alt="" loading="lazy"></p>'
+        f'<p class="ec-shelfGrid__item-title">{product["title"]}</p></a>'
+        f'<p class="price02">¥{product["price"]:,}<span class="tax">税込</span></p>'
+        '<div class="ec-productRole__btn"><button class="add-cart">カートに入れる</button></div>'
+        "</li>"
+    )
+
+
+def _kuma_item(shop: str, product: Dict[str, object]) -> str:
+    pid = product["id"]
+    href = f"/{shop}/Products/detail-{pid}.html"
+    return (
+        '<div class="product-item col-6 col-md-3">'
+        f'<a class="image" href="{href}"><img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" '
+        f'data-src="/{shop}/upload/list/{pid}.jpg" '
+        f'data-srcset="/{shop}/upload/list/{pid}-400.jpg 400w, /{shop}/upload/list/{pid}-800.jpg 800w" alt=""></a>'
+        f'<a class="title" href="{href}">{product["title"]}</a>'
+        f'<div class="price"><span>¥{product["price"]:,}</span></div>'
+        "</div>"
+    )
+
+
+def _list_page(adapter: SiteAdapter, page: int, pages: int, rng: random.Random) -> str:
+    shop = adapter.name
+    products = [_product(rng, (page - 1) * ITEMS_PER_PAGE + n) for n in range(ITEMS_PER_PAGE)]
+    next_href = None
+    if page < pages and adapter.pagination is not None:
+        next_href = local_route(shop, adapter.pagination(adapter.default_url, page + 1))
+
+    if shop == "happiness-doll":
+        grid = '<ul class="ec-shelfGrid">' + "".join(_happiness_item(shop, p) for p in products) + "</ul>"
+        pager = f'<li class="ec-blockPagination__next"><a href="{next_href}">次へ</a></li>' if next_href else ""
+        body = f'<div class="ec-shelfRole">{grid}</div><ul class="ec-blockPagination">{pager}</ul>'
+    elif adapter.render == RENDER_PLAYWRIGHT:
+        grid = '<div class="product-list row">' + "".join(_kuma_item(shop, p) for p in products) + "</div>"
+        pager = f'<a class="next" href="{next_href}">Next</a>' if next_href else ""
+        body = f'{grid}<nav class="pagination">{pager}</nav>'
+    else:
+        grid = "".join(_woocommerce_item(shop, p) for p in products)
+        grid = f'<div class="products elements-grid wd-grid-g">{grid}</div>'
+        pager = f'<a class="next page-numbers" href="{next_href}">→</a>' if next_href else ""
+        body = f'{grid}<nav class="woocommerce-pagination">{pager}</nav>'
+    return _chrome(f"{shop} page {page}", body, rng)
+
+
+def _kuma_detail_page(shop: str, rng: random.Random) -> str:
+    image = f"/{shop}/upload/detail/main"
+    body = (
+        f'<img class="logo" src="/{shop}/images/logo.png" alt="">'
+        '<div class="product">'
+        f'<img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" data-src="{image}.jpg" '
+        f'data-srcset="{image}-800.jpg 800w, {image}-1600.jpg 1600w" width="1600" alt="">'
+        + "".join(f'<img src="{image}-{n}.jpg" alt="">' for n in range(6))
+        + "</div>"
+        + '<div class="description">' + "<p>商品説明テキスト。</p>" * 30 + "</div>"
+    )
+    return _chrome(f"{shop} detail", body, rng)
+
+
+def synthesize(directory: Path = FIXTURE_DIR, pages: int = PAGES_DEFAULT) -> Dict[str, object]:
+    """Write deterministic list (and kuma-doll detail) pages for every shop plus the manifest."""
+
+    manifest: Dict[str, object] = {"shops": {}, "routes": {}, "prefixes": {}}
+    for shop, adapter in ADAPTERS.items():
+        rng = random.Random(f"{SEED}-{shop}")
+        (directory / shop).mkdir(parents=True, exist_ok=True)
+        for page in range(1, pages + 1):
+            live = adapter.pagination(adapter.default_url, page) if adapter.pagination else adapter.default_url
+            name = f"{shop}/list-{page}.html"
+            (directory / name).write_text(_list_page(adapter, page, pages, rng), encoding="utf-8")
+            manifest["routes"][local_route(shop, live)] = name  # type: ignore[index]
+        if adapter.render == RENDER_PLAYWRIGHT:
+            name = f"{shop}/detail.html"
+            (directory / name).write_text(_kuma_detail_page(shop, rng), encoding="utf-8")
+            manifest["prefixes"][f"/{shop}/Products/detail-"] = name  # type: ignore[index]
+        manifest["shops"][shop] = {  # type: ignore[index]
+            "start": local_route(shop, adapter.default_url),
+            "pages": pages,
+            "source": "synthetic",
+        }
+    _save_manifest(manifest, directory)
+    return manifest
+
+
+def _rewrite_links(html: str, shop: str, live_url: str) -> str:
+    """Point absolute links to the shop's own host at the local ``/<shop>`` routes."""
+
+    host = re.escape(urlsplit(live_url).netloc)
+    return re.sub(rf"(?:https?:)?//{host}(?=[/\"'?#])", f"/{shop}", html)
+
+
+def _fetch_http(adapter: SiteAdapter, urls: List[str]) -> List[Optional[str]]:
+    import requests
+
+    headers = getattr(adapter.load(), "HEADERS", None)
+    pages: List[Optional[str]] = []
+    with requests.Session() as session:
+        for url in urls:
+            resp = session.get(url, headers=headers, timeout=30)
+            pages.append(resp.text if resp.ok else None)
+    return pages
+
+
+def _fetch_rendered(adapter: SiteAdapter, urls: List[str]) -> List[Optional[str]]:
+    from playwright.sync_api import sync_playwright
+
+    pages: List[Optional[str]] = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for url in urls:
+            resp = page.goto(url, wait_until="networkidle", timeout=60_000)
+            pages.append(page.content() if resp is not None and resp.ok else None)
+        browser.close()
+    return pages
+
+
+def _product_urls(adapter: SiteAdapter, page_url: str, html: str) -> List[str]:
+    items, _ = adapter.extract_page(page_url, html)
+    return [str(item["product_url"]) for item in items]
+
+
+def record(
+    shops: List[str],
+    directory: Path = FIXTURE_DIR,
+    pages: int = PAGES_DEFAULT,
+    detail_pages: int = DETAIL_PAGES_DEFAULT,
+) -> Dict[str, object]:
+    """Download the live list pages of ``shops`` (and kuma-doll detail pages) into the fixtures."""
+
+    manifest = load_manifest(directory)
+    for shop in shops:
+        adapter = ADAPTERS[shop]
+        fetch = _fetch_rendered if adapter.render == RENDER_PLAYWRIGHT else _fetch_http
+        urls = [adapter.default_url]
+        if adapter.pagination is not None:
+            urls = [adapter.pagination(adapter.default_url, page) for page in range(1, pages + 1)]
+        # Drop the shop's previous pages; other shops keep theirs.
+        own = f"/{shop}/"
+        routes = {route: name for route, name in manifest["routes"].items() if not route.startswith(own)}  # type: ignore[union-attr]
+        prefixes = {prefix: name for prefix, name in manifest["prefixes"].items() if not prefix.startswith(own)}  # type: ignore[union-attr]
+        (directory / shop).mkdir(parents=True, exist_ok=True)
+
+        recorded = 0
+        detail_urls: List[str] = []
+        for number, (url, html) in enumerate(zip(urls, fetch(adapter, urls)), start=1):
+            if html is None:
+                logger.warning("[%s] %s could not be fetched; recorded %d pages", shop, url, recorded)
+                break
+            name = f"{shop}/list-{number}.html"
+            (directory / name).write_text(_rewrite_links(html, shop, url), encoding="utf-8")
+            routes[local_route(shop, url)] = name
+            recorded += 1
+            if adapter.render == RENDER_PLAYWRIGHT:
+                detail_urls.extend(_product_urls(adapter, url, html))
+
+        detail_urls = detail_urls[:detail_pages]
+        for number, (url, html) in enumerate(zip(detail_urls, fetch(adapter, detail_urls) if detail_urls else []), start=1):
+            if html is None:
+                continue
+            name = f"{shop}/detail-{number}.html"
+            (directory / name).write_text(_rewrite_links(html, shop, url), encoding="utf-8")
+            routes[local_route(shop, url)] = name
+            # Detail pages that were not recorded are answered with the first recorded one.
+            prefixes.setdefault(local_route(shop, url).rsplit("/", 1)[0] + "/", name)
+
+        manifest["routes"], manifest["prefixes"] = routes, prefixes
+        manifest["shops"][shop] = {  # type: ignore[index]
+            "start": local_route(shop, adapter.default_url),
+            "pages": recorded,
+            "source": "recorded",
+        }
+        logger.info("[%s] Recorded %d list pages", shop, recorded)
+    _save_manifest(manifest, directory)
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Create or record the benchmark HTML fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    synth = sub.add_parser("synthesize", help="Regenerate the bundled synthetic pages for every shop")
+    synth.add_argument("--pages", type=int, default=PAGES_DEFAULT, help="List pages per shop (default: %(default)s)")
+    rec = sub.add_parser("record", help="Download the live shop pages into the fixtures")
+    rec.add_argument("--shops", default=",".join(ADAPTERS), help="Comma-separated shops (default: all)")
+    rec.add_argument("--pages", type=int, default=PAGES_DEFAULT, help="List pages per shop (default: %(default)s)")
+    rec.add_argument(
+        "--detail-pages",
+        type=int,
+        default=DETAIL_PAGES_DEFAULT,
+        help="Detail pages recorded for browser shops (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "synthesize":
+        synthesize(pages=args.pages)
+        return 0
+    shops = [shop.strip() for shop in args.shops.split(",") if shop.strip()]
+    unknown = [shop for shop in shops if shop not in ADAPTERS]
+    if unknown:
+        parser.error(f"--shops must be a comma-separated subset of: {', '.join(ADAPTERS)}")
+    record(shops, pages=args.pages, detail_pages=args.detail_pages)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Benchmark harness: replays the fixtures through every shop scraper.
+
+Each (shop, case) runs in a fresh interpreter so peak RSS and allocations belong to
+that case alone:
+
+    scrape_items  the shop's full ``scrape_items`` crawl against the fixture server
+                  (kuma-doll needs a Playwright browser; without one the case is skipped)
+    parse_item    ``parse_item`` over every product block of the shop's list pages
+
+Reported per case: pages/s, items/s, microseconds per item, peak RSS (and its growth
+over the interpreter after imports) and the tracemalloc peak / retained allocations of
+one extra, separately traced run. Timings are the median of ``--repeat`` runs.
+Politeness limits are lifted for the local server, so crawl numbers show the
+scraper's own cost rather than its rate limit. ``--parser`` picks the HTML parser
+backend, so a bs4 run can be compared against an lxml one.
+
+    python -m benchmarks.run --shops yourdoll,sweet-doll --repeat 5
+    python -m benchmarks.run --parser bs4 --output benchmarks/results/bs4.json
+    python -m benchmarks.run --parser lxml --compare benchmarks/results/bs4.json
+    python -m benchmarks.run --compare benchmarks/results/20240601T120000Z.json
+"""
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import logging
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import html_parser
+from benchmarks.fixtures import FIXTURE_DIR, load_manifest
+from benchmarks.server import FixtureServer
+from rate_limit import DomainRateLimiter
+from site_adapters import ADAPTERS, SiteAdapter
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+CASES = ("scrape_items", "parse_item")
+REPEAT_DEFAULT = 3
+# Effectively no rate limit against the local server.
+UNLIMITED_RATE = 1_000_000.0
+UNLIMITED_BURST = 1_000
+# Metrics compared by --compare, and whether a higher value is better.
+COMPARED_METRICS = {"pages_per_s": True, "items_per_s": True, "us_per_item": False, "peak_rss_kib": False}
+
+
+@dataclass
+class Case:
+    """A prepared benchmark: ``run`` returns the number of items it produced."""
+
+    run: Callable[[], int]
+    # Fixed work per run for parse cases; crawls count what the server served.
+    pages: Optional[int] = None
+    blocks: Optional[int] = None
+
+
+def _peak_rss_kib() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux but bytes on macOS.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _scrape_case(adapter: SiteAdapter, server: FixtureServer, pages: int, image_dir: str) -> Case:
+    module = adapter.load()
+    params = inspect.signature(module.scrape_items).parameters
+    kwargs: Dict[str, object] = {"max_pages": pages}
+    if "rate_limiter" in params:
+        kwargs["rate_limiter"] = DomainRateLimiter(rate=UNLIMITED_RATE, burst=UNLIMITED_BURST)
+    if "delay" in params:
+        kwargs["delay"] = 0.0
+    if "image_dir" in params:
+        kwargs["image_dir"] = image_dir
+    url = server.url_for(adapter.name)
+
+    def run() -> int:
+        return len(module.scrape_items(url, **kwargs))
+
+    return Case(run)
+
+
+def _parse_case(adapter: SiteAdapter, server: FixtureServer, pages: int) -> Case:
+    from bs4 import BeautifulSoup
+
+    module = adapter.load()
+    list_pages = sorted(
+        (str(name), route)
+        for route, name in server.manifest["routes"].items()  # type: ignore[union-attr]
+        if route.startswith(f"/{adapter.name}/") and "/list-" in str(name)
+    )[:pages]
+    blocks = []
+    for name, route in list_pages:
+        soup = BeautifulSoup((server.directory / str(name)).read_text(encoding="utf-8"), "lxml")
+        blocks.extend((str(node), server.base_url + route) for node in adapter.selectors.item.select(soup))
+
+    def run() -> int:
+        return sum(1 for html, base_url in blocks if module.parse_item(html, base_url))
+
+    return Case(run, pages=len(list_pages), blocks=len(blocks))
+
+
+def run_case(
+    shop: str, case: str, repeat: int, pages: Optional[int], directory: Path, parser: str = html_parser.DEFAULT_BACKEND
+) -> Dict[str, object]:
+    """Run one case in this process and return its metrics (called in the worker process)."""
+
+    # The scrapers log every product; keep that I/O out of the timings.
+    logging.disable(logging.INFO)
+    html_parser.set_backend(parser)
+    adapter = ADAPTERS[shop]
+    adapter.load()
+    result: Dict[str, object] = {"shop": shop, "case": case, "parser": parser}
+    baseline_rss = _peak_rss_kib()
+
+    with FixtureServer(directory) as server, tempfile.TemporaryDirectory(prefix="bench-images-") as image_dir:
+        pages = pages or int(server.manifest["shops"][shop]["pages"])  # type: ignore[index]
+        if case == "scrape_items":
+            bench = _scrape_case(adapter, server, pages, image_dir)
+        else:
+            bench = _parse_case(adapter, server, pages)
+
+        timings: List[float] = []
+        items = served = 0
+        for _ in range(max(1, repeat)):
+            server.reset_counts()
+            started = time.perf_counter()
+            try:
+                items = bench.run()
+            except Exception as exc:  # noqa: BLE001
+                # e.g. kuma-doll without an installed Playwright browser.
+                result["error"] = f"{type(exc).__name__}: {exc}".splitlines()[0]
+                return result
+            timings.append(time.perf_counter() - started)
+            served = server.pages_served if bench.pages is None else bench.pages
+
+        tracemalloc.start()
+        bench.run()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    count = bench.blocks if bench.blocks is not None else items
+    result.update(
+        {
+            "repeat": len(timings),
+            "seconds": round(seconds, 6),
+            "seconds_min": round(min(timings), 6),
+            "pages": served,
+            "items": items,
+            "pages_per_s": round(served / seconds, 2) if seconds else None,
+            "items_per_s": round(items / seconds, 2) if seconds else None,
+            "us_per_item": round(seconds / count * 1e6, 2) if count else None,
+            "peak_rss_kib": _peak_rss_kib(),
+            "rss_growth_kib": _peak_rss_kib() - baseline_rss,
+            "alloc_peak_kib": peak // 1024,
+            "alloc_retained_kib": current // 1024,
+        }
+    )
+    return result
+
+
+def _run_worker(shop: str, case: str, args: argparse.Namespace) -> Dict[str, object]:
+    command = [sys.executable, "-m", "benchmarks.run", "--worker", shop, case, "--repeat", str(args.repeat)]
+    command += ["--fixtures", str(args.fixtures), "--parser", args.parser]
+    if args.pages:
+        command += ["--pages", str(args.pages)]
+    proc = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode or not lines:
+        tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"shop": shop, "case": case, "error": f"worker exited with {proc.returncode}: {tail}"}
+    return json.loads(lines[-1])
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def compare(results: List[Dict[str, object]], baseline: Dict[str, object]) -> None:
+    """Log the change of each compared metric against a previous results file."""
+
+    previous = {(r["shop"], r["case"]): r for r in baseline.get("results", [])}  # type: ignore[union-attr]
+    for result in results:
+        old = previous.get((result["shop"], result["case"]))
+        if not old or "error" in result or "error" in old:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100  # type: ignore[operator]
+            better = change >= 0 if higher_is_better else change <= 0
+            changes.append(f"{metric} {change:+.1f}%{'' if better else ' (worse)'}")
+        logger.info("%s %s vs %s: %s", result["shop"], result["case"], baseline["meta"]["commit"], ", ".join(changes))  # type: ignore[index]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Offline replay benchmarks for the shop scrapers")
+    parser.add_argument("--shops", default=",".join(ADAPTERS), help="Comma-separated shops (default: all)")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT_DEFAULT, help="Timed runs per case (default: %(default)s)")
+    parser.add_argument("--pages", type=int, default=None, help="List pages crawled per shop (default: all fixtures)")
+    parser.add_argument("--fixtures", default=str(FIXTURE_DIR), help="Fixture directory (default: %(default)s)")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<UTC time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument(
+        "--parser",
+        choices=html_parser.BACKEND_CHOICES,
+        default=html_parser.DEFAULT_BACKEND,
+        help="HTML parser backend used by the scrapers (default: %(default)s)",
+    )
+    parser.add_argument("--worker", nargs=2, metavar=("SHOP", "CASE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        shop, case = args.worker
+        print(json.dumps(run_case(shop, case, args.repeat, args.pages, Path(args.fixtures), args.parser)))
+        return 0
+
+    shops = [shop.strip() for shop in args.shops.split(",") if shop.strip()]
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    if any(shop not in ADAPTERS for shop in shops) or any(case not in CASES for case in cases):
+        parser.error(f"--shops must be a subset of {', '.join(ADAPTERS)}; --cases of {', '.join(CASES)}")
+
+    results = []
+    for shop in shops:
+        for case in cases:
+            result = _run_worker(shop, case, args)
+            results.append(result)
+            if "error" in result:
+                logger.warning("%s %s skipped: %s", shop, case, result["error"])
+                continue
+            logger.info(
+                "%s %s: %.1f pages/s, %.1f items/s, %.1f us/item, peak RSS %d KiB, alloc peak %d KiB",
+                shop,
+                case,
+                result["pages_per_s"] or 0,
+                result["items_per_s"] or 0,
+                result["us_per_item"] or 0,
+                result["peak_rss_kib"],
+                result["alloc_peak_kib"],
+            )
+
+    now = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "created_at": now.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "parser": args.parser,
+            "fixtures": load_manifest(Path(args.fixtures))["shops"],
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
+        handle.write("\n")
+    logger.info("Wrote %s", output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            compare(results, json.load(handle))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Local HTTP server that replays the benchmark fixtures.
+
+Requests are answered from ``manifest.json``: an exact route (path and query) first,
+then the longest matching route prefix. Any other image path gets a small placeholder
+image so detail-image downloads succeed; everything else is a 404. The server counts
+the pages it served so the harness can report pages per second.
+
+Usage:
+    with FixtureServer() as server:
+        scrape_items(server.url_for("yourdoll"), max_pages=3)
+        print(server.pages_served)
+"""
+from __future__ import annotations
+
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from benchmarks.fixtures import FIXTURE_DIR, load_manifest
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+# 1x1 transparent GIF.
+PLACEHOLDER_IMAGE = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+
+class FixtureServer:
+    """Serve the fixtures on ``127.0.0.1`` from a background thread."""
+
+    def __init__(self, directory: Path = FIXTURE_DIR, port: int = 0):
+        self.directory = Path(directory)
+        self.manifest = load_manifest(self.directory)
+        self.pages_served = 0
+        self.images_served = 0
+        self._bodies: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, shop: str) -> str:
+        """Local start URL of ``shop``'s first list page."""
+
+        return self.base_url + str(self.manifest["shops"][shop]["start"])  # type: ignore[index]
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.pages_served = 0
+            self.images_served = 0
+
+    def _body(self, name: str) -> bytes:
+        # Fixture files are read once, so disk reads do not show up in the timings.
+        body = self._bodies.get(name)
+        if body is None:
+            body = (self.directory / name).read_bytes()
+            self._bodies[name] = body
+        return body
+
+    def resolve(self, route: str) -> Optional[Tuple[bytes, str]]:
+        """Return ``(body, content type)`` for a request path, or ``None`` for a 404."""
+
+        name = self.manifest["routes"].get(route)  # type: ignore[union-attr]
+        if name is None:
+            path = route.split("?", 1)[0]
+            prefixes = [prefix for prefix in self.manifest["prefixes"] if path.startswith(prefix)]  # type: ignore[union-attr]
+            if prefixes and not path.lower().endswith(IMAGE_SUFFIXES):
+                name = self.manifest["prefixes"][max(prefixes, key=len)]  # type: ignore[index]
+        if name is not None:
+            with self._lock:
+                self.pages_served += 1
+            return self._body(str(name)), "text/html; charset=utf-8"
+        if route.split("?", 1)[0].lower().endswith(IMAGE_SUFFIXES):
+            with self._lock:
+                self.images_served += 1
+            return PLACEHOLDER_IMAGE, "image/gif"
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                found = server.resolve(self.path)
+                if found is None:
+                    self.send_error(404)
+                    return
+                body, content_type = found
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:  # noqa: A002
+                pass
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,192 @@
+"""
+Resumable scrape state kept in a small JSON file per shop.
+
+A scraper records how far it got (pages done and the next page URL), the products
+it has parsed but not posted yet, and the WordPress IDs of the products it has
+posted. When a run dies halfway, ``--resume`` continues from the saved page and
+posts the saved products first instead of crawling everything again.
+
+The file is rewritten atomically after every page and every posted batch, and
+removed once a run finishes cleanly. A page that could not be fetched leaves the
+file in place, so the next ``--resume`` run retries that page.
+
+Usage:
+    state = open_checkpoint(default_checkpoint_path("yourdoll"), "yourdoll", url, resume=True)
+    for item in state.pending_items():
+        ...
+    state.page_done(next_url)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = Path(__file__).parent / ".scrape_state"
+CHECKPOINT_VERSION = 1
+
+
+def default_checkpoint_path(shop: str, directory: Union[str, Path] = DEFAULT_CHECKPOINT_DIR) -> Path:
+    return Path(directory) / f"{shop}.json"
+
+
+class Checkpoint:
+    """Progress of one shop's scrape-and-post run."""
+
+    def __init__(self, path: Union[str, Path], shop: str, start_url: str):
+        self.path = Path(path)
+        self.shop = shop
+        self.start_url = start_url
+        self.pages_done = 0
+        self.next_url: Optional[str] = None
+        self.crawl_done = False
+        # product_url -> parsed item, in the order the items were parsed
+        self.pending: Dict[str, Dict[str, object]] = {}
+        # product_url -> WordPress post ID
+        self.posted: Dict[str, int] = {}
+        self.resumed = False
+
+    @property
+    def image_dir(self) -> Path:
+        """Directory for spooled images that must survive a crash (kuma-doll)."""
+
+        return self.path.with_suffix(".images")
+
+    @property
+    def resume_url(self) -> str:
+        return self.next_url or self.start_url
+
+    def known_urls(self) -> Set[str]:
+        """Product URLs this run already handled (posted or waiting to be posted)."""
+
+        return set(self.pending) | set(self.posted)
+
+    def pending_items(self) -> List[Dict[str, object]]:
+        return list(self.pending.values())
+
+    def add_pending(self, item: Dict[str, object]) -> None:
+        self.pending[str(item["product_url"])] = item
+
+    def page_done(self, next_url: Optional[str]) -> None:
+        self.pages_done += 1
+        self.next_url = next_url
+        if next_url is None:
+            self.crawl_done = True
+        self.save()
+
+    def discard(self, item: Dict[str, object]) -> None:
+        """Forget a product that will not be posted (e.g. cut off by ``--limit``)."""
+
+        self.pending.pop(str(item["product_url"]), None)
+
+    def mark_posted(self, item: Dict[str, object], post_id: int) -> None:
+        product_url = str(item["product_url"])
+        self.pending.pop(product_url, None)
+        self.posted[product_url] = post_id
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "shop": self.shop,
+            "start_url": self.start_url,
+            "pages_done": self.pages_done,
+            "next_url": self.next_url,
+            "crawl_done": self.crawl_done,
+            "pending": list(self.pending.values()),
+            "posted": self.posted,
+            "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def save(self) -> None:
+        """Atomically write the current state."""
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(self.to_dict(), handle, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.warning("Could not save checkpoint %s: %s", self.path, exc)
+
+    def finish(self) -> None:
+        """Remove the state (and spooled images) when the run is complete, otherwise keep it for ``--resume``."""
+
+        if self.crawl_done and not self.pending:
+            self.clear()
+            return
+        self.save()
+        logger.info(
+            "Checkpoint kept at %s (%d pages done, %d products not posted); re-run with --resume to continue",
+            self.path,
+            self.pages_done,
+            len(self.pending),
+        )
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning("Could not remove checkpoint %s: %s", self.path, exc)
+        shutil.rmtree(self.image_dir, ignore_errors=True)
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", self.path, exc)
+            return False
+
+        if data.get("version") != CHECKPOINT_VERSION or data.get("shop") != self.shop:
+            logger.warning("Ignoring checkpoint %s written for another shop or version", self.path)
+            return False
+        if data.get("start_url") != self.start_url:
+            logger.warning("Ignoring checkpoint %s for a different start URL (%s)", self.path, data.get("start_url"))
+            return False
+
+        self.pages_done = int(data.get("pages_done") or 0)
+        self.next_url = data.get("next_url")
+        self.crawl_done = bool(data.get("crawl_done"))
+        for item in data.get("pending") or []:
+            if isinstance(item, dict) and item.get("product_url"):
+                self.add_pending(item)
+        self.posted = {str(url): int(post_id) for url, post_id in (data.get("posted") or {}).items()}
+        self.resumed = True
+        return True
+
+
+def open_checkpoint(
+    path: Optional[Union[str, Path]], shop: str, start_url: str, resume: bool = False
+) -> Optional[Checkpoint]:
+    """Return a checkpoint at ``path`` (``None`` when checkpointing is disabled).
+
+    With ``resume`` the saved state is loaded when it belongs to the same shop and
+    start URL; otherwise the run starts from scratch and overwrites the old state.
+    """
+
+    if not path:
+        return None
+    checkpoint = Checkpoint(path, shop, start_url)
+    if resume and checkpoint._load():
+        logger.info(
+            "Resuming %s after %d pages (%d products to post, %d already posted)",
+            shop,
+            checkpoint.pages_done,
+            len(checkpoint.pending),
+            len(checkpoint.posted),
+        )
+    elif resume:
+        logger.info("No checkpoint to resume at %s; starting from the first page", path)
+    return checkpoint
@@ -2,16 +2,17 @@
 """
 Fetch ranking page titles from WordPress
 """
-import requests
 import sys
 
+from wp_client import WP_NAMESPACE, WordPressClient
+
 WP_BASE = "https://freya-era.com"
-API_ENDPOINT = f"{WP_BASE}/wp-json/wp/v2/website_ranking"
 
 try:
-    response = requests.get(API_ENDPOINT, params={"per_page": 100}, timeout=10)
-    response.raise_for_status()
-    rankings = response.json()
+    with WordPressClient(WP_BASE, timeout=10) as client:
+        rankings = client.get_json(
+            "website_ranking", namespace=WP_NAMESPACE, params={"per_page": 100}, fields=["title"]
+        )
     
     print(f"Found {len(rankings)} ranking pages:")
     for ranking in rankings:
@@ -308,6 +308,7 @@ add_shortcode( 'website_ranking', 'lovedoll_website_ranking_shortcode' );
  */
 require_once get_template_directory() . '/includes/seo-blog-api.php';
 require_once get_template_directory() . '/includes/lovedoll-products-api.php';
+require_once get_template_directory() . '/includes/lovedoll-products-table.php';
 
 /**
  * Add Column Menu Item to Primary Menu
@@ -24,6 +24,7 @@ Features:
 """
 
 import argparse
+import hashlib
 import json
 import logging
 import os
@@ -38,6 +39,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 import requests
 from ranking_data_manager import RankingDataManager
+from wp_client import WP_NAMESPACE, WordPressClient
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -63,14 +65,15 @@ KEYWORD_TEMPLATES = [
 class SEOBlogGenerator:
     """Generate SEO-optimized blog posts using AI."""
     
-    def __init__(self, api_key: str):
-        """Initialize the generator with API key."""
+    def __init__(self, api_key: str, wp_client: Optional[WordPressClient] = None):
+        """Initialize the generator with API key (and the WordPress client used for ranking data)."""
         if not api_key:
             raise ValueError("AI_API environment variable is not set")
         
         self.api_key = api_key
         self.api_base = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         self.model = "gpt-4.1-mini"  # Using the available model
+        self.wp_client = wp_client
         
     def generate_blog_post(self, keyword: str) -> Dict[str, str]:
         """
@@ -85,7 +88,7 @@ class SEOBlogGenerator:
         logger.info(f"Generating blog post for keyword: {keyword}")
         
         # Get affiliate link information if keyword is ranking-related
-        ranking_manager = RankingDataManager()
+        ranking_manager = RankingDataManager(client=self.wp_client)
         affiliate_info = ranking_manager.get_affiliate_link_for_keyword(keyword)
         
         prompt = self._create_seo_prompt(keyword, affiliate_info)
@@ -227,11 +230,25 @@ class SEOBlogGenerator:
 class WordPressPublisher:
     """Publish blog posts to WordPress."""
     
-    def __init__(self, wp_base: str):
-        """Initialize the publisher with WordPress base URL."""
+    def __init__(self, wp_base: str, client: Optional[WordPressClient] = None):
+        """
+        Initialize the publisher with WordPress base URL.
+        
+        Args:
+            wp_base: WordPress base URL
+            client: Shared WordPress client (a pooled one is created if omitted)
+        """
         self.wp_base = wp_base.rstrip("/")
-        self.api_endpoint = f"{self.wp_base}/wp-json/lovedoll/v1/create-blog-post"
+        self.client = client or WordPressClient(self.wp_base, timeout=REQUEST_TIMEOUT)
+        self.api_endpoint = self.client.endpoint("create-blog-post")
         
+    @staticmethod
+    def idempotency_key(post_data: Dict[str, str]) -> str:
+        """Key identifying one article, stable across retries of the same request."""
+
+        material = "\0".join(str(post_data.get(field, "")) for field in ("title", "content", "keyword"))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
     def publish_post(self, post_data: Dict[str, str], status: str = "draft") -> Dict:
         """
         Publish a blog post to WordPress.
@@ -253,12 +270,14 @@ class WordPressPublisher:
             "excerpt": post_data.get("meta_description", ""),
             "meta_description": post_data.get("meta_description", ""),
             "tags": post_data.get("tags", []),
-            "keyword": post_data.get("keyword", "")
+            "keyword": post_data.get("keyword", ""),
+            # Lets WordPress answer a repeated request with the post it already created.
+            "idempotency_key": self.idempotency_key(post_data),
         }
         
         try:
-            response = requests.post(
-                self.api_endpoint,
+            response = self.client.post(
+                "create-blog-post",
                 json=wp_post,
                 timeout=REQUEST_TIMEOUT
             )
@@ -276,14 +295,15 @@ class WordPressPublisher:
     def _get_or_create_tags_unused(self, tag_names: List[str]) -> List[int]:
         """Get or create WordPress tags and return their IDs."""
         tag_ids = []
-        tags_endpoint = f"{self.wp_base}/wp-json/wp/v2/tags"
         
         for tag_name in tag_names:
             try:
                 # Search for existing tag
-                response = requests.get(
-                    tags_endpoint,
+                response = self.client.get(
+                    "tags",
+                    namespace=WP_NAMESPACE,
                     params={"search": tag_name},
+                    fields=["id"],
                     timeout=REQUEST_TIMEOUT
                 )
                 
@@ -294,9 +314,11 @@ class WordPressPublisher:
                         continue
                 
                 # Create new tag if not found
-                response = requests.post(
-                    tags_endpoint,
+                response = self.client.post(
+                    "tags",
+                    namespace=WP_NAMESPACE,
                     json={"name": tag_name},
+                    fields=["id"],
                     timeout=REQUEST_TIMEOUT
                 )
                 
@@ -362,8 +384,11 @@ def main():
         keyword = "ラブドール 選び方"
     
     try:
+        # One pooled client for the ranking lookup and the publish call
+        wp_client = WordPressClient(args.wp_base, timeout=REQUEST_TIMEOUT)
+        
         # Generate blog post
-        generator = SEOBlogGenerator(api_key)
+        generator = SEOBlogGenerator(api_key, wp_client=wp_client)
         post_data = generator.generate_blog_post(keyword)
         
         logger.info("=" * 60)
@@ -374,8 +399,9 @@ def main():
         logger.info("=" * 60)
         
         # Publish to WordPress
-        publisher = WordPressPublisher(args.wp_base)
+        publisher = WordPressPublisher(args.wp_base, client=wp_client)
         result = publisher.publish_post(post_data, args.status)
+        wp_client.log_timings()
         
         logger.info("✓ Blog post generated and published successfully!")
         logger.info(f"Post ID: {result.get('id', 'N/A')}")
@@ -0,0 +1,307 @@
+"""
+Pluggable HTML parser backend for the shop scrapers.
+
+The scrapers parse every list page (and kuma-doll detail pages) through this module
+instead of calling BeautifulSoup directly. Two backends produce the same item dicts:
+
+    lxml  (default) libxml2's tree is queried directly; CSS selectors are translated
+          to compiled XPath once, so no BeautifulSoup objects are built per page
+    bs4   BeautifulSoup with the lxml builder and soupsieve selectors (the previous
+          behaviour), kept as a fallback
+
+Scrapers compile their selectors with ``compile`` (a drop-in for ``soupsieve.compile``)
+and parse pages with ``parse``; the active backend is chosen once per process with
+``set_backend`` (``--parser`` on the command line). Parsed nodes of both backends
+support the small BeautifulSoup subset the scrapers use: ``name``, ``get``,
+``node[attr]``, ``get_text``, ``string``, ``find``, ``find_all`` and ``find_next``.
+
+The translator covers the selector syntax used by the scrapers: type, ``.class``,
+``#id`` and ``[attr]`` / ``[attr=v]`` / ``[attr~=v]`` / ``[attr^=v]`` / ``[attr*=v]``
+compounds joined by descendant or ``>`` combinators, and ``,`` groups. Anything else
+raises ``ValueError`` when the selector is compiled, i.e. at import time.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import soupsieve
+from lxml import etree
+
+BACKEND_LXML = "lxml"
+BACKEND_SOUP = "bs4"
+BACKEND_CHOICES = (BACKEND_LXML, BACKEND_SOUP)
+DEFAULT_BACKEND = BACKEND_LXML
+
+# BeautifulSoup keeps the strings below these tags out of get_text() (Script,
+# Stylesheet, TemplateString and the ruby string classes), and collapses
+# whitespace-only strings outside <pre>/<textarea> to a single character.
+_HIDDEN_TEXT_TAGS = ("script", "style", "template", "rt", "rp")
+_PRESERVE_WHITESPACE_TAGS = ("pre", "textarea")
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+_TEXT_EXPRESSION = "descendant::text()[not(%s)]" % " or ".join(f"ancestor::{tag}" for tag in _HIDDEN_TEXT_TAGS)
+_TEXT_XPATH = etree.XPath(_TEXT_EXPRESSION, smart_strings=False)
+# Smart strings know their element, which whitespace collapsing needs.
+_TEXT_NODES_XPATH = etree.XPath(_TEXT_EXPRESSION)
+
+_backend = DEFAULT_BACKEND
+_local = threading.local()
+
+
+def set_backend(name: str) -> None:
+    """Select the parser backend used by ``parse`` for the rest of the process."""
+
+    global _backend
+    if name not in BACKEND_CHOICES:
+        raise ValueError(f"Unknown parser backend {name!r}; expected one of {', '.join(BACKEND_CHOICES)}")
+    _backend = name
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def _lxml_parser() -> etree.HTMLParser:
+    # lxml parsers must not be shared between threads; pages are parsed in worker threads.
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = etree.HTMLParser(encoding="utf-8")
+    return parser
+
+
+def parse(html: str):
+    """Parse an HTML document (or fragment) with the active backend and return its root node."""
+
+    if _backend == BACKEND_SOUP:
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(html, "lxml")
+
+    # Encoded explicitly so a stray <meta charset> or XML declaration cannot override it.
+    root = etree.fromstring(html.encode("utf-8"), _lxml_parser()) if html.strip() else None
+    return Node(root if root is not None else etree.Element("html"), document=True)
+
+
+class Node:
+    """A parsed lxml element exposing the BeautifulSoup API subset the scrapers use."""
+
+    __slots__ = ("_element", "_document")
+
+    def __init__(self, element, document: bool = False):
+        self._element = element
+        self._document = document
+
+    @property
+    def name(self) -> str:
+        return "[document]" if self._document else self._element.tag
+
+    def get(self, key: str, default=None):
+        return self._element.get(key, default)
+
+    def __getitem__(self, key: str) -> str:
+        value = self._element.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        if strip:
+            texts = (text.strip() for text in _TEXT_XPATH(self._element))
+            return separator.join(text for text in texts if text)
+        return separator.join(
+            _collapse(text, text.getparent().getparent() if text.is_tail else text.getparent())
+            for text in _TEXT_NODES_XPATH(self._element)
+        )
+
+    @property
+    def string(self) -> Optional[str]:
+        """The only string inside this node, following single-child chains like BeautifulSoup."""
+
+        if self._document:
+            return None
+        element = self._element
+        while True:
+            children = list(element)
+            if element.text:
+                return _collapse(element.text, element) if not children else None
+            if len(children) != 1 or children[0].tail:
+                return None
+            element = children[0]
+            if not isinstance(element.tag, str):
+                # A lone comment is a string to BeautifulSoup as well.
+                return element.text
+
+    def _xpath(self, axis: str, name: str):
+        return _tag_xpath(axis if not self._document else "descendant-or-self", name)(self._element)
+
+    def find(self, name: str) -> Optional["Node"]:
+        found = self._xpath("descendant", name)
+        return Node(found[0]) if found else None
+
+    def find_all(self, name: str) -> List["Node"]:
+        return [Node(element) for element in self._xpath("descendant", name)]
+
+    def find_next(self, name: str) -> Optional["Node"]:
+        """The first ``name`` element after this one's start tag, in document order."""
+
+        found = _tag_xpath("next", name)(self._element)
+        return Node(found[0]) if found else None
+
+    def __repr__(self) -> str:
+        return f"<Node {self.name}>"
+
+
+def _collapse(text: str, parent) -> str:
+    """Collapse a whitespace-only string the way BeautifulSoup does while parsing."""
+
+    if text.strip(_ASCII_SPACES):
+        return str(text)
+    while parent is not None:
+        if parent.tag in _PRESERVE_WHITESPACE_TAGS:
+            return str(text)
+        parent = parent.getparent()
+    return "\n" if "\n" in text else " "
+
+
+_TAG_XPATHS: Dict[Tuple[str, str], etree.XPath] = {}
+
+
+def _tag_xpath(axis: str, name: str) -> etree.XPath:
+    key = (axis, name)
+    xpath = _TAG_XPATHS.get(key)
+    if xpath is None:
+        if not re.fullmatch(r"[A-Za-z][\w-]*", name):
+            raise ValueError(f"Unsupported tag name {name!r}")
+        name = name.lower()
+        expression = f"(descendant::{name} | following::{name})[1]" if axis == "next" else f"{axis}::{name}"
+        xpath = _TAG_XPATHS[key] = etree.XPath(expression)
+    return xpath
+
+
+class Selector:
+    """A CSS selector compiled for both backends; ``select`` dispatches on the node type."""
+
+    def __init__(self, css: str):
+        self.css = css
+        self._soup = soupsieve.compile(css)
+        expression = css_to_xpath(css)
+        self._xpath = etree.XPath(expression.replace("{axis}", "descendant"))
+        self._document_xpath = etree.XPath(expression.replace("{axis}", "descendant-or-self"))
+
+    def select(self, node) -> list:
+        if isinstance(node, Node):
+            xpath = self._document_xpath if node._document else self._xpath
+            return [Node(element) for element in xpath(node._element)]
+        return self._soup.select(node)
+
+    def select_one(self, node):
+        if isinstance(node, Node):
+            xpath = self._document_xpath if node._document else self._xpath
+            found = xpath(node._element)
+            return Node(found[0]) if found else None
+        return self._soup.select_one(node)
+
+    def __repr__(self) -> str:
+        return f"Selector({self.css!r})"
+
+
+def compile(css: str) -> Selector:  # noqa: A001 - mirrors soupsieve.compile
+    """Compile ``css`` once for use with either backend."""
+
+    return Selector(css)
+
+
+_IDENT = r"-?[A-Za-z_][\w-]*"
+_TOKEN = re.compile(
+    rf"""
+    (?P<tag>\*|{_IDENT})
+    | \.(?P<class>{_IDENT})
+    | \#(?P<id>{_IDENT})
+    | \[\s*(?P<attr>{_IDENT})\s*(?:(?P<op>[~^*]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>{_IDENT}))\s*)?\]
+    | (?P<combinator>\s*>\s*|\s+)
+    """,
+    re.VERBOSE,
+)
+
+
+def _literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise ValueError(f"Unsupported attribute value {value!r}")
+
+
+def _word_test(attribute: str, word: str) -> str:
+    return f"contains(concat(' ', normalize-space({attribute}), ' '), {_literal(f' {word} ')})"
+
+
+def _compounds(selector: str) -> List[Tuple[str, str, List[str]]]:
+    """Split one selector into ``(combinator, tag, predicates)`` compounds, left to right."""
+
+    compounds: List[Tuple[str, str, List[str]]] = []
+    combinator, tag, predicates = " ", "", []
+    position = 0
+    while position < len(selector):
+        match = _TOKEN.match(selector, position)
+        if not match:
+            raise ValueError(f"Unsupported CSS selector syntax at {selector[position:]!r} in {selector!r}")
+        position = match.end()
+        if match.group("combinator") is not None:
+            if not (tag or predicates):
+                raise ValueError(f"Unsupported CSS selector {selector!r}")
+            compounds.append((combinator, tag or "*", predicates))
+            combinator, tag, predicates = match.group("combinator").strip() or " ", "", []
+        elif match.group("tag"):
+            if tag or predicates:
+                raise ValueError(f"Unsupported CSS selector syntax in {selector!r}")
+            tag = match.group("tag").lower()
+        elif match.group("class"):
+            predicates.append(_word_test("@class", match.group("class")))
+        elif match.group("id"):
+            predicates.append(f"@id={_literal(match.group('id'))}")
+        else:
+            attribute = "@" + match.group("attr").lower()
+            op = match.group("op")
+            value = next((v for v in match.group("dq", "sq", "bare") if v is not None), "")
+            if op is None:
+                predicates.append(attribute)
+            elif op == "=":
+                predicates.append(f"{attribute}={_literal(value)}")
+            elif op == "~=":
+                predicates.append(_word_test(attribute, value) if value and not value.isspace() else "false()")
+            elif op == "^=":
+                predicates.append(f"starts-with({attribute}, {_literal(value)})" if value else "false()")
+            else:
+                predicates.append(f"contains({attribute}, {_literal(value)})" if value else "false()")
+    if not (tag or predicates):
+        raise ValueError(f"Unsupported CSS selector {selector!r}")
+    compounds.append((combinator, tag or "*", predicates))
+    return compounds
+
+
+def css_to_xpath(css: str) -> str:
+    """Translate ``css`` into an XPath expression with an ``{axis}`` placeholder.
+
+    Like soupsieve, only the subject (right-most compound) must lie under the scope
+    node; its ancestors may sit anywhere above it.
+    """
+
+    paths = []
+    for selector in css.split(","):
+        selector = selector.strip()
+        if not selector:
+            raise ValueError(f"Empty selector in {css!r}")
+        compounds = _compounds(selector)
+        condition = ""
+        for index, (_, tag, predicates) in enumerate(compounds):
+            step = tag + "".join(f"[{predicate}]" for predicate in predicates)
+            if condition:
+                # The combinator in front of this compound relates it to the previous one.
+                axis = "parent" if compounds[index][0] == ">" else "ancestor"
+                step += f"[{axis}::{condition}]"
+            condition = step
+        paths.append("{axis}::" + condition)
+    return paths[0] if len(paths) == 1 else " | ".join(paths)
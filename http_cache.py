@@ -0,0 +1,162 @@
+"""
+On-disk HTTP cache with conditional-GET revalidation for the category scrapers.
+
+For every cached URL the cache keeps the response body (gzip-compressed), its
+``ETag`` / ``Last-Modified`` validators and, optionally, the items the scraper
+extracted from it. Later fetches send ``If-None-Match`` / ``If-Modified-Since``;
+when the shop answers ``304 Not Modified`` the stored extraction is reused and
+the page is not parsed again.
+
+Layout (one pair of files per URL, named by the SHA-1 of the URL):
+    <cache_dir>/<sha1>.json     validators, timestamps and cached extraction
+    <cache_dir>/<sha1>.html.gz  last 200 response body
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".http_cache"
+
+PageItems = List[Dict[str, object]]
+PageExtraction = Tuple[PageItems, Optional[str]]
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class HttpCache:
+    """Store response validators, bodies and extraction results on disk."""
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.html.gz"
+
+    def _load_meta(self, url: str) -> Optional[Dict[str, object]]:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable cache entry for %s: %s", url, exc)
+            return None
+        return meta if meta.get("url") == url else None
+
+    def _save_meta(self, url: str, meta: Dict[str, object]) -> None:
+        meta_path, _ = self._paths(url)
+        _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Return revalidation headers for ``url`` (empty when nothing is cached)."""
+
+        meta = self._load_meta(url)
+        if not meta:
+            return {}
+        headers: Dict[str, str] = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = str(meta["etag"])
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = str(meta["last_modified"])
+        return headers
+
+    def store(self, url: str, body: str, headers: Dict[str, str]) -> None:
+        """Cache a fresh ``200`` response; extraction results are reset."""
+
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            # Without validators the server cannot answer 304, so caching is pointless.
+            return
+        _, body_path = self._paths(url)
+        _write_atomic(body_path, gzip.compress(body.encode("utf-8")))
+        self._save_meta(
+            url,
+            {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "stored_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "extraction": None,
+            },
+        )
+
+    def load_body(self, url: str) -> Optional[str]:
+        """Return the cached body for ``url`` (used when the server answers 304)."""
+
+        if not self._load_meta(url):
+            return None
+        _, body_path = self._paths(url)
+        try:
+            return gzip.decompress(body_path.read_bytes()).decode("utf-8")
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not read cached body for %s: %s", url, exc)
+            return None
+
+    def load_extraction(self, url: str) -> Optional[PageExtraction]:
+        meta = self._load_meta(url)
+        extraction = meta.get("extraction") if meta else None
+        if not isinstance(extraction, dict):
+            return None
+        return extraction.get("items") or [], extraction.get("next_url")
+
+    def save_extraction(self, url: str, items: PageItems, next_url: Optional[str]) -> None:
+        meta = self._load_meta(url)
+        if not meta:
+            return
+        meta["extraction"] = {"items": items, "next_url": next_url}
+        self._save_meta(url, meta)
+
+    def extract(
+        self,
+        url: str,
+        html: str,
+        not_modified: bool,
+        extract_page: Callable[[str, str], PageExtraction],
+    ) -> PageExtraction:
+        """Return ``extract_page(url, html)``, reusing the stored result for unchanged pages."""
+
+        if not_modified:
+            cached = self.load_extraction(url)
+            if cached is not None:
+                logger.info("Page not modified; reusing %d cached items: %s", len(cached[0]), url)
+                return cached
+
+        items, next_url = extract_page(url, html)
+        self.save_extraction(url, items, next_url)
+        return items, next_url
+
+
+def open_cache(directory: Optional[Union[str, Path]]) -> Optional[HttpCache]:
+    """Open the cache at ``directory``; returns ``None`` (cache disabled) when it is empty."""
+
+    if not directory:
+        return None
+    try:
+        return HttpCache(directory)
+    except OSError as exc:
+        logger.warning("Could not open HTTP cache %s; continuing without it: %s", directory, exc)
+        return None
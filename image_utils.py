@@ -0,0 +1,224 @@
+"""
+Image helpers shared by the scrapers: ``srcset`` candidate selection and optional
+client-side normalization before upload.
+
+``srcset_candidates`` parses ``w`` and ``x`` descriptors and orders the candidates
+so the smallest image at or above a target width comes first, instead of always
+taking the largest original.
+
+``normalize_image`` downsizes and re-encodes an image to WebP with Pillow. Pillow is
+optional: without it images are uploaded unchanged.
+
+Usage:
+    candidates = srcset_candidates(img.get("srcset"), target_width=800)
+    data, filename, mime = normalize_image(raw_bytes, "doll.jpg", ImageOptions(normalize=True))
+"""
+from __future__ import annotations
+
+import io
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_WIDTH = 800
+DEFAULT_WEBP_QUALITY = 82
+
+# (url, width in CSS pixels or None, pixel density or None)
+SrcsetEntry = Tuple[str, Optional[float], Optional[float]]
+
+_DESCRIPTOR_RE = re.compile(r"^(\d+(?:\.\d+)?)([wx])$", re.IGNORECASE)
+
+# Magic-byte signatures -> (extension, MIME type).
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ("jpg", "image/jpeg")),
+    (b"\x89PNG\r\n\x1a\n", ("png", "image/png")),
+    (b"GIF87a", ("gif", "image/gif")),
+    (b"GIF89a", ("gif", "image/gif")),
+)
+
+
+@dataclass
+class ImageOptions:
+    """How the scraper picks and prepares product images."""
+
+    target_width: int = DEFAULT_TARGET_WIDTH
+    normalize: bool = False
+    quality: int = DEFAULT_WEBP_QUALITY
+
+
+def parse_srcset(value: Optional[str]) -> List[SrcsetEntry]:
+    """Parse a ``srcset`` attribute into ``(url, width, density)`` entries.
+
+    Entries without a descriptor count as ``1x``; unparsable descriptors are ignored.
+    """
+
+    if not value:
+        return []
+
+    entries: List[SrcsetEntry] = []
+    for url, descriptors in _srcset_tokens(value):
+        width: Optional[float] = None
+        density: Optional[float] = 1.0
+        if descriptors:
+            match = _DESCRIPTOR_RE.match(descriptors[0])
+            if not match:
+                continue
+            number = float(match.group(1))
+            if match.group(2).lower() == "w":
+                width, density = number, None
+            else:
+                density = number
+        entries.append((url, width, density))
+    return entries
+
+
+def _srcset_tokens(value: str) -> List[Tuple[str, List[str]]]:
+    """Split a ``srcset`` into ``(url, descriptors)`` the way the HTML parsing algorithm does.
+
+    A URL runs up to the next whitespace (so it may contain commas, as ``data:`` URLs
+    do); trailing commas end it and its entry. Otherwise its descriptors run up to the
+    next comma outside parentheses, so ``a.jpg 300w,b.jpg 600w`` needs no space.
+    """
+
+    tokens: List[Tuple[str, List[str]]] = []
+    position, length = 0, len(value)
+    while True:
+        while position < length and (value[position].isspace() or value[position] == ","):
+            position += 1
+        if position >= length:
+            return tokens
+
+        start = position
+        while position < length and not value[position].isspace():
+            position += 1
+        url = value[start:position]
+        if url.endswith(","):
+            tokens.append((url.rstrip(","), []))
+            continue
+
+        descriptors: List[str] = []
+        current, depth = "", 0
+        while position < length:
+            char = value[position]
+            position += 1
+            if char == "," and not depth:
+                break
+            if char.isspace() and not depth:
+                if current:
+                    descriptors.append(current)
+                current = ""
+                continue
+            if char == "(":
+                depth += 1
+            elif char == ")" and depth:
+                depth -= 1
+            current += char
+        if current:
+            descriptors.append(current)
+        tokens.append((url, descriptors))
+
+
+def srcset_candidates(
+    value: Optional[str], target_width: int = DEFAULT_TARGET_WIDTH, base_width: Optional[float] = None
+) -> List[str]:
+    """Return ``srcset`` URLs ordered by preference for ``target_width``.
+
+    The smallest candidate at or above the target comes first, then larger ones in
+    increasing size, then smaller ones from the largest down. ``x`` descriptors are
+    converted to widths using ``base_width`` (the ``<img width>``) when known; without
+    it, ``1x`` is treated as meeting the target.
+    """
+
+    entries = [entry for entry in parse_srcset(value) if not entry[0].startswith("data:")]
+    if not entries:
+        return []
+
+    def effective_width(entry: SrcsetEntry) -> float:
+        _, width, density = entry
+        if width is not None:
+            return width
+        if base_width:
+            return (density or 1.0) * base_width
+        return (density or 1.0) * target_width
+
+    sized = sorted(((effective_width(entry), entry[0]) for entry in entries), key=lambda pair: pair[0])
+    at_or_above = [url for width, url in sized if width >= target_width]
+    below = [url for width, url in reversed(sized) if width < target_width]
+    return at_or_above + below
+
+
+def declared_width(image_tag) -> Optional[float]:
+    """Return an ``<img>`` tag's ``width`` attribute as a number, if it has a usable one."""
+
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", str(image_tag.get("width") or ""))
+    return float(match.group(1)) if match else None
+
+
+def sniff_image_type(data: bytes) -> Optional[Tuple[str, str]]:
+    """Return ``(extension, mime)`` for common image formats based on magic bytes."""
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif", "image/avif"
+    for signature, result in _SIGNATURES:
+        if data.startswith(signature):
+            return result
+    return None
+
+
+def image_filename(filename: str, data: bytes) -> Tuple[str, str]:
+    """Fix ``filename``'s extension to match the actual image bytes; returns ``(filename, mime)``."""
+
+    stem, _ = os.path.splitext(filename)
+    sniffed = sniff_image_type(data)
+    if not sniffed:
+        return filename, mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    ext, mime = sniffed
+    return f"{stem or 'image'}.{ext}", mime
+
+
+def normalize_image(data: bytes, filename: str, options: ImageOptions) -> Tuple[bytes, str, str]:
+    """Optionally downsize to ``options.target_width`` and re-encode as WebP.
+
+    Returns ``(data, filename, mime)``. The original bytes are kept when normalization
+    is disabled, Pillow is not installed, the image cannot be decoded, or the result
+    would not be smaller.
+    """
+
+    original_name, original_mime = image_filename(filename, data)
+    if not options.normalize:
+        return data, original_name, original_mime
+
+    try:
+        from PIL import Image  # type: ignore
+    except ImportError:
+        logger.warning("Pillow is not installed; uploading images without normalization")
+        options.normalize = False
+        return data, original_name, original_mime
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            if img.width > options.target_width:
+                height = max(1, round(img.height * options.target_width / img.width))
+                img = img.resize((options.target_width, height), Image.LANCZOS)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+            out = io.BytesIO()
+            img.save(out, format="WEBP", quality=options.quality, method=4)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Could not normalize image %s: %s", filename, exc)
+        return data, original_name, original_mime
+
+    encoded = out.getvalue()
+    if len(encoded) >= len(data):
+        return data, original_name, original_mime
+
+    stem, _ = os.path.splitext(filename)
+    return encoded, f"{stem or 'image'}.webp", "image/webp"
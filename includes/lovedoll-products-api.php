@@ -3,14 +3,62 @@
  * REST API endpoints for ingesting external product data (kuma-doll.com, etc.).
  *
  * - Adds /wp-json/lovedoll/v1/add-item for creating posts.
- * - Adds /wp-json/lovedoll/v1/list for returning existing items (for duplicate checks).
+ * - Adds /wp-json/lovedoll/v1/add-items for creating posts in batches.
+ * - Both ingest endpoints accept multipart/form-data with the image as a file part,
+ *   so scrapers can stream image bytes instead of embedding base64 in JSON.
+ * - Adds /wp-json/lovedoll/v1/list for returning existing items (for duplicate checks),
+ *   with a compact cursor-paginated mode (?fields=url|hash&cursor=...).
  * - Handles kuma-doll.com hotlink protection by downloading and sideloading images on WP.
+ * - Reuses existing attachments for images already in the media library, keyed by
+ *   content hash and source URL through the indexed image table (see lovedoll-products-table.php).
+ * - Sideloads images in the background (WP-Cron) so ingest returns right after the insert;
+ *   /wp-json/lovedoll/v1/image-status reports each post's `image_status`.
+ * - Dedupes by product URL through the indexed product table (see lovedoll-products-table.php).
+ * - Upserts: when an item carries a `content_hash` that differs from the stored `_content_hash`,
+ *   only its changed title, price or image is written; unchanged items are not written at all.
  */
 
 if ( ! defined( 'ABSPATH' ) ) {
     exit;
 }
 
+/**
+ * Maximum number of items accepted by a single /add-items request.
+ */
+if ( ! defined( 'LOVEDOLL_MAX_BATCH_ITEMS' ) ) {
+    define( 'LOVEDOLL_MAX_BATCH_ITEMS', 50 );
+}
+
+/**
+ * Page size bounds for the compact /list listing.
+ */
+if ( ! defined( 'LOVEDOLL_LIST_DEFAULT_PER_PAGE' ) ) {
+    define( 'LOVEDOLL_LIST_DEFAULT_PER_PAGE', 1000 );
+}
+if ( ! defined( 'LOVEDOLL_LIST_MAX_PER_PAGE' ) ) {
+    define( 'LOVEDOLL_LIST_MAX_PER_PAGE', 5000 );
+}
+
+/**
+ * Background image sideloading.
+ *
+ * With LOVEDOLL_DEFER_IMAGE_SIDELOAD enabled, ingest stores an image job on the post
+ * (`_image_status` = pending) and a WP-Cron event processes LOVEDOLL_IMAGE_JOBS_PER_RUN
+ * jobs per run. Define it as false to sideload inside the request as before.
+ */
+if ( ! defined( 'LOVEDOLL_DEFER_IMAGE_SIDELOAD' ) ) {
+    define( 'LOVEDOLL_DEFER_IMAGE_SIDELOAD', true );
+}
+if ( ! defined( 'LOVEDOLL_IMAGE_JOBS_PER_RUN' ) ) {
+    define( 'LOVEDOLL_IMAGE_JOBS_PER_RUN', 10 );
+}
+if ( ! defined( 'LOVEDOLL_IMAGE_JOB_MAX_ATTEMPTS' ) ) {
+    define( 'LOVEDOLL_IMAGE_JOB_MAX_ATTEMPTS', 3 );
+}
+if ( ! defined( 'LOVEDOLL_IMAGE_STATUS_MAX_IDS' ) ) {
+    define( 'LOVEDOLL_IMAGE_STATUS_MAX_IDS', 100 );
+}
+
 /**
  * Download kuma-doll images server-side and register them as media.
  *
@@ -34,22 +82,349 @@ function lid_fetch_image_with_referer( $url, $title ) {
         return false;
     }
 
+    // Name the file after the product but keep the source extension; the real type is
+    // checked again from the file contents in lovedoll_attach_image_file().
+    $extension     = pathinfo( (string) wp_parse_url( $url, PHP_URL_PATH ), PATHINFO_EXTENSION );
+    $name          = sanitize_file_name( $title ) . '.' . ( $extension ? strtolower( $extension ) : 'webp' );
+    $attachment_id = lovedoll_attach_image_file( $tmp, $name, 0, $title, $url );
+
+    if ( is_wp_error( $attachment_id ) ) {
+        return false;
+    }
+
+    return wp_get_attachment_url( $attachment_id );
+}
+
+/**
+ * Register a local image file as media, reusing an existing attachment with the same bytes.
+ *
+ * The file is always consumed: it is either moved into the uploads directory or deleted.
+ *
+ * @param string $tmp        Path of the image file.
+ * @param string $name       File name to register the media under.
+ * @param int    $post_id    Parent post.
+ * @param string $title
+ * @param string $source_url Original image URL, stored for URL-based reuse.
+ * @return int|WP_Error Attachment ID.
+ */
+function lovedoll_attach_image_file( $tmp, $name, $post_id, $title, $source_url = '' ) {
+    $sha256   = hash_file( 'sha256', $tmp );
+    $existing = $sha256 ? lovedoll_find_image_attachment( $sha256 ) : 0;
+    if ( $existing ) {
+        @unlink( $tmp );
+        return $existing;
+    }
+
+    $name     = sanitize_file_name( $name );
+    $filetype = wp_check_filetype( $name );
+    $type     = $filetype['type'];
+
+    // Trust the bytes over the name: fix the extension when the file is another image type.
+    $real_mime = wp_get_image_mime( $tmp );
+    if ( $real_mime && $real_mime !== $type ) {
+        $extension = wp_get_default_extension_for_mime_type( $real_mime );
+        if ( $extension ) {
+            $stem = pathinfo( $name, PATHINFO_FILENAME );
+            $name = ( $stem ? $stem : 'kuma-image' ) . '.' . $extension;
+            $type = $real_mime;
+        }
+    }
+
     $file = [
-        'name'     => sanitize_file_name( $title ) . '.webp',
-        'type'     => 'image/webp',
+        'name'     => $name ? $name : 'kuma-image.webp',
+        'type'     => $type ? $type : 'image/webp',
         'tmp_name' => $tmp,
         'error'    => 0,
         'size'     => filesize( $tmp ),
     ];
 
-    $attachment_id = media_handle_sideload( $file, 0 );
-    @unlink( $tmp );
+    $attachment_id = media_handle_sideload( $file, $post_id, $title );
+    if ( file_exists( $tmp ) ) {
+        @unlink( $tmp );
+    }
 
-    if ( is_wp_error( $attachment_id ) ) {
+    if ( ! is_wp_error( $attachment_id ) ) {
+        update_post_meta( $attachment_id, '_lovedoll_image_sha256', $sha256 );
+        if ( $source_url ) {
+            update_post_meta( $attachment_id, '_lovedoll_source_url', $source_url );
+        }
+        lovedoll_save_image_row( $attachment_id, $sha256, $source_url );
+    }
+
+    return $attachment_id;
+}
+
+/**
+ * Directory holding image bytes that wait for a background sideload job.
+ *
+ * Lives in the system temp directory (outside the web root) by default; filter
+ * `lovedoll_image_queue_dir` to move it. The ingest endpoints are unauthenticated, so
+ * the directory also gets deny-all `.htaccess` and `index.php` files in case it ends up
+ * below the web root (e.g. when get_temp_dir() falls back to wp-content).
+ *
+ * @return string Absolute path, or '' when it cannot be created.
+ */
+function lovedoll_image_queue_dir() {
+    $dir = untrailingslashit( apply_filters( 'lovedoll_image_queue_dir', trailingslashit( get_temp_dir() ) . 'lovedoll-image-queue' ) );
+    if ( ! wp_mkdir_p( $dir ) ) {
+        return '';
+    }
+
+    $guards = [
+        '.htaccess' => "<IfModule mod_authz_core.c>\n    Require all denied\n</IfModule>\n<IfModule !mod_authz_core.c>\n    Deny from all\n</IfModule>\n",
+        'index.php' => "<?php\n// Silence is golden.\n",
+    ];
+    foreach ( $guards as $guard => $contents ) {
+        if ( ! file_exists( $dir . '/' . $guard ) ) {
+            file_put_contents( $dir . '/' . $guard, $contents );
+        }
+    }
+
+    return $dir;
+}
+
+/**
+ * Move a file that holds an image to a random, image-extension name in the queue directory.
+ *
+ * Client-supplied names are never used on disk: the bytes are checked with
+ * wp_get_image_mime() / wp_check_filetype_and_ext() and anything that is not an
+ * allowed image is deleted.
+ *
+ * @param string $path   File to check and move.
+ * @param string $dir    Image queue directory.
+ * @param bool   $upload Whether $path is a PHP upload temp file (moved with move_uploaded_file()).
+ * @return string Path of the queued file, or '' when it was rejected or could not be moved.
+ */
+function lovedoll_queue_image_file( $path, $dir, $upload = false ) {
+    $mime      = wp_get_image_mime( $path );
+    $extension = $mime ? wp_get_default_extension_for_mime_type( $mime ) : false;
+
+    // Also requires the type to be one the site allows for uploads.
+    $checked = $extension ? wp_check_filetype_and_ext( $path, 'image.' . $extension ) : [ 'type' => false ];
+
+    if ( ! $extension || $checked['type'] !== $mime ) {
+        @unlink( $path );
+        return '';
+    }
+
+    $target = trailingslashit( $dir ) . 'img-' . wp_generate_password( 20, false ) . '.' . $extension;
+    $moved  = $upload ? move_uploaded_file( $path, $target ) : rename( $path, $target );
+    if ( ! $moved ) {
+        @unlink( $path );
+        return '';
+    }
+
+    return $target;
+}
+
+/**
+ * Move an image uploaded as a multipart file part into the image queue directory.
+ *
+ * PHP deletes request temp files when the request ends, so queued jobs need their own copy.
+ *
+ * @param array $file Entry from WP_REST_Request::get_file_params().
+ * @return string Path of the queued file, or '' when it is missing or not an image.
+ */
+function lovedoll_spool_uploaded_image( array $file ) {
+    if ( ! isset( $file['tmp_name'], $file['error'] ) || UPLOAD_ERR_OK !== (int) $file['error'] || ! is_uploaded_file( $file['tmp_name'] ) ) {
+        return '';
+    }
+
+    $dir = lovedoll_image_queue_dir();
+    if ( ! $dir ) {
+        return '';
+    }
+
+    return lovedoll_queue_image_file( $file['tmp_name'], $dir, true );
+}
+
+/**
+ * Write raw image bytes (e.g. decoded base64 `image_content`) into the image queue directory.
+ *
+ * The bytes land in a wp_tempnam() `.tmp` file first and are only renamed to an image
+ * extension once they check out as an image.
+ *
+ * @param string $bytes
+ * @return string Path of the queued file, or '' when the bytes are not an image.
+ */
+function lovedoll_spool_image_bytes( $bytes ) {
+    $dir = lovedoll_image_queue_dir();
+    if ( ! $dir ) {
+        return '';
+    }
+
+    require_once ABSPATH . 'wp-admin/includes/file.php';
+
+    $tmp = wp_tempnam( 'lovedoll-image', trailingslashit( $dir ) );
+    if ( false === file_put_contents( $tmp, $bytes ) ) {
+        @unlink( $tmp );
+        return '';
+    }
+
+    return lovedoll_queue_image_file( $tmp, $dir );
+}
+
+/**
+ * Queue (or, with deferral disabled, run) the image sideload for a product post.
+ *
+ * @param int   $post_id
+ * @param array $job { source_url, file, name }
+ */
+function lovedoll_queue_image_job( $post_id, array $job ) {
+    if ( ! LOVEDOLL_DEFER_IMAGE_SIDELOAD ) {
+        lovedoll_process_image_job( $post_id, $job );
+        return;
+    }
+
+    update_post_meta( $post_id, '_image_job', $job );
+    update_post_meta( $post_id, '_image_status', 'pending' );
+    lovedoll_schedule_image_jobs();
+}
+
+/**
+ * Sideload a product image and set it as the post thumbnail.
+ *
+ * Uses the queued file when there is one and falls back to fetching the source URL
+ * (with the kuma-doll hotlink workaround). Failed jobs stay pending until they have
+ * been tried LOVEDOLL_IMAGE_JOB_MAX_ATTEMPTS times.
+ *
+ * @param int   $post_id
+ * @param array $job { source_url, file, name }
+ * @return bool True when the image was attached.
+ */
+function lovedoll_process_image_job( $post_id, array $job ) {
+    require_once ABSPATH . 'wp-admin/includes/file.php';
+    require_once ABSPATH . 'wp-admin/includes/media.php';
+    require_once ABSPATH . 'wp-admin/includes/image.php';
+
+    $job = wp_parse_args(
+        $job,
+        [
+            'source_url' => '',
+            'file'       => '',
+            'name'       => '',
+        ]
+    );
+
+    $title        = get_the_title( $post_id );
+    $image_src    = $job['source_url'];
+    $thumbnail_id = 0;
+
+    // Prefer bytes the scraper already sent (multipart upload or base64).
+    if ( $job['file'] && file_exists( $job['file'] ) ) {
+        $name          = $job['name'] ? $job['name'] : wp_basename( $job['file'] );
+        $attachment_id = lovedoll_attach_image_file( $job['file'], $name, $post_id, $title, $image_src );
+        if ( ! is_wp_error( $attachment_id ) ) {
+            $thumbnail_id = $attachment_id;
+        }
+        // The file is consumed either way; a retry has to use the URL.
+        $job['file'] = '';
+    }
+
+    // If binary was not supplied or failed, fall back to fetching by URL.
+    if ( ! $thumbnail_id && $image_src ) {
+        if ( false !== strpos( $image_src, 'kuma-doll.com' ) ) {
+            $saved = lid_fetch_image_with_referer( $image_src, $title );
+            if ( $saved ) {
+                $thumbnail_id = attachment_url_to_postid( $saved );
+            }
+        } else {
+            $tmp = download_url( $image_src );
+            if ( ! is_wp_error( $tmp ) ) {
+                $name          = wp_basename( (string) wp_parse_url( $image_src, PHP_URL_PATH ) );
+                $attachment_id = lovedoll_attach_image_file( $tmp, $name, $post_id, $title, $image_src );
+                if ( ! is_wp_error( $attachment_id ) ) {
+                    $thumbnail_id = $attachment_id;
+                }
+            }
+        }
+    }
+
+    if ( $thumbnail_id ) {
+        set_post_thumbnail( $post_id, $thumbnail_id );
+        update_post_meta( $post_id, '_final_image_url', wp_get_attachment_url( $thumbnail_id ) );
+        update_post_meta( $post_id, '_image_status', 'done' );
+        delete_post_meta( $post_id, '_image_job' );
+        delete_post_meta( $post_id, '_image_attempts' );
+        return true;
+    }
+
+    $attempts = (int) get_post_meta( $post_id, '_image_attempts', true ) + 1;
+    if ( ! LOVEDOLL_DEFER_IMAGE_SIDELOAD || $attempts >= LOVEDOLL_IMAGE_JOB_MAX_ATTEMPTS ) {
+        update_post_meta( $post_id, '_image_status', 'failed' );
+        delete_post_meta( $post_id, '_image_job' );
+        delete_post_meta( $post_id, '_image_attempts' );
         return false;
     }
 
-    return wp_get_attachment_url( $attachment_id );
+    update_post_meta( $post_id, '_image_attempts', $attempts );
+    update_post_meta( $post_id, '_image_job', $job );
+    return false;
+}
+
+/**
+ * Make sure a background run for pending image jobs is scheduled.
+ *
+ * @param int $delay Seconds from now.
+ */
+function lovedoll_schedule_image_jobs( $delay = 0 ) {
+    if ( ! wp_next_scheduled( 'lovedoll_process_image_jobs' ) ) {
+        wp_schedule_single_event( time() + $delay, 'lovedoll_process_image_jobs' );
+    }
+}
+
+/**
+ * WP-Cron callback: process the oldest pending image jobs.
+ */
+function lovedoll_run_image_jobs() {
+    $query = new WP_Query(
+        [
+            'post_type'      => 'dolls',
+            'post_status'    => 'any',
+            'posts_per_page' => LOVEDOLL_IMAGE_JOBS_PER_RUN,
+            'orderby'        => 'ID',
+            'order'          => 'ASC',
+            'fields'         => 'ids',
+            'no_found_rows'  => true,
+            'meta_query'     => [
+                [
+                    'key'   => '_image_status',
+                    'value' => 'pending',
+                ],
+            ],
+        ]
+    );
+
+    $retry = false;
+    foreach ( $query->posts as $post_id ) {
+        $job = get_post_meta( $post_id, '_image_job', true );
+        if ( ! lovedoll_process_image_job( $post_id, is_array( $job ) ? $job : [] ) ) {
+            $retry = $retry || 'pending' === get_post_meta( $post_id, '_image_status', true );
+        }
+    }
+
+    if ( count( $query->posts ) === LOVEDOLL_IMAGE_JOBS_PER_RUN ) {
+        lovedoll_schedule_image_jobs();
+    } elseif ( $retry ) {
+        lovedoll_schedule_image_jobs( MINUTE_IN_SECONDS );
+    }
+}
+add_action( 'lovedoll_process_image_jobs', 'lovedoll_run_image_jobs' );
+
+/**
+ * Image status of a product post: pending, done, failed, or none (no image at all).
+ *
+ * @param int $post_id
+ * @return string
+ */
+function lovedoll_get_image_status( $post_id ) {
+    $status = get_post_meta( $post_id, '_image_status', true );
+    if ( $status ) {
+        return $status;
+    }
+
+    // Posts created before background sideloading have no status meta.
+    return get_post_thumbnail_id( $post_id ) ? 'done' : 'none';
 }
 
 /**
@@ -73,9 +448,16 @@ function lovedoll_normalize_price( $value ) {
  * Build a REST-friendly response payload for a product post.
  */
 function lovedoll_build_product_payload( $post_id ) {
-    $product_url = get_post_meta( $post_id, '_product_url', true );
-    $price       = (int) get_post_meta( $post_id, '_price', true );
-    $image_url   = get_post_meta( $post_id, '_final_image_url', true );
+    $row = lovedoll_get_product_row( $post_id );
+    if ( $row ) {
+        $product_url = $row['product_url'];
+        $price       = (int) $row['price'];
+        $image_url   = $row['image_url'];
+    } else {
+        $product_url = get_post_meta( $post_id, '_product_url', true );
+        $price       = (int) get_post_meta( $post_id, '_price', true );
+        $image_url   = get_post_meta( $post_id, '_final_image_url', true );
+    }
 
     if ( ! $image_url ) {
         $thumb_id = get_post_thumbnail_id( $post_id );
@@ -85,45 +467,279 @@ function lovedoll_build_product_payload( $post_id ) {
     }
 
     return [
-        'id'          => $post_id,
-        'title'       => get_the_title( $post_id ),
-        'product_url' => $product_url,
-        'price'       => $price,
-        'image_url'   => $image_url,
+        'id'           => $post_id,
+        'title'        => get_the_title( $post_id ),
+        'product_url'  => $product_url,
+        'price'        => $price,
+        'image_url'    => $image_url,
+        'image_status' => lovedoll_get_image_status( $post_id ),
     ];
 }
 
 /**
  * REST callback: list products for duplicate checks.
+ *
+ * Without a `fields` parameter this returns the legacy full payload for up to 200 posts.
+ * With `fields=url` (or `fields=hash`) it returns a compact, cursor-paginated listing:
+ *
+ *   GET /wp-json/lovedoll/v1/list?fields=url&per_page=1000&cursor=0&modified_since=2024-01-01T00:00:00Z
+ *   => { "items": [ { "id": 12, "product_url": "https://..." }, ... ], "next_cursor": 12 }
+ *
+ * `next_cursor` is null on the last page. `fields=hash` returns `url_hash` (sha1 of the
+ * product URL) instead of the URL itself.
  */
-function lovedoll_list_items() {
-    $query = new WP_Query(
-        [
-            'post_type'      => 'dolls',
-            'post_status'    => 'publish',
-            'posts_per_page' => 200,
-            'fields'         => 'ids',
-        ]
+function lovedoll_list_items( WP_REST_Request $request ) {
+    $fields = $request->get_param( 'fields' );
+
+    if ( ! $fields ) {
+        $query = new WP_Query(
+            [
+                'post_type'      => 'dolls',
+                'post_status'    => 'publish',
+                'posts_per_page' => 200,
+                'fields'         => 'ids',
+            ]
+        );
+
+        $items = [];
+        foreach ( $query->posts as $post_id ) {
+            $items[] = lovedoll_build_product_payload( $post_id );
+        }
+
+        return $items;
+    }
+
+    return lovedoll_list_product_urls(
+        'hash' === $fields ? 'hash' : 'url',
+        absint( $request->get_param( 'cursor' ) ),
+        absint( $request->get_param( 'per_page' ) ),
+        $request->get_param( 'modified_since' )
     );
+}
+
+/**
+ * Compact keyset-paginated listing of product URLs (or URL hashes).
+ *
+ * Reads post IDs, URLs and URL hashes from the product table's primary key instead of
+ * building a full payload per post, so the cost per page stays flat as the catalog grows.
+ * Until the table backfill has finished, `_product_url` is read through a postmeta join.
+ *
+ * @param string      $mode           'url' or 'hash'.
+ * @param int         $cursor         Return posts with an ID greater than this.
+ * @param int         $per_page       Page size (clamped to 1..LOVEDOLL_LIST_MAX_PER_PAGE).
+ * @param string|null $modified_since Only include posts modified at or after this time (GMT).
+ * @return array|WP_Error
+ */
+function lovedoll_list_product_urls( $mode, $cursor, $per_page, $modified_since = null ) {
+    global $wpdb;
+
+    if ( $per_page < 1 ) {
+        $per_page = LOVEDOLL_LIST_DEFAULT_PER_PAGE;
+    }
+    $per_page = min( $per_page, LOVEDOLL_LIST_MAX_PER_PAGE );
+
+    $modified_clause = '';
+    if ( $modified_since ) {
+        $timestamp = is_numeric( $modified_since ) ? (int) $modified_since : strtotime( $modified_since );
+        if ( false === $timestamp ) {
+            return new WP_Error( 'invalid_params', 'modified_since must be a date or UNIX timestamp', [ 'status' => 400 ] );
+        }
+        $modified_clause = $wpdb->prepare( ' AND p.post_modified_gmt >= %s', gmdate( 'Y-m-d H:i:s', $timestamp ) );
+    }
+
+    if ( lovedoll_products_table_ready() ) {
+        $table = lovedoll_products_table();
+        // phpcs:ignore WordPress.DB.PreparedSQL.InterpolatedNotPrepared -- $modified_clause is prepared above.
+        $rows = $wpdb->get_results(
+            $wpdb->prepare(
+                "SELECT t.post_id AS ID, t.product_url, t.url_hash
+                FROM {$table} t
+                INNER JOIN {$wpdb->posts} p ON p.ID = t.post_id
+                WHERE p.post_status = 'publish' AND t.post_id > %d{$modified_clause}
+                ORDER BY t.post_id ASC
+                LIMIT %d",
+                $cursor,
+                $per_page
+            )
+        );
+    } else {
+        // phpcs:ignore WordPress.DB.PreparedSQL.InterpolatedNotPrepared -- $modified_clause is prepared above.
+        $rows = $wpdb->get_results(
+            $wpdb->prepare(
+                "SELECT p.ID, pm.meta_value AS product_url
+                FROM {$wpdb->posts} p
+                INNER JOIN {$wpdb->postmeta} pm ON pm.post_id = p.ID AND pm.meta_key = '_product_url'
+                WHERE p.post_type = 'dolls' AND p.post_status = 'publish' AND p.ID > %d{$modified_clause}
+                ORDER BY p.ID ASC
+                LIMIT %d",
+                $cursor,
+                $per_page
+            )
+        );
+    }
 
     $items = [];
-    foreach ( $query->posts as $post_id ) {
-        $items[] = lovedoll_build_product_payload( $post_id );
+    foreach ( $rows as $row ) {
+        $item = [ 'id' => (int) $row->ID ];
+        if ( 'hash' === $mode ) {
+            $item['url_hash'] = isset( $row->url_hash ) ? $row->url_hash : sha1( $row->product_url );
+        } else {
+            $item['product_url'] = $row->product_url;
+        }
+        $items[] = $item;
     }
 
-    return $items;
+    $last = end( $rows );
+
+    return [
+        'items'       => $items,
+        'next_cursor' => ( count( $rows ) === $per_page && $last ) ? (int) $last->ID : null,
+    ];
 }
 
 /**
- * REST callback: ingest a product item.
+ * Point a product post at its image: reuse a known attachment or queue a sideload job.
+ *
+ * @param int         $post_id
+ * @param string      $image_src     Source image URL.
+ * @param string      $image_sha256  Content hash sent by the scraper ('' when unknown).
+ * @param string      $image_name    File name for uploaded bytes.
+ * @param array|null  $image_file    Uploaded file array (multipart `image` part).
+ * @param string|null $image_content Base64 image bytes.
  */
-function lovedoll_add_item( WP_REST_Request $request ) {
-    $title         = sanitize_text_field( $request->get_param( 'title' ) );
-    $raw_price     = $request->get_param( 'price' );
-    $image_src     = esc_url_raw( $request->get_param( 'image_url' ) );
-    $product_url   = esc_url_raw( $request->get_param( 'product_url' ) );
-    $image_content = $request->get_param( 'image_content' );
-    $image_name    = sanitize_file_name( $request->get_param( 'image_name' ) );
+function lovedoll_set_item_image( $post_id, $image_src, $image_sha256, $image_name, $image_file, $image_content ) {
+    // Reuse an attachment that already holds this image (same content hash or source URL).
+    $existing_image = lovedoll_find_image_attachment( $image_sha256, $image_src );
+    if ( $existing_image ) {
+        set_post_thumbnail( $post_id, $existing_image );
+        update_post_meta( $post_id, '_final_image_url', wp_get_attachment_url( $existing_image ) );
+        update_post_meta( $post_id, '_image_status', 'done' );
+        return;
+    }
+
+    // Keep image bytes sent by the scraper for the background job; request temp files do not survive.
+    $job = [
+        'source_url' => $image_src,
+        'file'       => '',
+        'name'       => $image_name,
+    ];
+
+    if ( $image_file ) {
+        $job['file'] = lovedoll_spool_uploaded_image( $image_file );
+        if ( ! $job['name'] && isset( $image_file['name'] ) ) {
+            $job['name'] = sanitize_file_name( $image_file['name'] );
+        }
+    } elseif ( $image_content ) {
+        $decoded = base64_decode( $image_content );
+        if ( false !== $decoded ) {
+            $job['file'] = lovedoll_spool_image_bytes( $decoded );
+        }
+    }
+
+    // Until the sideload finishes, the source image URL stands in for the media URL.
+    update_post_meta( $post_id, '_final_image_url', $image_src );
+    lovedoll_queue_image_job( $post_id, $job );
+}
+
+/**
+ * Write the fields of an existing product that differ from a re-scraped item.
+ *
+ * Called only when the item's content hash differs from the stored one, so a daily
+ * re-sync of a whole catalog costs one meta read per unchanged product.
+ *
+ * @param int    $post_id
+ * @param array  $item         Sanitized item: title, price, image_url, image_sha256, image_name,
+ *                             image_file, image_content.
+ * @param string $content_hash New content hash, stored once the fields are written.
+ * @return string[] Names of the changed fields ('title', 'price', 'image').
+ */
+function lovedoll_update_item( $post_id, array $item, $content_hash ) {
+    $changed = [];
+
+    // Saving a post runs the title through kses, which stores `&` as `&amp;`; decode
+    // both sides so an unchanged title is not rewritten on every re-sync.
+    $stored_title = wp_specialchars_decode( get_post_field( 'post_title', $post_id, 'raw' ), ENT_QUOTES );
+    if ( wp_specialchars_decode( $item['title'], ENT_QUOTES ) !== $stored_title ) {
+        wp_update_post(
+            [
+                'ID'         => $post_id,
+                'post_title' => $item['title'],
+            ]
+        );
+        $changed[] = 'title';
+    }
+
+    if ( (int) get_post_meta( $post_id, '_price', true ) !== $item['price'] ) {
+        update_post_meta( $post_id, '_price', $item['price'] );
+        $changed[] = 'price';
+    }
+
+    if ( get_post_meta( $post_id, '_source_image_url', true ) !== $item['image_url'] ) {
+        update_post_meta( $post_id, '_source_image_url', $item['image_url'] );
+        lovedoll_set_item_image(
+            $post_id,
+            $item['image_url'],
+            $item['image_sha256'],
+            $item['image_name'],
+            $item['image_file'],
+            $item['image_content']
+        );
+        $changed[] = 'image';
+    }
+
+    update_post_meta( $post_id, '_content_hash', $content_hash );
+    if ( $changed ) {
+        lovedoll_sync_product_row( $post_id );
+    }
+
+    return $changed;
+}
+
+/**
+ * Create (or find) a product post from raw item fields.
+ *
+ * Shared by the single and batch ingest endpoints.
+ *
+ * @param array       $params Item fields (title, price, image_url, product_url, image_content, image_name,
+ *                            image_file, image_sha256, content_hash). `image_file` is an uploaded file
+ *                            array (see lovedoll_add_item()); `image_sha256` lets a scraper reference an
+ *                            image the media library already holds without sending it again;
+ *                            `content_hash` turns a duplicate product URL into an upsert.
+ * @param string|null $result Set to 'created', 'updated', 'unchanged' or (without a content hash)
+ *                            'exists' on success.
+ * @return array|WP_Error Product payload on success.
+ */
+function lovedoll_ingest_item( array $params, &$result = null ) {
+    $params = wp_parse_args(
+        $params,
+        [
+            'title'         => '',
+            'price'         => null,
+            'image_url'     => '',
+            'product_url'   => '',
+            'image_content' => null,
+            'image_name'    => '',
+            'image_file'    => null,
+            'image_sha256'  => '',
+            'content_hash'  => '',
+        ]
+    );
+
+    $title         = sanitize_text_field( $params['title'] );
+    $raw_price     = $params['price'];
+    $image_src     = esc_url_raw( $params['image_url'] );
+    $product_url   = esc_url_raw( $params['product_url'] );
+    $image_content = $params['image_content'];
+    $image_name    = sanitize_file_name( $params['image_name'] );
+    $image_file    = is_array( $params['image_file'] ) ? $params['image_file'] : null;
+    $image_sha256  = strtolower( (string) $params['image_sha256'] );
+    if ( ! preg_match( '/^[0-9a-f]{64}$/', $image_sha256 ) ) {
+        $image_sha256 = '';
+    }
+    $content_hash = strtolower( (string) $params['content_hash'] );
+    if ( ! preg_match( '/^[0-9a-f]{64}$/', $content_hash ) ) {
+        $content_hash = '';
+    }
 
     $price = lovedoll_normalize_price( $raw_price );
 
@@ -136,23 +752,36 @@ function lovedoll_add_item( WP_REST_Request $request ) {
         return new WP_Error( 'price_too_high', 'Price is 1,000,000 or higher; skipped.', [ 'status' => 422 ] );
     }
 
-    // Deduplicate by product_url.
-    $existing = new WP_Query(
-        [
-            'post_type'  => 'dolls',
-            'meta_query' => [
-                [
-                    'key'   => '_product_url',
-                    'value' => $product_url,
-                ],
-            ],
-            'fields'     => 'ids',
-        ]
-    );
+    // Deduplicate by product_url (unique url_hash key in the product table).
+    $existing_id = lovedoll_find_product_by_url( $product_url );
+    if ( $existing_id ) {
+        if ( ! $content_hash ) {
+            // Clients that send no hash keep the return-existing behaviour.
+            $result = 'exists';
+            return lovedoll_build_product_payload( $existing_id );
+        }
+
+        // Unchanged since the last sync: nothing is written.
+        if ( hash_equals( (string) get_post_meta( $existing_id, '_content_hash', true ), $content_hash ) ) {
+            $result = 'unchanged';
+            return lovedoll_build_product_payload( $existing_id );
+        }
 
-    if ( $existing->have_posts() ) {
-        $post_id = $existing->posts[0];
-        return lovedoll_build_product_payload( $post_id );
+        $changed = lovedoll_update_item(
+            $existing_id,
+            [
+                'title'         => $title,
+                'price'         => $price,
+                'image_url'     => $image_src,
+                'image_sha256'  => $image_sha256,
+                'image_name'    => $image_name,
+                'image_file'    => $image_file,
+                'image_content' => $image_content,
+            ],
+            $content_hash
+        );
+        $result = $changed ? 'updated' : 'unchanged';
+        return lovedoll_build_product_payload( $existing_id );
     }
 
     // Create the post first.
@@ -174,64 +803,155 @@ function lovedoll_add_item( WP_REST_Request $request ) {
     update_post_meta( $post_id, '_price', $price );
     update_post_meta( $post_id, '_source_image_url', $image_src );
 
-    // Handle image sideloading with kuma-doll hotlink protection.
-    require_once ABSPATH . 'wp-admin/includes/file.php';
-    require_once ABSPATH . 'wp-admin/includes/media.php';
-    require_once ABSPATH . 'wp-admin/includes/image.php';
+    if ( $content_hash ) {
+        update_post_meta( $post_id, '_content_hash', $content_hash );
+    }
 
-    $final_image_url = $image_src;
-    $thumbnail_id    = null;
+    lovedoll_set_item_image( $post_id, $image_src, $image_sha256, $image_name, $image_file, $image_content );
 
-    // Prefer direct binary provided by scraper (base64-encoded image_content).
-    if ( $image_content ) {
-        $decoded = base64_decode( $image_content );
-        if ( false !== $decoded ) {
-            $tmp = wp_tempnam( $image_name ? $image_name : 'kuma-image' );
-            if ( $tmp && false !== file_put_contents( $tmp, $decoded ) ) {
-                $filetype = wp_check_filetype( $image_name );
-                $file     = [
-                    'name'     => $image_name ? $image_name : 'kuma-image.webp',
-                    'type'     => $filetype && $filetype['type'] ? $filetype['type'] : 'image/webp',
-                    'tmp_name' => $tmp,
-                    'error'    => 0,
-                    'size'     => filesize( $tmp ),
-                ];
-
-                $attachment_id = media_handle_sideload( $file, $post_id, $title, 'id' );
-                @unlink( $tmp );
+    // Write the table row now (not at shutdown) so a duplicate later in the same batch is caught.
+    lovedoll_sync_product_row( $post_id );
 
-                if ( ! is_wp_error( $attachment_id ) ) {
-                    $thumbnail_id    = $attachment_id;
-                    $final_image_url = wp_get_attachment_url( $attachment_id );
-                }
-            }
-        }
+    $result = 'created';
+    return lovedoll_build_product_payload( $post_id );
+}
+
+/**
+ * REST callback: ingest a product item.
+ *
+ * Accepts JSON or multipart/form-data; in the latter case the image may be sent as the
+ * `image` file part instead of base64 `image_content`. The product payload carries a
+ * `result` key (created, updated, unchanged or exists).
+ */
+function lovedoll_add_item( WP_REST_Request $request ) {
+    $params = $request->get_params();
+    unset( $params['image_file'] );
+
+    $files = $request->get_file_params();
+    if ( ! empty( $files['image'] ) ) {
+        $params['image_file'] = $files['image'];
     }
 
-    // If binary was not supplied or failed, fall back to fetching by URL.
-    if ( ! $thumbnail_id ) {
-        if ( false !== strpos( $image_src, 'kuma-doll.com' ) ) {
-            $saved = lid_fetch_image_with_referer( $image_src, $title );
-            if ( $saved ) {
-                $final_image_url = $saved;
-                $thumbnail_id    = attachment_url_to_postid( $saved );
-            }
-        } else {
-            $attachment_id = media_sideload_image( $image_src, $post_id, $title, 'id' );
-            if ( ! is_wp_error( $attachment_id ) ) {
-                $thumbnail_id    = $attachment_id;
-                $final_image_url = wp_get_attachment_url( $attachment_id );
+    $result  = null;
+    $payload = lovedoll_ingest_item( $params, $result );
+    if ( ! is_wp_error( $payload ) ) {
+        $payload['result'] = $result;
+    }
+    return $payload;
+}
+
+/**
+ * REST callback: ingest several product items in one request.
+ *
+ * Accepts a JSON array of items (or { "items": [...] }) and returns one result per item,
+ * in input order, so a crawl pays the WordPress bootstrap once per batch instead of per item.
+ * As multipart/form-data, `items` is a JSON-encoded field and the image for item N is the
+ * `image_N` file part.
+ */
+function lovedoll_add_items( WP_REST_Request $request ) {
+    $items = $request->get_json_params();
+    if ( null === $items && is_string( $request->get_param( 'items' ) ) ) {
+        $items = json_decode( $request->get_param( 'items' ), true );
+    }
+    if ( is_array( $items ) && isset( $items['items'] ) ) {
+        $items = $items['items'];
+    }
+
+    if ( ! is_array( $items ) || ! $items ) {
+        return new WP_Error( 'invalid_params', 'A non-empty JSON array of items is required', [ 'status' => 400 ] );
+    }
+
+    if ( count( $items ) > LOVEDOLL_MAX_BATCH_ITEMS ) {
+        return new WP_Error(
+            'batch_too_large',
+            sprintf( 'At most %d items can be sent per request', LOVEDOLL_MAX_BATCH_ITEMS ),
+            [ 'status' => 413 ]
+        );
+    }
+
+    $files   = $request->get_file_params();
+    $results = [];
+    foreach ( array_values( $items ) as $index => $item ) {
+        if ( is_array( $item ) ) {
+            unset( $item['image_file'] );
+            if ( ! empty( $files[ 'image_' . $index ] ) ) {
+                $item['image_file'] = $files[ 'image_' . $index ];
             }
         }
+
+        $result  = null;
+        $payload = is_array( $item ) ? lovedoll_ingest_item( $item, $result ) : new WP_Error( 'invalid_params', 'Item must be an object' );
+
+        if ( is_wp_error( $payload ) ) {
+            $results[] = [
+                'index'  => $index,
+                'result' => 'error',
+                'id'     => null,
+                'error'  => $payload->get_error_message(),
+            ];
+            continue;
+        }
+
+        $results[] = [
+            'index'  => $index,
+            'result' => $result,
+            'id'     => $payload['id'],
+            'error'  => null,
+            'item'   => $payload,
+        ];
     }
 
-    if ( $thumbnail_id && ! is_wp_error( $thumbnail_id ) ) {
-        set_post_thumbnail( $post_id, $thumbnail_id );
+    return [ 'results' => $results ];
+}
+
+/**
+ * REST callback: report image sideload status for product posts.
+ *
+ *   GET /wp-json/lovedoll/v1/image-status?ids=12,13
+ *   => { "items": [ { "id": 12, "image_status": "done", "image_url": "https://..." }, ... ] }
+ *
+ * Unknown IDs are reported with status `unknown`.
+ */
+function lovedoll_image_status( WP_REST_Request $request ) {
+    $ids = array_values( array_unique( array_filter( array_map( 'absint', wp_parse_list( $request->get_param( 'ids' ) ) ) ) ) );
+    if ( ! $ids ) {
+        return new WP_Error( 'invalid_params', 'ids is required', [ 'status' => 400 ] );
+    }
+    if ( count( $ids ) > LOVEDOLL_IMAGE_STATUS_MAX_IDS ) {
+        return new WP_Error(
+            'too_many_ids',
+            sprintf( 'At most %d ids can be queried per request', LOVEDOLL_IMAGE_STATUS_MAX_IDS ),
+            [ 'status' => 400 ]
+        );
     }
 
-    update_post_meta( $post_id, '_final_image_url', $final_image_url );
+    $items   = [];
+    $pending = false;
+    foreach ( $ids as $post_id ) {
+        if ( 'dolls' !== get_post_type( $post_id ) ) {
+            $items[] = [
+                'id'           => $post_id,
+                'image_status' => 'unknown',
+                'image_url'    => null,
+            ];
+            continue;
+        }
 
-    return lovedoll_build_product_payload( $post_id );
+        $status  = lovedoll_get_image_status( $post_id );
+        $pending = $pending || 'pending' === $status;
+        $items[] = [
+            'id'           => $post_id,
+            'image_status' => $status,
+            'image_url'    => get_post_meta( $post_id, '_final_image_url', true ),
+        ];
+    }
+
+    // Polling clients keep the queue moving even if a cron event was lost.
+    if ( $pending ) {
+        lovedoll_schedule_image_jobs();
+    }
+
+    return [ 'items' => $items ];
 }
 
 /**
@@ -248,6 +968,26 @@ function lovedoll_register_product_routes() {
         ]
     );
 
+    register_rest_route(
+        'lovedoll/v1',
+        '/add-items',
+        [
+            'methods'             => WP_REST_Server::CREATABLE,
+            'callback'            => 'lovedoll_add_items',
+            'permission_callback' => '__return_true',
+        ]
+    );
+
+    register_rest_route(
+        'lovedoll/v1',
+        '/image-status',
+        [
+            'methods'             => WP_REST_Server::READABLE,
+            'callback'            => 'lovedoll_image_status',
+            'permission_callback' => '__return_true',
+        ]
+    );
+
     register_rest_route(
         'lovedoll/v1',
         '/list',
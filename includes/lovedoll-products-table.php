@@ -0,0 +1,426 @@
+<?php
+/**
+ * Indexed lookup tables for ingested products ({$wpdb->prefix}lovedoll_products) and
+ * their media ({$wpdb->prefix}lovedoll_images).
+ *
+ * One row per `dolls` post with the SHA-1 of its product URL, price, final image URL and
+ * source shop. Dedupe in add-item becomes a unique-key lookup instead of a `meta_value`
+ * scan over wp_postmeta, and the compact `list` endpoint pages through the primary key.
+ *
+ * - The table is created (and upgraded) with dbDelta() whenever LOVEDOLL_PRODUCTS_DB_VERSION changes.
+ * - Rows are kept in sync when product meta changes and removed when a post is deleted.
+ * - Existing posts are backfilled in batches by a WP-Cron event.
+ * - When two posts share a product URL only one is indexed; the other is reported with error_log().
+ *
+ * The image table maps each sideloaded attachment to the SHA-256 of its bytes and the SHA-1
+ * of its source URL, so images already in the media library are found through an index
+ * rather than a `meta_value` scan. Existing attachments are copied from their
+ * `_lovedoll_image_sha256` / `_lovedoll_source_url` meta when the table is created.
+ */
+
+if ( ! defined( 'ABSPATH' ) ) {
+    exit;
+}
+
+if ( ! defined( 'LOVEDOLL_PRODUCTS_DB_VERSION' ) ) {
+    define( 'LOVEDOLL_PRODUCTS_DB_VERSION', '2' );
+}
+if ( ! defined( 'LOVEDOLL_PRODUCTS_BACKFILL_BATCH' ) ) {
+    define( 'LOVEDOLL_PRODUCTS_BACKFILL_BATCH', 500 );
+}
+
+/**
+ * Product meta keys mirrored into the table.
+ */
+function lovedoll_products_table_meta_keys() {
+    return [ '_product_url', '_price', '_final_image_url' ];
+}
+
+/**
+ * Full name of the product table.
+ *
+ * @return string
+ */
+function lovedoll_products_table() {
+    global $wpdb;
+
+    return $wpdb->prefix . 'lovedoll_products';
+}
+
+/**
+ * Full name of the image table.
+ *
+ * @return string
+ */
+function lovedoll_images_table() {
+    global $wpdb;
+
+    return $wpdb->prefix . 'lovedoll_images';
+}
+
+/**
+ * Create or upgrade the lookup tables and start the backfills when the schema version changes.
+ */
+function lovedoll_products_table_install() {
+    if ( get_option( 'lovedoll_products_db_version' ) === LOVEDOLL_PRODUCTS_DB_VERSION ) {
+        return;
+    }
+
+    global $wpdb;
+    require_once ABSPATH . 'wp-admin/includes/upgrade.php';
+
+    $table           = lovedoll_products_table();
+    $charset_collate = $wpdb->get_charset_collate();
+
+    dbDelta(
+        "CREATE TABLE {$table} (
+            post_id bigint(20) unsigned NOT NULL,
+            url_hash char(40) NOT NULL,
+            product_url text NOT NULL,
+            price int(10) unsigned DEFAULT NULL,
+            image_url text,
+            source_shop varchar(100) NOT NULL DEFAULT '',
+            updated_at datetime NOT NULL,
+            PRIMARY KEY  (post_id),
+            UNIQUE KEY url_hash (url_hash),
+            KEY price (price),
+            KEY source_shop_price (source_shop,price)
+        ) {$charset_collate};"
+    );
+
+    $images = lovedoll_images_table();
+    dbDelta(
+        "CREATE TABLE {$images} (
+            attachment_id bigint(20) unsigned NOT NULL,
+            sha256 char(64) NOT NULL DEFAULT '',
+            source_url_hash char(40) NOT NULL DEFAULT '',
+            PRIMARY KEY  (attachment_id),
+            KEY sha256 (sha256),
+            KEY source_url_hash (source_url_hash)
+        ) {$charset_collate};"
+    );
+    lovedoll_images_table_backfill();
+
+    update_option( 'lovedoll_products_db_version', LOVEDOLL_PRODUCTS_DB_VERSION );
+    update_option( 'lovedoll_products_backfill_cursor', 0, false );
+    delete_option( 'lovedoll_products_backfilled' );
+
+    if ( ! wp_next_scheduled( 'lovedoll_products_backfill' ) ) {
+        wp_schedule_single_event( time(), 'lovedoll_products_backfill' );
+    }
+}
+add_action( 'init', 'lovedoll_products_table_install' );
+
+/**
+ * Whether every existing product post has been copied into the table.
+ *
+ * @return bool
+ */
+function lovedoll_products_table_ready() {
+    return get_option( 'lovedoll_products_backfilled' ) === LOVEDOLL_PRODUCTS_DB_VERSION;
+}
+
+/**
+ * Shop identifier for a product URL (host without "www.", e.g. "sweet-doll.com").
+ *
+ * @param string $product_url
+ * @return string
+ */
+function lovedoll_product_source_shop( $product_url ) {
+    $host = strtolower( (string) wp_parse_url( $product_url, PHP_URL_HOST ) );
+
+    return preg_replace( '/^www\./', '', $host );
+}
+
+/**
+ * Write the table row for a product post from its meta (or remove it when the post has no URL).
+ *
+ * @param int $post_id
+ */
+function lovedoll_sync_product_row( $post_id ) {
+    global $wpdb;
+
+    $post_id = (int) $post_id;
+    unset( $GLOBALS['lovedoll_dirty_products'][ $post_id ] );
+
+    if ( 'dolls' !== get_post_type( $post_id ) ) {
+        return;
+    }
+
+    $product_url = get_post_meta( $post_id, '_product_url', true );
+    if ( ! $product_url ) {
+        $wpdb->delete( lovedoll_products_table(), [ 'post_id' => $post_id ], [ '%d' ] );
+        return;
+    }
+
+    $table    = lovedoll_products_table();
+    $url_hash = sha1( $product_url );
+    $owner    = (int) $wpdb->get_var( $wpdb->prepare( "SELECT post_id FROM {$table} WHERE url_hash = %s", $url_hash ) );
+
+    if ( $owner && $owner !== $post_id && lovedoll_product_row_keeps_url( $owner, $post_id, $product_url ) ) {
+        // url_hash is unique: keep the row of the post that already has it and report the duplicate.
+        error_log( sprintf( 'lovedoll_products: post %d has the same product URL as post %d and is not indexed: %s', $post_id, $owner, $product_url ) );
+        $wpdb->delete( $table, [ 'post_id' => $post_id ], [ '%d' ] );
+        return;
+    }
+
+    $price = get_post_meta( $post_id, '_price', true );
+
+    // REPLACE also clears a stale row that still claims this URL for another post.
+    $wpdb->replace(
+        $table,
+        [
+            'post_id'     => $post_id,
+            'url_hash'    => $url_hash,
+            'product_url' => $product_url,
+            'price'       => '' === $price ? null : (int) $price,
+            'image_url'   => get_post_meta( $post_id, '_final_image_url', true ),
+            'source_shop' => lovedoll_product_source_shop( $product_url ),
+            'updated_at'  => current_time( 'mysql', true ),
+        ],
+        [ '%d', '%s', '%s', '%d', '%s', '%s', '%s' ]
+    );
+}
+
+/**
+ * Whether the post that owns a URL's table row should keep it over another post with the same URL.
+ *
+ * The owner keeps the row while it still has that URL, unless it is no longer published and
+ * the other post is. A row whose post has moved to another URL is stale and can be replaced.
+ *
+ * @param int    $owner_id    Post ID currently stored for the URL hash.
+ * @param int    $post_id     Post being synced.
+ * @param string $product_url
+ * @return bool
+ */
+function lovedoll_product_row_keeps_url( $owner_id, $post_id, $product_url ) {
+    if ( get_post_meta( $owner_id, '_product_url', true ) !== $product_url ) {
+        return false;
+    }
+
+    return 'publish' === get_post_status( $owner_id ) || 'publish' !== get_post_status( $post_id );
+}
+
+/**
+ * Meta hook: remember product posts whose mirrored meta changed; rows are written at shutdown.
+ *
+ * @param int    $meta_id
+ * @param int    $post_id
+ * @param string $meta_key
+ */
+function lovedoll_mark_product_dirty( $meta_id, $post_id, $meta_key ) {
+    if ( in_array( $meta_key, lovedoll_products_table_meta_keys(), true ) ) {
+        $GLOBALS['lovedoll_dirty_products'][ (int) $post_id ] = true;
+    }
+}
+add_action( 'added_post_meta', 'lovedoll_mark_product_dirty', 10, 3 );
+add_action( 'updated_post_meta', 'lovedoll_mark_product_dirty', 10, 3 );
+add_action( 'deleted_post_meta', 'lovedoll_mark_product_dirty', 10, 3 );
+
+/**
+ * Write table rows for all product posts changed during this request.
+ */
+function lovedoll_flush_dirty_products() {
+    if ( empty( $GLOBALS['lovedoll_dirty_products'] ) ) {
+        return;
+    }
+    foreach ( array_keys( $GLOBALS['lovedoll_dirty_products'] ) as $post_id ) {
+        lovedoll_sync_product_row( $post_id );
+    }
+}
+add_action( 'shutdown', 'lovedoll_flush_dirty_products' );
+
+/**
+ * Remove the table row when a product post is deleted.
+ *
+ * @param int $post_id
+ */
+function lovedoll_delete_product_row( $post_id ) {
+    global $wpdb;
+
+    unset( $GLOBALS['lovedoll_dirty_products'][ (int) $post_id ] );
+    $wpdb->delete( lovedoll_products_table(), [ 'post_id' => (int) $post_id ], [ '%d' ] );
+}
+add_action( 'deleted_post', 'lovedoll_delete_product_row' );
+
+/**
+ * Find the published product post for a product URL.
+ *
+ * Uses the url_hash unique key; until the backfill has finished, URLs that are not in
+ * the table yet are looked up through post meta as before.
+ *
+ * @param string $product_url
+ * @return int Post ID, or 0 when the product is unknown.
+ */
+function lovedoll_find_product_by_url( $product_url ) {
+    global $wpdb;
+
+    $table   = lovedoll_products_table();
+    $post_id = (int) $wpdb->get_var(
+        $wpdb->prepare(
+            "SELECT t.post_id
+            FROM {$table} t
+            INNER JOIN {$wpdb->posts} p ON p.ID = t.post_id AND p.post_status = 'publish'
+            WHERE t.url_hash = %s",
+            sha1( $product_url )
+        )
+    );
+
+    if ( $post_id || lovedoll_products_table_ready() ) {
+        return $post_id;
+    }
+
+    $existing = new WP_Query(
+        [
+            'post_type'      => 'dolls',
+            'meta_query'     => [
+                [
+                    'key'   => '_product_url',
+                    'value' => $product_url,
+                ],
+            ],
+            'fields'         => 'ids',
+            'posts_per_page' => 1,
+            'no_found_rows'  => true,
+        ]
+    );
+
+    return $existing->posts ? (int) $existing->posts[0] : 0;
+}
+
+/**
+ * Read the table row for a product post.
+ *
+ * @param int $post_id
+ * @return array|null Associative row, or null when the post is not in the table.
+ */
+function lovedoll_get_product_row( $post_id ) {
+    global $wpdb;
+
+    $table = lovedoll_products_table();
+    $row   = $wpdb->get_row( $wpdb->prepare( "SELECT * FROM {$table} WHERE post_id = %d", $post_id ), ARRAY_A );
+
+    return $row ? $row : null;
+}
+
+/**
+ * Copy the image meta of existing attachments into the image table.
+ *
+ * Runs once per schema change as two set-based queries over the meta_key index.
+ */
+function lovedoll_images_table_backfill() {
+    global $wpdb;
+
+    $images = lovedoll_images_table();
+    $wpdb->query(
+        "INSERT IGNORE INTO {$images} (attachment_id, sha256)
+        SELECT post_id, LEFT(meta_value, 64) FROM {$wpdb->postmeta} WHERE meta_key = '_lovedoll_image_sha256'"
+    );
+    $wpdb->query(
+        "INSERT INTO {$images} (attachment_id, source_url_hash)
+        SELECT post_id, SHA1(meta_value) FROM {$wpdb->postmeta} WHERE meta_key = '_lovedoll_source_url'
+        ON DUPLICATE KEY UPDATE source_url_hash = VALUES(source_url_hash)"
+    );
+}
+
+/**
+ * Record the content hash and source URL of a sideloaded attachment.
+ *
+ * @param int    $attachment_id
+ * @param string $sha256     SHA-256 of the image bytes.
+ * @param string $source_url URL the image was fetched from (may be empty).
+ */
+function lovedoll_save_image_row( $attachment_id, $sha256, $source_url = '' ) {
+    global $wpdb;
+
+    $wpdb->replace(
+        lovedoll_images_table(),
+        [
+            'attachment_id'   => (int) $attachment_id,
+            'sha256'          => (string) $sha256,
+            'source_url_hash' => $source_url ? sha1( $source_url ) : '',
+        ],
+        [ '%d', '%s', '%s' ]
+    );
+}
+
+/**
+ * Find an attachment that already holds an image, by content hash or source URL.
+ *
+ * @param string $sha256     SHA-256 of the image bytes (may be empty).
+ * @param string $source_url URL the image was originally fetched from (may be empty).
+ * @return int Attachment ID, or 0 when none matches.
+ */
+function lovedoll_find_image_attachment( $sha256, $source_url = '' ) {
+    global $wpdb;
+
+    $images = lovedoll_images_table();
+    $keys   = [
+        'sha256'          => $sha256,
+        'source_url_hash' => $source_url ? sha1( $source_url ) : '',
+    ];
+
+    foreach ( $keys as $column => $value ) {
+        if ( ! $value ) {
+            continue;
+        }
+        // phpcs:ignore WordPress.DB.PreparedSQL.InterpolatedNotPrepared -- $column is one of the fixed keys above.
+        $attachment_id = $wpdb->get_var(
+            $wpdb->prepare(
+                "SELECT i.attachment_id
+                FROM {$images} i
+                INNER JOIN {$wpdb->posts} p ON p.ID = i.attachment_id AND p.post_type = 'attachment'
+                WHERE i.{$column} = %s
+                LIMIT 1",
+                $value
+            )
+        );
+        if ( $attachment_id ) {
+            return (int) $attachment_id;
+        }
+    }
+
+    return 0;
+}
+
+/**
+ * Remove the image row when an attachment is deleted.
+ *
+ * @param int $attachment_id
+ */
+function lovedoll_delete_image_row( $attachment_id ) {
+    global $wpdb;
+
+    $wpdb->delete( lovedoll_images_table(), [ 'attachment_id' => (int) $attachment_id ], [ '%d' ] );
+}
+add_action( 'delete_attachment', 'lovedoll_delete_image_row' );
+
+/**
+ * WP-Cron callback: copy existing product posts into the table in ID order.
+ */
+function lovedoll_products_backfill() {
+    global $wpdb;
+
+    $cursor = (int) get_option( 'lovedoll_products_backfill_cursor', 0 );
+    $ids    = $wpdb->get_col(
+        $wpdb->prepare(
+            "SELECT ID FROM {$wpdb->posts} WHERE post_type = 'dolls' AND ID > %d ORDER BY ID ASC LIMIT %d",
+            $cursor,
+            LOVEDOLL_PRODUCTS_BACKFILL_BATCH
+        )
+    );
+
+    foreach ( $ids as $post_id ) {
+        lovedoll_sync_product_row( $post_id );
+    }
+
+    if ( count( $ids ) < LOVEDOLL_PRODUCTS_BACKFILL_BATCH ) {
+        update_option( 'lovedoll_products_backfilled', LOVEDOLL_PRODUCTS_DB_VERSION );
+        delete_option( 'lovedoll_products_backfill_cursor' );
+        return;
+    }
+
+    update_option( 'lovedoll_products_backfill_cursor', (int) end( $ids ), false );
+    wp_schedule_single_event( time(), 'lovedoll_products_backfill' );
+}
+add_action( 'lovedoll_products_backfill', 'lovedoll_products_backfill' );
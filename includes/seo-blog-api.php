@@ -23,9 +23,20 @@ function lovedoll_register_seo_blog_routes() {
 }
 add_action( 'rest_api_init', 'lovedoll_register_seo_blog_routes' );
 
+/**
+ * How long an idempotency key maps to the post it created.
+ */
+if ( ! defined( 'LOVEDOLL_BLOG_IDEMPOTENCY_TTL' ) ) {
+    define( 'LOVEDOLL_BLOG_IDEMPOTENCY_TTL', DAY_IN_SECONDS );
+}
+
 /**
  * Create a new blog post
  * 
+ * A request carrying an `idempotency_key` that already created a post (e.g. a client
+ * retry after a timeout) gets that post back instead of inserting a duplicate. The key
+ * is stored as a transient, so the lookup is an indexed read on the options table.
+ * 
  * @param WP_REST_Request $request
  * @return WP_REST_Response
  */
@@ -40,6 +51,25 @@ function lovedoll_create_blog_post( $request ) {
         );
     }
     
+    $idempotency_key = isset( $params['idempotency_key'] ) ? preg_replace( '/[^a-f0-9]/', '', strtolower( (string) $params['idempotency_key'] ) ) : '';
+    $transient       = $idempotency_key ? 'lovedoll_blog_' . substr( $idempotency_key, 0, 64 ) : '';
+    if ( $transient ) {
+        $existing_id = (int) get_transient( $transient );
+        if ( $existing_id && get_post( $existing_id ) ) {
+            return new WP_REST_Response(
+                array(
+                    'success'   => true,
+                    'post_id'   => $existing_id,
+                    'permalink' => get_permalink( $existing_id ),
+                    'title'     => get_the_title( $existing_id ),
+                    'status'    => get_post_status( $existing_id ),
+                    'duplicate' => true,
+                ),
+                200
+            );
+        }
+    }
+    
     // Prepare post data
     $post_data = array(
         'post_title'   => sanitize_text_field( $params['title'] ),
@@ -59,6 +89,10 @@ function lovedoll_create_blog_post( $request ) {
         );
     }
     
+    if ( $transient ) {
+        set_transient( $transient, $post_id, LOVEDOLL_BLOG_IDEMPOTENCY_TTL );
+    }
+    
     // Add meta description if provided
     if ( ! empty( $params['meta_description'] ) ) {
         update_post_meta( $post_id, '_yoast_wpseo_metadesc', sanitize_text_field( $params['meta_description'] ) );
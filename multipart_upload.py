@@ -0,0 +1,150 @@
+"""
+Streaming multipart/form-data bodies for uploading product images to WordPress.
+
+Image files are read from disk in small chunks while the request is being sent,
+so an upload never holds the whole image (or a base64 copy of it) in memory.
+``MultipartStream`` is a file-like object with a known length, which lets
+``requests`` send it with a ``Content-Length`` header instead of buffering it.
+
+Usage:
+    resp = post_multipart(
+        session,
+        "https://example.com/wp-json/lovedoll/v1/add-item",
+        fields={"title": "...", "price": "123456"},
+        files={"image": ("doll.webp", "/tmp/doll.webp", "image/webp")},
+    )
+"""
+from __future__ import annotations
+
+import mimetypes
+import os
+import uuid
+from typing import BinaryIO, Dict, List, Mapping, Optional, Tuple, Union
+
+import requests
+
+CHUNK_SIZE = 64 * 1024
+
+# (filename, path on disk, content type or None to guess from the filename)
+FilePart = Tuple[str, str, Optional[str]]
+Segment = Union[bytes, str]
+
+
+def guess_content_type(filename: str, default: str = "application/octet-stream") -> str:
+    return mimetypes.guess_type(filename)[0] or default
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
+
+
+class MultipartStream:
+    """Lazily assembled multipart/form-data body (file parts are streamed from disk)."""
+
+    def __init__(self, fields: Mapping[str, object], files: Mapping[str, FilePart], boundary: Optional[str] = None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self._segments: List[Segment] = []
+        self._length = 0
+
+        for name, value in fields.items():
+            if value is None:
+                continue
+            self._add_bytes(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'.encode("utf-8")
+            )
+            self._add_bytes(str(value).encode("utf-8") + b"\r\n")
+
+        for name, (filename, path, content_type) in files.items():
+            content_type = content_type or guess_content_type(filename)
+            self._add_bytes(
+                (
+                    f"--{self.boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{_quote(name)}"; filename="{_quote(filename)}"\r\n'
+                    f"Content-Type: {content_type}\r\n\r\n"
+                ).encode("utf-8")
+            )
+            self._segments.append(path)
+            self._length += os.path.getsize(path)
+            self._add_bytes(b"\r\n")
+
+        self._add_bytes(f"--{self.boundary}--\r\n".encode("ascii"))
+
+        self._position = 0
+        self._buffer = b""
+        self._handle: Optional[BinaryIO] = None
+
+    def _add_bytes(self, data: bytes) -> None:
+        self._segments.append(data)
+        self._length += len(data)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _next_chunk(self) -> bytes:
+        while True:
+            if self._handle is not None:
+                chunk = self._handle.read(CHUNK_SIZE)
+                if chunk:
+                    return chunk
+                self._handle.close()
+                self._handle = None
+            if self._position >= len(self._segments):
+                return b""
+            segment = self._segments[self._position]
+            self._position += 1
+            if isinstance(segment, bytes):
+                return segment
+            self._handle = open(segment, "rb")
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            parts = [self._buffer]
+            self._buffer = b""
+            chunk = self._next_chunk()
+            while chunk:
+                parts.append(chunk)
+                chunk = self._next_chunk()
+            return b"".join(parts)
+
+        while len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def post_multipart(
+    session: requests.Session,
+    url: str,
+    fields: Mapping[str, object],
+    files: Mapping[str, FilePart],
+    timeout: float,
+) -> requests.Response:
+    """POST ``fields`` and on-disk ``files`` as a streamed multipart/form-data body."""
+
+    body = MultipartStream(fields, files)
+    try:
+        return session.post(url, data=body, headers={"Content-Type": body.content_type}, timeout=timeout)
+    finally:
+        body.close()
+
+
+def form_fields(item: Mapping[str, object], exclude: Tuple[str, ...] = ()) -> Dict[str, object]:
+    """Return the scalar fields of ``item`` that can be sent as form values."""
+
+    return {
+        key: value
+        for key, value in item.items()
+        if key not in exclude and value is not None and isinstance(value, (str, int, float))
+    }
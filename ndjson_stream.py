@@ -0,0 +1,245 @@
+"""
+NDJSON hand-off between scraping and posting.
+
+With ``--emit ndjson`` a scraper writes each product as one JSON line the moment it
+is extracted, instead of posting it; ``post`` reads such a stream and sends it to
+WordPress in batches. Scraping and posting can then run as separate processes
+joined by a pipe (or on different hosts), each holding only the current batch:
+
+    python scrape_to_wp.py --emit ndjson | python ndjson_stream.py post --wp-base https://freya-era.com
+    python scrape_kuma_to_wp.py --emit ndjson --output kuma.ndjson
+    python ndjson_stream.py post kuma.ndjson
+
+Every line carries the item's ``shop``. A spooled image (``image_path``, kuma-doll)
+is embedded as base64 ``image_content`` and its file removed, so each line is
+self-contained; ``post`` spools it back to disk and streams it as multipart.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import binascii
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from typing import Dict, IO, Iterable, Iterator, List, Optional
+
+from product_index import DEFAULT_INDEX_PATH, ProductIndex, open_index
+from rate_limit import DEFAULT_RATE, DomainRateLimiter, rate_limited_session
+from scraper_common import IMAGE_WAIT_DEFAULT, post_items_to_wp, wait_for_images
+from wp_client import WP_BASE_DEFAULT, WordPressClient
+
+logger = logging.getLogger(__name__)
+
+EMIT_WP = "wp"
+EMIT_NDJSON = "ndjson"
+EMIT_CHOICES = (EMIT_WP, EMIT_NDJSON)
+STDIO = "-"
+BATCH_SIZE_DEFAULT = 10
+
+
+class NdjsonWriter:
+    """Thread-safe writer of one JSON object per line, flushed after every item."""
+
+    def __init__(self, output: str = STDIO):
+        self.output = output
+        self._owns_stream = output != STDIO
+        self._stream: IO[str] = open(output, "w", encoding="utf-8") if self._owns_stream else sys.stdout
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self) -> "NdjsonWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, item: Dict[str, object], shop: str) -> None:
+        """Write ``item`` as one line; a spooled image is embedded and its file deleted."""
+
+        line = dict(item)
+        line.setdefault("shop", shop)
+        image_path = line.pop("image_path", None)
+        if image_path:
+            with open(str(image_path), "rb") as handle:
+                line["image_content"] = base64.b64encode(handle.read()).decode("ascii")
+        encoded = json.dumps(line, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._stream.write(encoded + "\n")
+            self._stream.flush()
+            self.count += 1
+        if image_path:
+            os.unlink(str(image_path))
+
+    def write_items(self, items: Iterable[Dict[str, object]], shop: str) -> int:
+        written = 0
+        for item in items:
+            self.write(item, shop)
+            written += 1
+        return written
+
+    def close(self) -> None:
+        with self._lock:
+            if self._owns_stream:
+                self._stream.close()
+            else:
+                self._stream.flush()
+
+
+def open_writer(emit: str, output: str = STDIO) -> Optional[NdjsonWriter]:
+    """Return an NDJSON writer for ``--emit ndjson``; ``None`` when items are posted directly."""
+
+    if emit != EMIT_NDJSON:
+        return None
+    return NdjsonWriter(output)
+
+
+def read_items(stream: IO[str]) -> Iterator[Dict[str, object]]:
+    """Yield the items of an NDJSON stream line by line; malformed lines are logged and skipped."""
+
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as exc:
+            logger.warning("Skipping malformed line %d: %s", line_no, exc)
+            continue
+        if not isinstance(item, dict) or not item.get("product_url"):
+            logger.warning("Skipping line %d without a product_url", line_no)
+            continue
+        yield item
+
+
+def _spool_image(item: Dict[str, object], image_dir: str) -> Dict[str, object]:
+    """Move embedded ``image_content`` into a file so the image is streamed as multipart."""
+
+    encoded = item.pop("image_content", None)
+    if not encoded:
+        return item
+    try:
+        image_bytes = base64.b64decode(str(encoded), validate=True)
+    except (binascii.Error, ValueError):
+        logger.warning("Dropping invalid image_content of '%s'", item.get("title"))
+        return item
+    suffix = os.path.splitext(str(item.get("image_name") or ""))[1]
+    fd, path = tempfile.mkstemp(prefix="ndjson-", suffix=suffix, dir=image_dir)
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(image_bytes)
+    item["image_path"] = path
+    return item
+
+
+def post_stream(
+    items: Iterable[Dict[str, object]],
+    wp: WordPressClient,
+    index: Optional[ProductIndex] = None,
+    batch_size: int = BATCH_SIZE_DEFAULT,
+    image_wait: float = IMAGE_WAIT_DEFAULT,
+) -> Dict[str, int]:
+    """Post ``items`` in batches of ``batch_size`` as they arrive.
+
+    Posted products are recorded in ``index`` under their ``shop``; hashes of uploaded
+    images are recorded once WordPress reports them stored (waiting up to ``image_wait``
+    seconds at the end). Returns ``read`` / ``posted`` / ``failed`` counts.
+    """
+
+    counts = {"read": 0, "posted": 0, "failed": 0}
+    batch_size = max(1, batch_size)
+    posted_images: Dict[int, Dict[str, object]] = {}
+    image_dir = tempfile.mkdtemp(prefix="ndjson-images-")
+
+    def flush(batch: List[Dict[str, object]]) -> None:
+        item_ids = post_items_to_wp(batch, wp)
+        for item, item_id in zip(batch, item_ids):
+            if item.get("image_path"):
+                os.unlink(str(item.pop("image_path")))
+            if item_id is None:
+                counts["failed"] += 1
+                continue
+            counts["posted"] += 1
+            if index is not None:
+                index.record(item["product_url"], shop=str(item.get("shop") or ""), post_id=item_id, price=item.get("price"))  # type: ignore[arg-type]
+                if item.get("image_sha256"):
+                    posted_images[item_id] = {"image_sha256": item["image_sha256"], "image_url": item.get("image_url")}
+
+    try:
+        batch: List[Dict[str, object]] = []
+        for item in items:
+            counts["read"] += 1
+            batch.append(_spool_image(item, image_dir))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        if posted_images and index is not None:
+            # Only remember image hashes once WordPress has actually stored the image.
+            statuses = wait_for_images(list(posted_images), wp, timeout=image_wait)
+            for item_id, image in posted_images.items():
+                if statuses.get(item_id) == "done":
+                    index.record_image(str(image["image_sha256"]), source_url=str(image["image_url"]))
+    finally:
+        shutil.rmtree(image_dir, ignore_errors=True)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Post scraped NDJSON items to WordPress")
+    sub = parser.add_subparsers(dest="command", required=True)
+    post = sub.add_parser("post", help="Read NDJSON items (from --emit ndjson) and post them")
+    post.add_argument("input", nargs="?", default=STDIO, help="NDJSON file to read; '-' reads stdin (default)")
+    post.add_argument("--wp-base", default=WP_BASE_DEFAULT, help="Base URL of the WordPress site")
+    post.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE_DEFAULT,
+        help="Products sent per WordPress request (default: %(default)s)",
+    )
+    post.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help="Requests per second to WordPress when it answers normally (default: %(default)s)",
+    )
+    post.add_argument(
+        "--index",
+        default=str(DEFAULT_INDEX_PATH),
+        help="SQLite product index shared by all scrapers (default: %(default)s)",
+    )
+    post.add_argument("--no-index", action="store_true", help="Do not update the local product index")
+    post.add_argument(
+        "--image-wait",
+        type=float,
+        default=IMAGE_WAIT_DEFAULT,
+        help="Seconds to wait for WordPress to finish background image sideloads (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    index = None if args.no_index else open_index(args.index)
+    session = rate_limited_session(DomainRateLimiter(rate=args.rate))
+    wp = WordPressClient(args.wp_base, session=session)
+    stream = sys.stdin if args.input == STDIO else open(args.input, encoding="utf-8")
+    try:
+        counts = post_stream(read_items(stream), wp, index, batch_size=args.batch_size, image_wait=args.image_wait)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        wp.log_timings()
+        session.close()
+        if index is not None:
+            index.close()
+
+    logger.info("Posted %d/%d items (%d failed)", counts["posted"], counts["read"], counts["failed"])
+    return 0 if counts["posted"] or not counts["read"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
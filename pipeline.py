@@ -0,0 +1,716 @@
+"""
+Streaming scrape-and-post pipeline for the plain-HTML shops.
+
+Instead of crawling every page into a list and posting afterwards, the stages run
+at the same time and are joined by a bounded ``asyncio.Queue``:
+
+    fetch (AsyncFetcher, pages in order) -> parse (thread) -> dedupe -> queue -> post workers
+
+Pages are still handled strictly in pagination order, so first-seen-wins dedupe and
+``--incremental`` stopping behave as in ``scrape_listing``. Browser shops (kuma-doll)
+drive Playwright themselves; ``stream_and_post`` feeds the products their async
+scraper hands to a sink into the same post workers. When the post workers fall
+behind, the queue fills up and the crawl waits (back-pressure), so memory stays flat
+however many pages are crawled, and the run time approaches max(fetch, post) rather
+than their sum.
+
+The single-shop scripts (scrape_to_wp.py etc.) only supply their ``SiteAdapter``
+and headers: ``scrape_listing`` is their collecting ``scrape_items`` crawl and
+``shop_arg_parser`` / ``run_shop`` their command line, sharing the extraction,
+dedupe and ``--incremental`` checks with the streaming crawl.
+
+Usage:
+    wp = WordPressClient(wp_base, session=session)
+    stats = scrape_and_post(
+        start_url, extract_page, shop="yourdoll", wp=wp, session=session,
+        existing=existing_urls, page_url_for=woocommerce_page_url,
+    )
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import requests
+
+import html_parser
+from async_fetch import (
+    DEFAULT_CONCURRENCY,
+    REQUEST_TIMEOUT,
+    AsyncFetcher,
+    FetchResult,
+    PageUrlBuilder,
+    crawl,
+    crawl_pages,
+)
+from checkpoint import Checkpoint, default_checkpoint_path, open_checkpoint
+from http_cache import DEFAULT_CACHE_DIR, HttpCache, open_cache
+from ndjson_stream import EMIT_CHOICES, EMIT_WP, STDIO, NdjsonWriter, open_writer
+from price_history import DEFAULT_HISTORY_DIR, PriceHistory, open_history
+from product_index import DEFAULT_INDEX_PATH, KnownProducts, ProductIndex, open_index, page_fully_known
+from product_parser import PageExtraction
+from rate_limit import DEFAULT_RATE, DomainRateLimiter, rate_limited_session
+from scraper_common import fetch_existing_product_urls, post_items_to_wp
+from site_adapters import PageExtractor, SiteAdapter
+from wp_client import WP_BASE_DEFAULT, WordPressClient
+
+logger = logging.getLogger(__name__)
+
+POST_WORKERS_DEFAULT = 2
+MAX_PAGES_DEFAULT = 10
+
+_DONE = object()
+
+# Awaited by a browser scraper with each finished product (see ``stream_and_post``).
+ItemSink = Callable[[Dict[str, object]], Awaitable[None]]
+
+
+@dataclass
+class PipelineStats:
+    """Counters for one pipeline run."""
+
+    pages: int = 0
+    scraped: int = 0
+    skipped: int = 0
+    posted: int = 0
+    failed: int = 0
+    emitted: int = 0
+
+
+async def _next_batch(queue: asyncio.Queue, batch_size: int) -> Tuple[List[Dict[str, object]], bool]:
+    """Wait for one queued product, then take whatever else is already waiting, up to ``batch_size``.
+
+    Never waits for stragglers. Returns the batch and whether the end marker was reached.
+    """
+
+    item = await queue.get()
+    if item is _DONE:
+        return [], True
+    batch: List[Dict[str, object]] = [item]
+    while len(batch) < batch_size and not queue.empty():
+        item = queue.get_nowait()
+        if item is _DONE:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+def _record_posted(
+    batch: List[Dict[str, object]],
+    item_ids: List[Optional[int]],
+    stats: PipelineStats,
+    shop: str,
+    existing: Set[str],
+    index: Optional[ProductIndex],
+    checkpoint: Optional[Checkpoint],
+    posted_images: Optional[Dict[int, Dict[str, object]]] = None,
+) -> None:
+    """Record the outcome of one posted batch.
+
+    Spooled image files are removed once sent; with a ``checkpoint``, failed items
+    keep theirs for ``--resume``.
+    """
+
+    for posted_item, item_id in zip(batch, item_ids):
+        if posted_item.get("image_path") and (item_id is not None or checkpoint is None):
+            # Already gone when a resumed run or the NDJSON writer removed it first.
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(str(posted_item["image_path"]))
+        if item_id is None:
+            stats.failed += 1
+            continue
+        stats.posted += 1
+        existing.add(str(posted_item["product_url"]))
+        if index is not None:
+            index.record(posted_item["product_url"], shop=shop, post_id=item_id, price=posted_item.get("price"))  # type: ignore[arg-type]
+        if checkpoint is not None:
+            checkpoint.mark_posted(posted_item, item_id)
+        if posted_images is not None and posted_item.get("image_sha256"):
+            posted_images[item_id] = posted_item
+    if checkpoint is not None:
+        checkpoint.save()
+
+
+def _extract(page: FetchResult, extract_page: PageExtractor, cache: Optional[HttpCache]) -> PageExtraction:
+    """Parse a fetched list page; an unchanged page (HTTP 304) reuses the extraction cached with it."""
+
+    if cache is not None:
+        return cache.extract(page.url, page.text, page.not_modified, extract_page)
+    return extract_page(page.url, page.text)
+
+
+def _first_seen(product_url: str, seen: Set[str]) -> bool:
+    """Add ``product_url`` to ``seen``; ``False`` when an earlier page of the run already had it."""
+
+    if product_url in seen:
+        logger.info("Skipping duplicate product URL already seen in this run: %s", product_url)
+        return False
+    seen.add(product_url)
+    return True
+
+
+def _all_known(
+    page_url: str, page_items: List[Dict[str, object]], known: Optional[KnownProducts], known_tolerance: int
+) -> bool:
+    """Whether ``--incremental`` pagination stops after this page."""
+
+    if known is None or not page_fully_known((p["product_url"] for p in page_items), known, known_tolerance):
+        return False
+    logger.info("Incremental mode: all products on %s are already known; stopping pagination", page_url)
+    return True
+
+
+def scrape_listing(
+    adapter: SiteAdapter,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    max_pages: int = MAX_PAGES_DEFAULT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    delay: float = 0.0,
+    cache: Optional[HttpCache] = None,
+    known: Optional[KnownProducts] = None,
+    known_tolerance: int = 0,
+    rate_limiter: Optional[DomainRateLimiter] = None,
+) -> List[Dict[str, object]]:
+    """Crawl a plain-HTML shop's list pages (following pagination) and return their products.
+
+    The collecting counterpart of ``scrape_and_post``, behind each shop script's
+    ``scrape_items``. Pages are fetched concurrently (up to ``concurrency`` per host,
+    ``delay`` seconds apart) and handled in page order, so the first occurrence of a
+    product URL wins. With a ``cache``, unchanged pages (HTTP 304) reuse the items
+    extracted on the previous run. With ``known`` (incremental mode), pagination stops
+    after the first page whose products are all already known, allowing
+    ``known_tolerance`` unknown ones. Page requests go through ``rate_limiter`` (by
+    default one of ``DEFAULT_RATE`` per host).
+    """
+
+    items: List[Dict[str, object]] = []
+    seen: Set[str] = set()
+
+    def handle_page(page: FetchResult) -> Optional[str]:
+        page_items, next_url = _extract(page, adapter.extract_page, cache)
+        items.extend(parsed for parsed in page_items if _first_seen(str(parsed["product_url"]), seen))
+        return None if _all_known(page.url, page_items, known, known_tolerance) else next_url
+
+    crawl_pages(
+        url,
+        handle_page,
+        max_pages=max_pages,
+        page_url_for=adapter.pagination,
+        concurrency=concurrency,
+        delay=delay,
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+        cache=cache,
+        rate_limiter=rate_limiter,
+        prefetch=known is None,
+    )
+
+    logger.info("Total products scraped: %d", len(items))
+    return items
+
+
+async def _run(
+    start_url: str,
+    extract_page: PageExtractor,
+    shop: str,
+    wp: WordPressClient,
+    session: requests.Session,
+    existing: Set[str],
+    index: Optional[ProductIndex],
+    seen: Set[str],
+    max_pages: int,
+    page_url_for: Optional[PageUrlBuilder],
+    concurrency: int,
+    delay: float,
+    headers: Optional[Dict[str, str]],
+    cache: Optional[HttpCache],
+    known: Optional[KnownProducts],
+    known_tolerance: int,
+    limit: Optional[int],
+    batch_size: int,
+    post_workers: int,
+    queue_size: Optional[int],
+    checkpoint: Optional[Checkpoint],
+    resync: bool,
+    history: Optional[PriceHistory],
+    emit: Optional[NdjsonWriter],
+) -> PipelineStats:
+    stats = PipelineStats()
+    batch_size = max(1, batch_size)
+    post_workers = max(1, post_workers)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or batch_size * post_workers * 2)
+    loop = asyncio.get_running_loop()
+    post_executor = ThreadPoolExecutor(max_workers=post_workers)
+    fetcher = AsyncFetcher(
+        headers=headers, concurrency=concurrency, delay=delay, timeout=REQUEST_TIMEOUT, session=session, cache=cache
+    )
+    accepted = 0
+    if checkpoint is not None:
+        seen.update(checkpoint.known_urls())
+
+    def stop() -> None:
+        if checkpoint is not None:
+            checkpoint.page_done(None)
+        return None
+
+    async def handle_page(page: FetchResult) -> Optional[str]:
+        nonlocal accepted
+        page_items, next_url = await loop.run_in_executor(None, _extract, page, extract_page, cache)
+        stats.pages += 1
+        stats.scraped += len(page_items)
+
+        for parsed in page_items:
+            product_url = str(parsed["product_url"])
+            if history is not None:
+                history.append(product_url, shop, parsed.get("price"))
+            if not _first_seen(product_url, seen):
+                stats.skipped += 1
+                continue
+            if not resync and index is not None and product_url in index:
+                logger.info("Skipping product already in local index: %s", product_url)
+                index.touch(product_url, shop=shop, price=parsed.get("price"))  # type: ignore[arg-type]
+                stats.skipped += 1
+                continue
+            if not resync and product_url in existing:
+                logger.info("Skipping duplicate product already existing on WordPress: %s", product_url)
+                if index is not None:
+                    index.touch(product_url, shop=shop, price=parsed.get("price"))  # type: ignore[arg-type]
+                stats.skipped += 1
+                continue
+            if limit is not None and accepted >= limit:
+                logger.info("Reached limit of %d items; stopping pagination", limit)
+                return stop()
+            accepted += 1
+            if checkpoint is not None:
+                checkpoint.add_pending(parsed)
+            # Blocks while the post workers are behind.
+            await queue.put(parsed)
+            if limit is not None and accepted >= limit:
+                # Stop here rather than on the next new product, which may be pages away.
+                logger.info("Reached limit of %d items; stopping pagination", limit)
+                return stop()
+
+        if _all_known(page.url, page_items, known, known_tolerance):
+            return stop()
+        if checkpoint is not None:
+            checkpoint.page_done(next_url)
+        return next_url
+
+    # Incremental and --limit runs usually stop after a few pages; do not fetch ahead of them.
+    prefetch = known is None and limit is None
+
+    async def produce() -> None:
+        try:
+            if checkpoint is None:
+                await crawl(fetcher, start_url, handle_page, max_pages, page_url_for, prefetch=prefetch)
+                return
+            # Products parsed before the interruption are posted first.
+            for parsed in checkpoint.pending_items():
+                stats.scraped += 1
+                await queue.put(parsed)
+            if not checkpoint.crawl_done:
+                pages = await crawl(
+                    fetcher,
+                    start_url,
+                    handle_page,
+                    max_pages,
+                    page_url_for,
+                    resume_url=checkpoint.resume_url,
+                    pages_done=checkpoint.pages_done,
+                    prefetch=prefetch,
+                )
+                if pages >= max_pages:
+                    checkpoint.crawl_done = True
+        finally:
+            for _ in range(post_workers):
+                await queue.put(_DONE)
+
+    async def post_worker() -> None:
+        done = False
+        while not done:
+            batch, done = await _next_batch(queue, batch_size)
+            if not batch:
+                continue
+
+            if emit is not None:
+                # --emit ndjson: hand the products to a separate ``post`` process instead.
+                # Await before adding: ``stats.emitted += await ...`` reads the counter first and
+                # loses the other workers' increments made while this write was running.
+                written = await loop.run_in_executor(post_executor, emit.write_items, batch, shop)
+                stats.emitted += written
+                if checkpoint is not None:
+                    for emitted_item in batch:
+                        checkpoint.discard(emitted_item)
+                    checkpoint.save()
+                continue
+
+            item_ids = await loop.run_in_executor(post_executor, post_items_to_wp, batch, wp)
+            _record_posted(batch, item_ids, stats, shop, existing, index, checkpoint)
+
+    try:
+        await asyncio.gather(produce(), *(post_worker() for _ in range(post_workers)))
+    finally:
+        fetcher.close()
+        post_executor.shutdown(wait=True)
+        if checkpoint is not None:
+            checkpoint.finish()
+        if history is not None:
+            history.flush()
+    return stats
+
+
+def scrape_and_post(
+    start_url: str,
+    extract_page: PageExtractor,
+    shop: str,
+    wp: WordPressClient,
+    session: requests.Session,
+    existing: Set[str],
+    index: Optional[ProductIndex] = None,
+    seen: Optional[Set[str]] = None,
+    max_pages: int = 10,
+    page_url_for: Optional[PageUrlBuilder] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    delay: float = 0.0,
+    headers: Optional[Dict[str, str]] = None,
+    cache: Optional[HttpCache] = None,
+    known: Optional[KnownProducts] = None,
+    known_tolerance: int = 0,
+    limit: Optional[int] = None,
+    batch_size: int = 10,
+    post_workers: int = POST_WORKERS_DEFAULT,
+    queue_size: Optional[int] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    resync: bool = False,
+    history: Optional[PriceHistory] = None,
+    emit: Optional[NdjsonWriter] = None,
+) -> PipelineStats:
+    """Crawl a shop and post its new products while the crawl is still running.
+
+    Products already in ``seen`` (updated in place), ``index`` or ``existing`` are
+    skipped; at most ``limit`` products are handed to the ``post_workers``, which send
+    up to ``batch_size`` queued items per request. ``queue_size`` bounds the number of
+    parsed items waiting to be posted (default: two batches per worker). ``session``
+    fetches the shop's pages and is left open; ``wp`` posts the products and should
+    share that session so both stages use one connection pool.
+
+    With a ``checkpoint`` the run records its progress after every page and posted
+    batch; a resumed checkpoint's unposted products are posted first and the crawl
+    continues from its next page. The checkpoint is removed once everything is done.
+
+    With ``resync``, products WordPress (or the index) already has are posted again
+    instead of skipped; their content hash lets WordPress update only changed prices,
+    titles and images and skip unchanged products without writing.
+
+    Every parsed price, including those of skipped products, is appended to
+    ``history`` when one is given.
+
+    With ``emit``, the workers write the products to that NDJSON stream instead of
+    posting them (counted as ``emitted``); ``ndjson_stream.py post`` posts it later.
+    """
+
+    return asyncio.run(
+        _run(
+            start_url,
+            extract_page,
+            shop,
+            wp,
+            session,
+            existing,
+            index,
+            seen if seen is not None else set(),
+            max_pages,
+            page_url_for,
+            concurrency,
+            delay,
+            headers,
+            cache,
+            known,
+            known_tolerance,
+            limit,
+            batch_size,
+            post_workers,
+            queue_size,
+            checkpoint,
+            resync,
+            history,
+            emit,
+        )
+    )
+
+
+async def _stream(
+    scrape: Callable[[ItemSink], Awaitable[List[Dict[str, object]]]],
+    shop: str,
+    wp: WordPressClient,
+    existing: Set[str],
+    index: Optional[ProductIndex],
+    seen: Set[str],
+    batch_size: int,
+    post_workers: int,
+    queue_size: Optional[int],
+    checkpoint: Optional[Checkpoint],
+    posted_images: Optional[Dict[int, Dict[str, object]]],
+) -> PipelineStats:
+    stats = PipelineStats()
+    batch_size = max(1, batch_size)
+    post_workers = max(1, post_workers)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or batch_size * post_workers * 2)
+    loop = asyncio.get_running_loop()
+    post_executor = ThreadPoolExecutor(max_workers=post_workers)
+
+    async def sink(item: Dict[str, object]) -> None:
+        stats.scraped += 1
+        seen.add(str(item["product_url"]))
+        # Blocks the scraper while the post workers are behind.
+        await queue.put(item)
+
+    async def produce() -> None:
+        try:
+            # Anything the scraper returns instead of streaming is posted after the crawl.
+            for item in await scrape(sink):
+                await sink(item)
+        finally:
+            for _ in range(post_workers):
+                await queue.put(_DONE)
+
+    async def post_worker() -> None:
+        done = False
+        while not done:
+            batch, done = await _next_batch(queue, batch_size)
+            if batch:
+                item_ids = await loop.run_in_executor(post_executor, post_items_to_wp, batch, wp)
+                _record_posted(batch, item_ids, stats, shop, existing, index, checkpoint, posted_images)
+
+    try:
+        await asyncio.gather(produce(), *(post_worker() for _ in range(post_workers)))
+    finally:
+        post_executor.shutdown(wait=True)
+    return stats
+
+
+def stream_and_post(
+    scrape: Callable[[ItemSink], Awaitable[List[Dict[str, object]]]],
+    shop: str,
+    wp: WordPressClient,
+    existing: Set[str],
+    index: Optional[ProductIndex] = None,
+    seen: Optional[Set[str]] = None,
+    batch_size: int = 10,
+    post_workers: int = POST_WORKERS_DEFAULT,
+    queue_size: Optional[int] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    posted_images: Optional[Dict[int, Dict[str, object]]] = None,
+) -> PipelineStats:
+    """Post the products of a browser shop (kuma-doll) while its crawl is still running.
+
+    ``scrape`` is called with an async ``sink`` and returns the scraper's coroutine,
+    e.g. ``lambda sink: module.scrape_items_async(url, sink=sink, ...)``; every product
+    it awaits into the sink is queued for the ``post_workers`` like the pages of
+    ``scrape_and_post``, and the products it returns are posted after it finishes.
+    The scraper filters known products and applies ``--limit`` itself.
+
+    Streamed product URLs are added to ``seen``, posted items with an image hash to
+    ``posted_images``, and spooled image files are removed once sent. With a
+    ``checkpoint`` the posted products are marked after every batch; the caller
+    finishes it.
+    """
+
+    return asyncio.run(
+        _stream(
+            scrape,
+            shop,
+            wp,
+            existing,
+            index,
+            seen if seen is not None else set(),
+            batch_size,
+            post_workers,
+            queue_size,
+            checkpoint,
+            posted_images,
+        )
+    )
+
+
+def shop_arg_parser(adapter: SiteAdapter, description: str) -> argparse.ArgumentParser:
+    """Command-line options of a single plain-HTML shop script (see ``run_shop``)."""
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--url", default=adapter.default_url, help="Listing URL to scrape (default: %(default)s)")
+    parser.add_argument("--wp-base", default=WP_BASE_DEFAULT, help="WordPress base URL (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=None, help="Optional limit on number of products to post")
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=MAX_PAGES_DEFAULT,
+        help="Maximum number of pages to paginate through (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=adapter.delay,
+        help="Seconds between page requests to the shop at full speed; throttling answers slow it further (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum concurrent page fetches per host (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=adapter.batch_size,
+        help="Number of products sent per WordPress request (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help="Requests per second per host when the host answers normally; 429/503 slow it down (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--post-workers",
+        type=int,
+        default=POST_WORKERS_DEFAULT,
+        help="Concurrent WordPress requests while pages are still being crawled (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--http-cache",
+        default=str(DEFAULT_CACHE_DIR),
+        help="Directory for the conditional-GET page cache (default: %(default)s)",
+    )
+    parser.add_argument("--no-http-cache", action="store_true", help="Always download listing pages in full")
+    parser.add_argument(
+        "--resync",
+        action="store_true",
+        help="Also send products WordPress already has so changed prices, titles and images are updated",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Stop paginating at the first page whose products are all already known",
+    )
+    parser.add_argument(
+        "--known-tolerance",
+        type=int,
+        default=0,
+        help="Unknown products a page may hold and still count as known in --incremental mode (default: 0)",
+    )
+    parser.add_argument(
+        "--index",
+        default=str(DEFAULT_INDEX_PATH),
+        help="SQLite product index shared by all scrapers (default: %(default)s)",
+    )
+    parser.add_argument("--no-index", action="store_true", help="Do not read or update the local product index")
+    parser.add_argument(
+        "--emit",
+        choices=EMIT_CHOICES,
+        default=EMIT_WP,
+        help="wp: post products to WordPress; ndjson: write them as JSON lines for `ndjson_stream.py post` (default: %(default)s)",
+    )
+    parser.add_argument("--output", default=STDIO, help="File for --emit ndjson; '-' writes to stdout (default)")
+    parser.add_argument(
+        "--parser",
+        choices=html_parser.BACKEND_CHOICES,
+        default=html_parser.DEFAULT_BACKEND,
+        help="HTML parser: lxml queries the lxml tree directly; bs4 uses BeautifulSoup (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--price-history",
+        default=str(DEFAULT_HISTORY_DIR),
+        help="Directory of the append-only price history (default: %(default)s)",
+    )
+    parser.add_argument("--no-price-history", action="store_true", help="Do not record scraped prices")
+    parser.add_argument(
+        "--checkpoint",
+        default=str(default_checkpoint_path(adapter.name)),
+        help="State file recording crawl and post progress (default: %(default)s)",
+    )
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not record progress for --resume")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint: post its pending products, then crawl on from its next page",
+    )
+    return parser
+
+
+def run_shop(adapter: SiteAdapter, args: argparse.Namespace, headers: Dict[str, str]) -> int:
+    """Scrape one plain-HTML shop and post (or emit) its products; the body of each shop script's ``main``.
+
+    ``args`` come from ``shop_arg_parser``. Returns the process exit status: non-zero
+    when nothing was scraped or nothing could be posted.
+    """
+
+    index = None if args.no_index else open_index(args.index)
+    history = None if args.no_price_history else open_history(args.price_history)
+    html_parser.set_backend(args.parser)
+    emit = open_writer(args.emit, args.output)
+
+    # Shop pages and WordPress calls share one pool and one per-host rate limiter.
+    limiter = DomainRateLimiter(rate=args.rate)
+    if args.delay > 0:
+        limiter.set_rate(args.url, 1 / args.delay, burst=1)
+    session = rate_limited_session(limiter, pool_maxsize=args.concurrency + args.post_workers)
+    session.headers.update(headers)
+    wp = WordPressClient(args.wp_base, session=session)
+    try:
+        # Emitted items are deduplicated by the WordPress ingest endpoint when they are posted,
+        # so emitting never needs WordPress to be reachable.
+        existing_urls = fetch_existing_product_urls(wp) if emit is None else set()
+        cache = None if args.no_http_cache else open_cache(args.http_cache)
+        known = KnownProducts(existing_urls, index) if args.incremental else None
+        checkpoint = None
+        if not args.no_checkpoint:
+            checkpoint = open_checkpoint(args.checkpoint, adapter.name, args.url, args.resume)
+        # Products are posted (or emitted) while later pages are still being fetched.
+        stats = scrape_and_post(
+            args.url,
+            adapter.extract_page,
+            shop=adapter.name,
+            wp=wp,
+            session=session,
+            existing=existing_urls,
+            index=index,
+            max_pages=args.max_pages,
+            page_url_for=adapter.pagination,
+            concurrency=args.concurrency,
+            headers=headers,
+            cache=cache,
+            known=known,
+            known_tolerance=args.known_tolerance,
+            limit=args.limit,
+            batch_size=args.batch_size,
+            post_workers=args.post_workers,
+            checkpoint=checkpoint,
+            resync=args.resync,
+            history=history,
+            emit=emit,
+        )
+        wp.log_timings()
+    finally:
+        session.close()
+        if index is not None:
+            index.close()
+        if history is not None:
+            history.close()
+        if emit is not None:
+            emit.close()
+
+    if not stats.scraped:
+        logger.warning("No items scraped; exiting")
+        return 1
+    if emit is not None:
+        logger.info("Emitted %d/%d items to %s", stats.emitted, stats.scraped, args.output)
+        return 0 if stats.emitted else 1
+    logger.info("Posted %d/%d items", stats.posted, stats.scraped)
+    return 0 if stats.posted else 1
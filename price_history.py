@@ -0,0 +1,420 @@
+"""
+Append-only price history shared by all scrapers, with a NumPy drop report.
+
+Every price a scraper sees (new products and already-posted ones alike) is appended
+as one row ``(product key, timestamp, price)`` to array-backed column files,
+partitioned by shop and month:
+
+    .price_history/<shop>/<YYYY-MM>/key.bin    int64  first 8 bytes of SHA-1(canonical URL)
+    .price_history/<shop>/<YYYY-MM>/ts.bin     int64  UNIX seconds
+    .price_history/<shop>/<YYYY-MM>/price.bin  int32  yen
+    .price_history/<shop>/products.tsv         key -> product URL
+
+Writers only need the standard library (``array.tofile`` in append mode). A run
+that dies between column writes leaves columns of different lengths; readers use
+the shortest one, and the next writer truncates the columns to it before appending,
+so a torn row is dropped rather than misaligned.
+
+The ``report`` command (requires NumPy) loads the whole history and computes, in
+vectorized passes, recent price drops, new all-time lows and each shop's moving
+median price:
+
+    python price_history.py report --days 7 --window 7
+    python price_history.py report --json > recently_discounted.json
+
+Usage from a scraper:
+    history = open_history(DEFAULT_HISTORY_DIR)
+    history.append(product_url, "yourdoll", 44650)
+    history.close()
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from product_index import canonical_product_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = Path(__file__).parent / ".price_history"
+COLUMNS = (("key", "q"), ("ts", "q"), ("price", "i"))
+PRODUCTS_FILE = "products.tsv"
+# Buffered rows per history before they are written out.
+FLUSH_ROWS = 5000
+DAY = 86400
+
+
+def product_key(product_url: str) -> int:
+    """Stable signed 64-bit key for a product URL (same canonical form as the product index)."""
+
+    digest = hashlib.sha1(canonical_product_url(product_url).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little", signed=True)
+
+
+def _month(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m")
+
+
+class PriceHistory:
+    """Buffered, append-only writer for the partitioned price columns."""
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_HISTORY_DIR):
+        self.root = Path(root)
+        self._buffers: Dict[Tuple[str, str], Tuple[array, array, array]] = {}
+        self._new_products: Dict[str, Dict[int, str]] = {}
+        self._known_keys: Dict[str, Set[int]] = {}
+        self._seen: Set[Tuple[str, int]] = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "PriceHistory":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _keys_for(self, shop: str) -> Set[int]:
+        keys = self._known_keys.get(shop)
+        if keys is None:
+            keys = set(_read_products(self.root / shop).keys())
+            self._known_keys[shop] = keys
+        return keys
+
+    def append(self, product_url: str, shop: str, price: Optional[object], ts: Optional[int] = None) -> None:
+        """Record one observed price; repeats of a product within this run are ignored."""
+
+        if price is None or not product_url:
+            return
+        try:
+            price = int(price)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            return
+        key = product_key(product_url)
+        ts = int(ts if ts is not None else time.time())
+
+        with self._lock:
+            if (shop, key) in self._seen:
+                return
+            self._seen.add((shop, key))
+
+            if key not in self._keys_for(shop):
+                self._known_keys[shop].add(key)
+                self._new_products.setdefault(shop, {})[key] = canonical_product_url(product_url)
+
+            columns = self._buffers.get((shop, _month(ts)))
+            if columns is None:
+                columns = tuple(array(code) for _, code in COLUMNS)  # type: ignore[assignment]
+                self._buffers[(shop, _month(ts))] = columns  # type: ignore[assignment]
+            for column, value in zip(columns, (key, ts, price)):
+                column.append(value)
+            self._pending += 1
+            if self._pending >= FLUSH_ROWS:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        for shop, products in self._new_products.items():
+            shop_dir = self.root / shop
+            shop_dir.mkdir(parents=True, exist_ok=True)
+            with open(shop_dir / PRODUCTS_FILE, "a", encoding="utf-8") as handle:
+                for key, url in products.items():
+                    handle.write(f"{key}\t{url}\n")
+        self._new_products.clear()
+
+        for (shop, month), columns in self._buffers.items():
+            partition = self.root / shop / month
+            partition.mkdir(parents=True, exist_ok=True)
+            _trim_torn_rows(partition)
+            for (name, _), column in zip(COLUMNS, columns):
+                with open(partition / f"{name}.bin", "ab") as handle:
+                    column.tofile(handle)
+        self._buffers.clear()
+        self._pending = 0
+
+    def flush(self) -> None:
+        try:
+            with self._lock:
+                self._flush_locked()
+        except OSError as exc:
+            logger.warning("Could not write price history to %s: %s", self.root, exc)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def _trim_torn_rows(partition: Path) -> None:
+    """Cut a partition's column files back to the rows all of them hold.
+
+    A run that died between column writes leaves some columns longer than others;
+    appending to them as they are would pair every later key with another row's
+    timestamp and price.
+    """
+
+    paths = [(partition / f"{name}.bin", array(code).itemsize) for name, code in COLUMNS]
+    sizes = [(path.stat().st_size if path.exists() else 0, itemsize) for path, itemsize in paths]
+    rows = min(size // itemsize for size, itemsize in sizes)
+    for (path, itemsize), (size, _) in zip(paths, sizes):
+        if size != rows * itemsize:
+            logger.warning("Dropping a torn price history row from %s", path)
+            with open(path, "r+b") as handle:
+                handle.truncate(rows * itemsize)
+
+
+def open_history(path: Optional[Union[str, Path]]) -> Optional[PriceHistory]:
+    """Return a history writer rooted at ``path``; ``None`` (history disabled) when ``path`` is empty."""
+
+    if not path:
+        return None
+    return PriceHistory(path)
+
+
+def _read_products(shop_dir: Path) -> Dict[int, str]:
+    products: Dict[int, str] = {}
+    try:
+        with open(shop_dir / PRODUCTS_FILE, encoding="utf-8") as handle:
+            for line in handle:
+                key, _, url = line.rstrip("\n").partition("\t")
+                if key and url:
+                    products[int(key)] = url
+    except FileNotFoundError:
+        pass
+    return products
+
+
+def load_history(root: Union[str, Path] = DEFAULT_HISTORY_DIR):
+    """Load every partition into NumPy arrays.
+
+    Returns ``(columns, shops, products)``: ``columns`` maps key/ts/price/shop to
+    equal-length arrays (``shop`` holds indexes into ``shops``), ``products`` maps
+    product keys to URLs.
+    """
+
+    import numpy as np
+
+    root = Path(root)
+    dtypes = {"key": np.int64, "ts": np.int64, "price": np.int32}
+    parts: Dict[str, List["np.ndarray"]] = {name: [] for name in ("key", "ts", "price", "shop")}
+    shops: List[str] = []
+    products: Dict[int, str] = {}
+
+    for shop_dir in sorted(path for path in root.glob("*") if path.is_dir()):
+        shop_index = len(shops)
+        shops.append(shop_dir.name)
+        products.update(_read_products(shop_dir))
+        for partition in sorted(path for path in shop_dir.glob("*") if path.is_dir()):
+            loaded = {}
+            for name, dtype in dtypes.items():
+                path = partition / f"{name}.bin"
+                loaded[name] = np.fromfile(path, dtype=dtype) if path.exists() else np.empty(0, dtype=dtype)
+            rows = min(len(column) for column in loaded.values())
+            for name, column in loaded.items():
+                parts[name].append(column[:rows])
+            parts["shop"].append(np.full(rows, shop_index, dtype=np.int32))
+
+    columns = {
+        name: np.concatenate(chunks) if chunks else np.empty(0, dtype=dtypes.get(name, np.int32))
+        for name, chunks in parts.items()
+    }
+    return columns, shops, products
+
+
+def analyze(columns, window_days: int = 7, since: Optional[int] = None) -> Dict[str, object]:
+    """Vectorized drop / new-low / moving-median analysis over the loaded columns.
+
+    Observations are sorted by (product, time). A drop is an observation priced below
+    the product's previous one; a new low is one priced below every earlier one. Both
+    are reported only for observations at or after ``since``. Shop medians are the
+    median of each shop's prices per UTC day, smoothed by a ``window_days`` rolling median.
+    """
+
+    import numpy as np
+
+    key, ts, price, shop = columns["key"], columns["ts"], columns["price"].astype(np.int64), columns["shop"]
+    result: Dict[str, object] = {"drops": None, "new_lows": None, "medians": {}}
+    if not len(key):
+        return result
+
+    order = np.lexsort((ts, key))
+    key, ts, price, shop = key[order], ts[order], price[order], shop[order]
+
+    # Position of each row within its product's run of observations.
+    starts = np.r_[True, key[1:] != key[:-1]]
+    group = np.cumsum(starts) - 1
+    has_prev = ~starts
+    prev_price = np.r_[0, price[:-1]]
+
+    # Per-product running minimum in one accumulate: later groups are shifted below
+    # earlier ones so minima never leak across products.
+    offset = int(price.max() - price.min()) + 1
+    shifted = price - group * offset
+    running_min = np.minimum.accumulate(shifted) + group * offset
+    prev_min = np.r_[0, running_min[:-1]]
+
+    recent = ts >= since if since is not None else np.ones(len(ts), dtype=bool)
+    drop_mask = has_prev & (price < prev_price) & recent
+    low_mask = has_prev & (price < prev_min) & recent
+
+    result["drops"] = {
+        "key": key[drop_mask],
+        "shop": shop[drop_mask],
+        "ts": ts[drop_mask],
+        "price": price[drop_mask],
+        "previous": prev_price[drop_mask],
+    }
+    result["new_lows"] = {
+        "key": key[low_mask],
+        "shop": shop[low_mask],
+        "ts": ts[low_mask],
+        "price": price[low_mask],
+        "previous_low": prev_min[low_mask],
+    }
+
+    # Daily medians per shop: sort by (shop, day, price) and take the middle of each run.
+    day = ts // DAY
+    order = np.lexsort((price, day, shop))
+    s_shop, s_day, s_price = shop[order], day[order], price[order]
+    run_start = np.flatnonzero(np.r_[True, (s_shop[1:] != s_shop[:-1]) | (s_day[1:] != s_day[:-1])])
+    run_len = np.diff(np.r_[run_start, len(s_price)])
+    lower = s_price[run_start + (run_len - 1) // 2]
+    upper = s_price[run_start + run_len // 2]
+    daily_median = (lower + upper) / 2.0
+    run_shop = s_shop[run_start]
+    run_day = s_day[run_start]
+
+    medians: Dict[int, Dict[str, object]] = {}
+    window = max(1, window_days)
+    for shop_index in np.unique(run_shop):
+        mask = run_shop == shop_index
+        series = daily_median[mask]
+        if len(series) >= window:
+            rolling = np.median(np.lib.stride_tricks.sliding_window_view(series, window), axis=1)
+            rolling = np.r_[np.full(window - 1, np.nan), rolling]
+        else:
+            rolling = np.full(len(series), np.nan)
+        medians[int(shop_index)] = {"day": run_day[mask], "daily": series, "moving": rolling}
+    result["medians"] = medians
+    return result
+
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(int(ts), timezone.utc).isoformat(timespec="seconds")
+
+
+def build_report(
+    root: Union[str, Path] = DEFAULT_HISTORY_DIR,
+    days: int = 7,
+    window: int = 7,
+    min_drop: float = 0.0,
+    limit: int = 50,
+) -> Dict[str, object]:
+    """Load the history and return a JSON-ready report of the last ``days`` days."""
+
+    import numpy as np
+
+    columns, shops, products = load_history(root)
+    since = int(time.time()) - days * DAY
+    analysis = analyze(columns, window_days=window, since=since)
+    report: Dict[str, object] = {
+        "generated_at": _iso(int(time.time())),
+        "rows": int(len(columns["key"])),
+        "since": _iso(since),
+        "drops": [],
+        "new_lows": [],
+        "shop_medians": {},
+    }
+
+    drops = analysis["drops"]
+    if drops is not None and len(drops["key"]):
+        pct = (drops["previous"] - drops["price"]) / drops["previous"].clip(min=1) * 100.0
+        keep = np.flatnonzero(pct >= min_drop)
+        # Largest relative drops first.
+        keep = keep[np.argsort(-pct[keep], kind="stable")][:limit]
+        report["drops"] = [
+            {
+                "product_url": products.get(int(drops["key"][i]), ""),
+                "shop": shops[int(drops["shop"][i])],
+                "seen_at": _iso(drops["ts"][i]),
+                "price": int(drops["price"][i]),
+                "previous_price": int(drops["previous"][i]),
+                "drop_percent": round(float(pct[i]), 1),
+            }
+            for i in keep
+        ]
+
+    lows = analysis["new_lows"]
+    if lows is not None and len(lows["key"]):
+        newest = np.argsort(-lows["ts"], kind="stable")[:limit]
+        report["new_lows"] = [
+            {
+                "product_url": products.get(int(lows["key"][i]), ""),
+                "shop": shops[int(lows["shop"][i])],
+                "seen_at": _iso(lows["ts"][i]),
+                "price": int(lows["price"][i]),
+                "previous_low": int(lows["previous_low"][i]),
+            }
+            for i in newest
+        ]
+
+    for shop_index, series in analysis["medians"].items():  # type: ignore[union-attr]
+        last = len(series["day"]) - 1
+        report["shop_medians"][shops[shop_index]] = {  # type: ignore[index]
+            "day": _iso(int(series["day"][last]) * DAY)[:10],
+            "median": float(series["daily"][last]),
+            "moving_median": None if np.isnan(series["moving"][last]) else float(series["moving"][last]),
+            "days": int(len(series["day"])),
+        }
+    return report
+
+
+def _print_report(report: Dict[str, object]) -> None:
+    print(f"{report['rows']} price observations; changes since {report['since']}")
+    print("\nPrice drops:")
+    for row in report["drops"]:  # type: ignore[union-attr]
+        print(
+            f"  -{row['drop_percent']:>5}%  {row['previous_price']:>8,} -> {row['price']:>8,}  [{row['shop']}] {row['product_url']}"
+        )
+    print("\nNew lows:")
+    for row in report["new_lows"]:  # type: ignore[union-attr]
+        print(f"  {row['price']:>8,} (was {row['previous_low']:,})  [{row['shop']}] {row['product_url']}")
+    print("\nShop medians:")
+    for shop, row in report["shop_medians"].items():  # type: ignore[union-attr]
+        moving = f"{row['moving_median']:,.0f}" if row["moving_median"] is not None else "-"
+        print(f"  {shop}: {row['median']:,.0f} on {row['day']} (moving: {moving}, {row['days']} days)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Price history analysis")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="Recent price drops, new lows and per-shop moving medians (requires NumPy)")
+    report.add_argument("--dir", default=str(DEFAULT_HISTORY_DIR), help="History directory (default: %(default)s)")
+    report.add_argument("--days", type=int, default=7, help="Report changes seen in the last N days (default: %(default)s)")
+    report.add_argument("--window", type=int, default=7, help="Days in the moving median (default: %(default)s)")
+    report.add_argument("--min-drop", type=float, default=0.0, help="Minimum drop in percent (default: %(default)s)")
+    report.add_argument("--limit", type=int, default=50, help="Maximum rows per list (default: %(default)s)")
+    report.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if importlib.util.find_spec("numpy") is None:
+        logger.error("NumPy is required for the report: pip install numpy")
+        return 1
+
+    result = build_report(args.dir, days=args.days, window=args.window, min_drop=args.min_drop, limit=args.limit)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        _print_report(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
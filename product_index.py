@@ -0,0 +1,219 @@
+"""
+Persistent local index of products already ingested into WordPress.
+
+Every scraper reads and updates the same SQLite file so re-runs can skip known
+products before any detail-page fetch, image download or POST. Rows are keyed by
+the canonical product URL (see ``canonical_product_url``) and hold the WordPress
+post ID, last scraped price, last-seen time and source shop.
+
+A second table keys uploaded product images by content hash (SHA-256) and source
+URL, so an image that WordPress already has is not downloaded or uploaded again.
+
+Usage:
+    with ProductIndex() as index:
+        if product_url in index:
+            index.touch(product_url, shop="yourdoll", price=44650)
+        else:
+            index.record(product_url, shop="yourdoll", post_id=123, price=44650)
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = Path(__file__).parent / "product_index.sqlite3"
+
+# Query parameters that never identify a product (tracking / analytics).
+IGNORED_QUERY_PREFIXES = ("utm_", "fbclid", "gclid", "_ga")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_url TEXT PRIMARY KEY,
+    post_id     INTEGER,
+    last_price  INTEGER,
+    last_seen   TEXT NOT NULL,
+    source_shop TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_shop ON products (source_shop);
+CREATE TABLE IF NOT EXISTS images (
+    sha256     TEXT PRIMARY KEY,
+    source_url TEXT,
+    last_seen  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_source ON images (source_url);
+"""
+
+
+def canonical_product_url(url: str) -> str:
+    """Normalize a product URL so trivially different spellings share one key.
+
+    Lower-cases the scheme and host, drops default ports, fragments and tracking
+    parameters, and sorts the remaining query parameters.
+    """
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith(IGNORED_QUERY_PREFIXES)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class ProductIndex:
+    """SQLite-backed index of known products shared by all scrapers."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets several scrapers read while one of them writes.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def __enter__(self) -> "ProductIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, product_url: object) -> bool:
+        if not isinstance(product_url, str):
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM products WHERE product_url = ?", (canonical_product_url(product_url),)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def get(self, product_url: str) -> Optional[Dict[str, object]]:
+        """Return the stored row for ``product_url`` or ``None``."""
+
+        row = self.conn.execute(
+            "SELECT * FROM products WHERE product_url = ?", (canonical_product_url(product_url),)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def known_urls(self, shop: Optional[str] = None) -> Set[str]:
+        """Return the canonical URLs of all indexed products (optionally for one shop)."""
+
+        if shop:
+            rows = self.conn.execute("SELECT product_url FROM products WHERE source_shop = ?", (shop,))
+        else:
+            rows = self.conn.execute("SELECT product_url FROM products")
+        return {row[0] for row in rows}
+
+    def record(
+        self,
+        product_url: str,
+        shop: Optional[str] = None,
+        post_id: Optional[int] = None,
+        price: Optional[int] = None,
+        commit: bool = True,
+    ) -> None:
+        """Insert or update a product; ``None`` fields keep their stored value."""
+
+        self.conn.execute(
+            """
+            INSERT INTO products (product_url, post_id, last_price, last_seen, source_shop)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (product_url) DO UPDATE SET
+                post_id     = COALESCE(excluded.post_id, products.post_id),
+                last_price  = COALESCE(excluded.last_price, products.last_price),
+                last_seen   = excluded.last_seen,
+                source_shop = COALESCE(excluded.source_shop, products.source_shop)
+            """,
+            (canonical_product_url(product_url), post_id, price, _now(), shop),
+        )
+        if commit:
+            self.conn.commit()
+
+    def touch(self, product_url: str, shop: Optional[str] = None, price: Optional[int] = None) -> None:
+        """Mark a known product as seen again (updating its price when given)."""
+
+        self.record(product_url, shop=shop, price=price)
+
+    def image_hash_for(self, source_url: str) -> Optional[str]:
+        """Return the SHA-256 of an already-uploaded image fetched from ``source_url``."""
+
+        row = self.conn.execute(
+            "SELECT sha256 FROM images WHERE source_url = ? ORDER BY last_seen DESC LIMIT 1", (source_url,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record_image(self, sha256: str, source_url: Optional[str] = None) -> None:
+        """Remember that WordPress holds an image with content hash ``sha256``."""
+
+        self.conn.execute(
+            """
+            INSERT INTO images (sha256, source_url, last_seen) VALUES (?, ?, ?)
+            ON CONFLICT (sha256) DO UPDATE SET
+                source_url = COALESCE(excluded.source_url, images.source_url),
+                last_seen  = excluded.last_seen
+            """,
+            (sha256, source_url, _now()),
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_index(path: Optional[Union[str, Path]]) -> Optional[ProductIndex]:
+    """Open the index at ``path``; returns ``None`` (index disabled) when ``path`` is empty."""
+
+    if not path:
+        return None
+    try:
+        return ProductIndex(path)
+    except sqlite3.Error as exc:
+        logger.warning("Could not open product index %s; continuing without it: %s", path, exc)
+        return None
+
+
+class KnownProducts:
+    """Membership test over the WordPress URL set plus the local product index."""
+
+    def __init__(self, urls: Optional[Set[str]] = None, index: Optional[ProductIndex] = None):
+        self.urls = urls if urls is not None else set()
+        self.index = index
+
+    def __contains__(self, product_url: object) -> bool:
+        if product_url in self.urls:
+            return True
+        return self.index is not None and product_url in self.index
+
+
+def page_fully_known(product_urls: Iterable[object], known: KnownProducts, tolerance: int = 0) -> bool:
+    """Return True when a listing page holds at most ``tolerance`` unknown products.
+
+    Used by ``--incremental`` crawls: on date-ordered listings the first page made
+    of already-known products means everything after it is known too. The tolerance
+    absorbs a few re-ordered or re-listed items. Empty pages never count as known.
+    """
+
+    urls = list(product_urls)
+    if not urls:
+        return False
+    unknown = sum(1 for url in urls if url not in known)
+    return unknown <= tolerance
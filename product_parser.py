@@ -0,0 +1,244 @@
+"""
+One product-list parser for every shop, driven by declarative selectors.
+
+The shops differ only in where things sit in their markup, so each ``SiteAdapter``
+(site_adapters.py) carries a ``ProductSelectors`` description and this module does
+the parsing for all of them: product nodes, title, price candidates, the product
+link, the image (with a ``<noscript>`` fallback) and the next-page link. How an
+image URL is picked from an ``<img>`` tag is a small strategy function, since the
+shops lazy-load their images differently.
+
+Usage:
+    selectors = get_adapter("sweet-doll").selectors
+    items, next_url = extract_page(page_url, html, selectors)
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import html_parser
+from html_parser import Selector
+from image_utils import DEFAULT_TARGET_WIDTH, declared_width, srcset_candidates
+from scraper_common import normalize_price, pick_image_src
+
+logger = logging.getLogger(__name__)
+
+PRICE_CEILING_DEFAULT = 1_000_000
+
+# (image tag, product container) -> image URL
+ImagePicker = Callable[[object, object], Optional[str]]
+PageExtraction = Tuple[List[Dict[str, object]], Optional[str]]
+
+
+def lazy_image_src(image_tag, container=None) -> Optional[str]:
+    """The tag's best lazy-loaded source (``srcset`` closest to the target width first)."""
+
+    return pick_image_src(image_tag)
+
+
+def srcset_image_src(image_tag, container=None) -> Optional[str]:
+    """A ``srcset`` candidate first, then ``src`` and the common lazy-load attributes."""
+
+    srcset = srcset_candidates(
+        image_tag.get("data-srcset") or image_tag.get("srcset"), DEFAULT_TARGET_WIDTH, declared_width(image_tag)
+    )
+    return (
+        (srcset[0] if srcset else None)
+        or image_tag.get("src")
+        or image_tag.get("data-src")
+        or image_tag.get("data-original")
+    )
+
+
+def fallback_image_src(image_tag, container=None, target_width: Optional[int] = None) -> Optional[str]:
+    """Pick the best available (non data URI) image URL from lazy-loaded attributes or fallbacks.
+
+    ``srcset`` candidates are ordered by their width descriptors so the smallest image
+    at or above ``target_width`` wins over the largest original. With a ``container``,
+    a following ``<noscript>`` image and any other ``<img>`` in the container are tried
+    last.
+    """
+
+    target_width = target_width or DEFAULT_TARGET_WIDTH
+    base_width = declared_width(image_tag)
+    candidates: List[str] = []
+    candidates.extend(srcset_candidates(image_tag.get("data-lazy-srcset"), target_width, base_width))
+    candidates.extend(srcset_candidates(image_tag.get("data-srcset"), target_width, base_width))
+    candidates.extend(srcset_candidates(image_tag.get("srcset"), target_width, base_width))
+    candidates.extend(
+        [
+            image_tag.get("data-lazy-src"),
+            image_tag.get("data-src"),
+            image_tag.get("data-original"),
+            image_tag.get("data-ll-src"),
+            image_tag.get("data-cfsrc"),
+            image_tag.get("data-echo"),
+            image_tag.get("data-hires"),
+            image_tag.get("data-image"),
+            image_tag.get("src"),
+        ]
+    )
+
+    # Fallback: check for <noscript> image HTML nested near the tag
+    if container is not None:
+        noscript = image_tag.find_next("noscript")
+        if noscript and noscript.string:
+            try:
+                ns_img = html_parser.parse(noscript.string).find("img")
+                if ns_img:
+                    candidates.extend(srcset_candidates(ns_img.get("srcset"), target_width, declared_width(ns_img)))
+                    candidates.append(ns_img.get("src"))
+            except Exception:
+                pass
+
+        # Absolute fallback: any other <img> inside the same product container
+        for extra_img in container.find_all("img"):
+            candidates.extend(srcset_candidates(extra_img.get("srcset"), target_width, declared_width(extra_img)))
+            candidates.append(extra_img.get("src"))
+            candidates.append(extra_img.get("data-src"))
+
+    for candidate in candidates:
+        if candidate and not candidate.startswith("data:"):
+            return candidate
+    return None
+
+
+@dataclass(frozen=True)
+class ProductSelectors:
+    """Where a shop's list page keeps each product field.
+
+    Candidate tuples are tried in order and the first match wins. The product link
+    is the first of ``links`` with an ``href`` containing ``link_contains``; when none
+    has one, every match of ``link_scan`` is checked the same way.
+    """
+
+    item: Selector
+    title: Selector
+    prices: Tuple[Selector, ...]
+    image: Selector
+    links: Tuple[Selector, ...]
+    next: Tuple[Selector, ...]
+    # Container ``parse_item`` looks for in a product block (defaults to ``item``).
+    item_block: Optional[Selector] = None
+    # <noscript> holding the real <img> when ``image`` does not match.
+    image_noscript: Optional[Selector] = None
+    link_contains: str = ""
+    link_scan: Optional[Selector] = None
+    pick_image: ImagePicker = lazy_image_src
+    # Items priced at or above this are skipped; ``None`` keeps every price.
+    price_ceiling: Optional[int] = PRICE_CEILING_DEFAULT
+    # Also send the product URL as ``product_link`` (the yourdoll payload has always carried it).
+    product_link_field: bool = False
+
+
+def _first(selectors: Tuple[Selector, ...], node):
+    for selector in selectors:
+        tag = selector.select_one(node)
+        if tag:
+            return tag
+    return None
+
+
+def _find_image_tag(node, selectors: ProductSelectors):
+    """Locate the product <img>, including inside <noscript>."""
+
+    tag = selectors.image.select_one(node)
+    if tag or selectors.image_noscript is None:
+        return tag
+
+    # Some themes wrap the real <img> inside a <noscript> block. The lxml parser already
+    # parses its markup into the tree; only re-parse when it was kept as raw text.
+    noscript = selectors.image_noscript.select_one(node)
+    if noscript:
+        inner = noscript.find("img")
+        if inner is None and noscript.string:
+            inner = html_parser.parse(noscript.string).find("img")
+        return inner
+    return None
+
+
+def _product_href(node, selectors: ProductSelectors) -> Optional[str]:
+    for selector in selectors.links:
+        tag = selector.select_one(node)
+        if tag and tag.get("href") and selectors.link_contains in tag["href"]:
+            return tag["href"]
+
+    if selectors.link_scan is not None:
+        for tag in selectors.link_scan.select(node):
+            href = tag.get("href")
+            if href and selectors.link_contains in href:
+                return href
+    return None
+
+
+def parse_node(node, base_url: str, selectors: ProductSelectors) -> Optional[Dict[str, object]]:
+    """Extract title, price, image URL, and product URL from an already-parsed product node."""
+
+    title_tag = selectors.title.select_one(node)
+    price_tag = _first(selectors.prices, node)
+    image_tag = _find_image_tag(node, selectors)
+    product_href = _product_href(node, selectors)
+
+    if not (title_tag and price_tag and image_tag and product_href):
+        logger.debug("Skipping item due to missing data")
+        return None
+
+    title = title_tag.get_text(strip=True)
+    price = normalize_price(price_tag.get_text(" ", strip=True))
+    if price is None:
+        logger.debug("Skipping item due to unparsable price")
+        return None
+    if selectors.price_ceiling is not None and price >= selectors.price_ceiling:
+        logger.info("Skipping item priced at or above %s: %s (%s)", f"{selectors.price_ceiling:,}", title, price)
+        return None
+
+    image_src = selectors.pick_image(image_tag, node)
+    if not image_src:
+        logger.debug("Skipping item without a usable image")
+        return None
+
+    product_url = urljoin(base_url, product_href)
+    item: Dict[str, object] = {
+        "title": title,
+        "price": price,
+        "image_url": urljoin(base_url, image_src),
+        "product_url": product_url,
+    }
+    if selectors.product_link_field:
+        item["product_link"] = product_url
+    return item
+
+
+def parse_item(item_html: str, base_url: str, selectors: ProductSelectors) -> Optional[Dict[str, object]]:
+    """Extract a product from one product block's HTML."""
+
+    root = html_parser.parse(item_html)
+    container = (selectors.item_block or selectors.item).select_one(root) or root
+    return parse_node(container, base_url, selectors)
+
+
+def next_page_href(root, selectors: ProductSelectors) -> Optional[str]:
+    """The ``href`` of the page's next-page link, if it has one."""
+
+    next_link = _first(selectors.next, root)
+    return next_link.get("href") if next_link else None
+
+
+def extract_page(page_url: str, html: str, selectors: ProductSelectors) -> PageExtraction:
+    """Parse one list page into its product dictionaries and the next page URL."""
+
+    root = html_parser.parse(html)
+    product_nodes = selectors.item.select(root)
+    logger.info("Found %d products on page", len(product_nodes))
+
+    page_items: List[Dict[str, object]] = []
+    for node in product_nodes:
+        parsed = parse_node(node, page_url, selectors)
+        if parsed:
+            page_items.append(parsed)
+
+    next_href = next_page_href(root, selectors)
+    return page_items, urljoin(page_url, next_href) if next_href else None
@@ -18,28 +18,41 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
 
-import requests
+from wp_client import WP_NAMESPACE, WordPressClient
 
 logger = logging.getLogger(__name__)
 
 WP_BASE_DEFAULT = "https://freya-era.com"
 CACHE_FILE = Path(__file__).parent / "ranking_cache.json"
 CACHE_DURATION_HOURS = 24  # Cache for 24 hours
+# Only these keys of each website_ranking post are used.
+RANKING_FIELDS = ["id", "title", "link", "meta"]
 
 
 class RankingDataManager:
     """Manage ranking data from WordPress."""
     
-    def __init__(self, wp_base: str = None):
+    def __init__(self, wp_base: str = None, client: Optional[WordPressClient] = None):
         """
         Initialize the ranking data manager.
         
         Args:
             wp_base: WordPress base URL
+            client: Shared WordPress client (created on the first fetch if omitted)
         """
+        if client is not None and not wp_base:
+            wp_base = client.wp_base
         self.wp_base = (wp_base or os.getenv("WP_BASE_URL", WP_BASE_DEFAULT)).rstrip("/")
         self.api_endpoint = f"{self.wp_base}/wp-json/wp/v2/website_ranking"
+        self._client = client
         self.cache = self._load_cache()
+    
+    @property
+    def client(self) -> WordPressClient:
+        """WordPress client; only created when the cache cannot answer."""
+        if self._client is None:
+            self._client = WordPressClient(self.wp_base)
+        return self._client
         
     def _load_cache(self) -> Dict:
         """Load cached ranking data."""
@@ -88,14 +101,13 @@ class RankingDataManager:
         logger.info(f"Fetching ranking data from {self.api_endpoint}")
         
         try:
-            response = requests.get(
-                self.api_endpoint,
+            rankings_raw = self.client.get_json(
+                "website_ranking",
+                namespace=WP_NAMESPACE,
                 params={"per_page": 100, "status": "publish"},
+                fields=RANKING_FIELDS,
                 timeout=15
             )
-            response.raise_for_status()
-            
-            rankings_raw = response.json()
             rankings = []
             
             for item in rankings_raw:
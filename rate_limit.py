@@ -0,0 +1,248 @@
+"""
+Adaptive per-domain rate limiting for the scrapers' HTTP traffic.
+
+Every host (shop or WordPress) gets a token bucket. Requests take a token first,
+so idle hosts are hit without any sleeping while busy ones are held to ``rate``
+requests per second. Throttling answers (429 / 503) halve the host's rate and
+pause it for ``Retry-After`` seconds (or an exponential backoff with jitter when
+the header is missing); healthy answers raise the rate back towards its ceiling.
+
+``RateLimitedAdapter`` applies the limiter to a ``requests.Session`` and retries
+throttled or transient failures (429 / 5xx / connection errors) instead of
+giving up on the first one. Only idempotent methods are retried after the
+request may have reached the server; a POST is retried only when it never left
+(connect errors) or was refused with 429 / 503 and a ``Retry-After`` header, so
+WordPress ingest calls cannot create duplicate posts.
+
+Usage:
+    limiter = DomainRateLimiter(rate=4.0)
+    limiter.set_rate("happiness-doll.com", 1 / 1.5, burst=1)
+    session = rate_limited_session(limiter)
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = 4.0  # requests per second per host
+DEFAULT_BURST = 4
+MIN_RATE = 0.1
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+MAX_RETRY_AFTER = 300.0
+# Healthy responses in a row before a throttled host is sped up again.
+RECOVER_AFTER = 10
+
+THROTTLE_STATUSES = frozenset({429, 503})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Methods that may be replayed after the server could have acted on them.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def host_of(url: str) -> str:
+    """Return the limiter key for ``url`` (its lower-cased ``host[:port]``); bare hosts pass through."""
+
+    return (urlsplit(url).netloc or url).lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header (seconds or HTTP date) into seconds from now."""
+
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = retry_at.timestamp() - time.time()
+    return min(max(0.0, seconds), MAX_RETRY_AFTER)
+
+
+@dataclass
+class _Bucket:
+    rate: float
+    max_rate: float
+    capacity: float
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+    blocked_until: float = 0.0
+    failures: int = 0
+    successes: int = 0
+
+
+class DomainRateLimiter:
+    """Thread-safe token buckets keyed by host, with throttling feedback."""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        min_rate: float = MIN_RATE,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_cap: float = BACKOFF_CAP,
+    ):
+        self.rate = max(min_rate, rate)
+        self.burst = max(1, burst)
+        self.min_rate = min_rate
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = _Bucket(rate=self.rate, max_rate=self.rate, capacity=self.burst, tokens=self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def set_rate(self, host: str, rate: float, burst: Optional[int] = None) -> None:
+        """Set the rate ceiling (requests per second) and burst size for one host."""
+
+        rate = max(self.min_rate, rate)
+        capacity = max(1, burst if burst is not None else self.burst)
+        with self._lock:
+            self._buckets[host_of(host)] = _Bucket(rate=rate, max_rate=rate, capacity=capacity, tokens=capacity)
+
+    def current_rate(self, host: str) -> float:
+        with self._lock:
+            return self._bucket(host_of(host)).rate
+
+    def reserve(self, host: str) -> float:
+        """Take a token for ``host`` and return how many seconds the caller must wait before sending."""
+
+        host = host_of(host)
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(bucket.capacity, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            # Tokens may go negative: later callers queue up behind earlier reservations.
+            bucket.tokens -= 1
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            return max(wait, bucket.blocked_until - now)
+
+    def acquire(self, host: str) -> None:
+        """Block until a request to ``host`` may be sent."""
+
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the ``attempt``-th consecutive failure."""
+
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** max(0, attempt))))
+
+    def observe(self, host: str, status: Optional[int], retry_after: Optional[str] = None) -> Optional[float]:
+        """Feed a response status back (``None`` for a connection error).
+
+        Returns the pause in seconds before ``host`` may be retried when the answer
+        was throttling or a transient failure, otherwise ``None``.
+        """
+
+        host = host_of(host)
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if status is not None and status not in RETRY_STATUSES:
+                bucket.failures = 0
+                bucket.successes += 1
+                if bucket.rate < bucket.max_rate and bucket.successes >= RECOVER_AFTER:
+                    bucket.rate = min(bucket.max_rate, bucket.rate * 1.5)
+                    bucket.successes = 0
+                    logger.info("Rate for %s raised to %.2f req/s", host, bucket.rate)
+                return None
+
+            bucket.successes = 0
+            bucket.failures += 1
+            if status in THROTTLE_STATUSES:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+            delay = parse_retry_after(retry_after)
+            if delay is None:
+                delay = self.backoff(bucket.failures)
+            bucket.blocked_until = max(bucket.blocked_until, now + delay)
+            logger.warning(
+                "%s answered %s; pausing %.1fs (rate now %.2f req/s)", host, status or "connection error", delay, bucket.rate
+            )
+            return delay
+
+
+def _never_sent(exc: Exception) -> bool:
+    """Whether a connection error happened before any byte of the request was sent."""
+
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    # NewConnectionError (refused, DNS failure) subclasses ConnectTimeoutError.
+    return isinstance(reason, ConnectTimeoutError)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """``HTTPAdapter`` that waits for the host's token and retries throttled / transient failures."""
+
+    def __init__(self, limiter: DomainRateLimiter, *args, **kwargs):
+        self.limiter = limiter
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):  # type: ignore[override]
+        host = host_of(request.url)
+        # Streamed bodies (multipart uploads) cannot be sent twice.
+        replayable = request.body is None or isinstance(request.body, (bytes, str))
+        idempotent = (request.method or "GET").upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self.limiter.acquire(host)
+            try:
+                resp = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self.limiter.observe(host, None)
+                if not replayable or not (idempotent or _never_sent(exc)) or attempt >= self.limiter.max_retries:
+                    raise
+                attempt += 1
+                continue
+
+            retry_after = resp.headers.get("Retry-After")
+            retry_wait = self.limiter.observe(host, resp.status_code, retry_after)
+            # A non-idempotent request is only repeated when the server said it did not process it.
+            refused = resp.status_code in THROTTLE_STATUSES and retry_after is not None
+            if retry_wait is None or not replayable or not (idempotent or refused) or attempt >= self.limiter.max_retries:
+                return resp
+            attempt += 1
+            logger.info("Retrying %s %s (attempt %d/%d)", request.method, request.url, attempt, self.limiter.max_retries)
+            resp.close()
+
+
+def rate_limited_session(
+    limiter: Optional[DomainRateLimiter] = None, pool_connections: int = 4, pool_maxsize: int = 10
+) -> requests.Session:
+    """Return a ``requests.Session`` whose HTTP(S) traffic goes through ``limiter``."""
+
+    session = requests.Session()
+    adapter = RateLimitedAdapter(
+        limiter or DomainRateLimiter(), pool_connections=pool_connections, pool_maxsize=pool_maxsize
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -24,193 +24,177 @@ Notes:
 from __future__ import annotations
 
 import argparse
-import base64
+import asyncio
+import hashlib
 import logging
 import os
-import re
+import shutil
+import tempfile
 from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import parse_qs, urlencode, urljoin, urlsplit, urlunsplit
 
-import requests
-from bs4 import BeautifulSoup
+from playwright.async_api import TimeoutError as AsyncPlaywrightTimeoutError, async_playwright
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, sync_playwright
 
+import html_parser
+from async_fetch import HostLimiter
+from checkpoint import Checkpoint, default_checkpoint_path, open_checkpoint
+from image_utils import ImageOptions, normalize_image
+from ndjson_stream import EMIT_CHOICES, EMIT_WP, STDIO, NdjsonWriter, open_writer
+from pipeline import ItemSink, stream_and_post
+from price_history import DEFAULT_HISTORY_DIR, PriceHistory, open_history
+from product_parser import fallback_image_src, next_page_href, parse_node
+from product_index import DEFAULT_INDEX_PATH, KnownProducts, ProductIndex, open_index, page_fully_known
+from rate_limit import DomainRateLimiter, host_of, rate_limited_session
+from scraper_common import (
+    IMAGE_WAIT_DEFAULT,
+    REQUEST_TIMEOUT,
+    fetch_existing_product_urls,
+    wait_for_images,
+)
+from site_adapters import get_adapter
+from wp_client import WP_BASE_DEFAULT, WordPressClient
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
-WP_BASE_DEFAULT = "https://freya-era.com"
+SHOP_NAME = "kuma-doll"
 DEFAULT_CATEGORY_URL = "https://www.kuma-doll.com/Products/list-r1.html"
 MAX_PAGES_DEFAULT = 10
-REQUEST_TIMEOUT = 15
+# Images are uploaded as multipart file parts; stay well under PHP's max_file_uploads / post_max_size.
+BATCH_SIZE_DEFAULT = 5
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; LovedollScraper/4.0; +https://freya-era.com)",
 }
 
 PLAYWRIGHT_WAIT_SELECTOR = "img[src*='image/cache'], img[src*='.webp'], img[src*='.jpg'], img[src*='.jpeg']"
 PLAYWRIGHT_WAIT_MS = 12000
+PLAYWRIGHT_POLL_MS = 200
+# Resource types the extraction never needs; images stay allowed for the readiness check.
+BLOCKED_RESOURCE_TYPES = {"font", "media", "stylesheet", "websocket", "manifest", "texttrack", "eventsource"}
+
+# Ready once a product image (not the logo) has finished loading with a real size.
+DETAIL_IMAGE_READY_JS = """
+(selector) => Array.from(document.querySelectorAll(selector)).some(
+    (img) => img.complete && img.naturalWidth > 0 && !img.currentSrc.includes("logo")
+)
+"""
+# Ready once the product list is present and its size has not changed for two polls.
+LIST_STABLE_JS = """
+(selector) => {
+    const count = document.querySelectorAll(selector).length;
+    const stable = count > 0 && count === window.__lovedollItemCount;
+    window.__lovedollStablePolls = stable ? (window.__lovedollStablePolls || 0) + 1 : 0;
+    window.__lovedollItemCount = count;
+    return window.__lovedollStablePolls >= 2;
+}
+"""
+# Detail-page worker pool used by --workers > 1 (async Playwright mode).
+DETAIL_WORKERS_DEFAULT = 4
+DETAIL_RATE_LIMIT_DEFAULT = 2.0  # detail pages started per second
 
+ADAPTER = get_adapter(SHOP_NAME)
+# Where the product fields sit in the markup; parsing is shared (product_parser.py).
+SELECTORS = ADAPTER.selectors
+# Detail-page image candidates, most specific first.
+DETAIL_IMAGE_SELECTORS = [
+    html_parser.compile(selector)
+    for selector in ("div.product img", "div#product img", "div.product-gallery img", "div.product-images img", "img")
+]
 
-def normalize_price(raw_text: str) -> Optional[int]:
-    """Convert price text like "274,500円(税込)" to integer 274500."""
 
-    digits = re.findall(r"[0-9]+", raw_text)
-    if not digits:
-        return None
-    try:
-        return int("".join(digits))
-    except ValueError:
-        return None
+def parse_item(item_html: str, base_url: str) -> Optional[Dict[str, object]]:
+    """Extract title, price, image URL, and product URL from a kuma-doll product block."""
 
+    return ADAPTER.parse_item(item_html, base_url)
 
-def _pick_image_src(image_tag, container=None) -> Optional[str]:
-    """Pick the best available (non data URI) image URL from lazy-loaded attributes or fallbacks."""
-
-    def srcset_candidates(value: Optional[str]) -> List[str]:
-        if not value:
-            return []
-        urls = []
-        for entry in value.split(","):
-            url_part = entry.strip().split()[0] if entry.strip() else ""
-            if url_part:
-                urls.append(url_part)
-        # prefer larger (last) candidates first
-        return list(reversed(urls))
-
-    candidates: List[str] = []
-    candidates.extend(srcset_candidates(image_tag.get("data-lazy-srcset")))
-    candidates.extend(srcset_candidates(image_tag.get("data-srcset")))
-    candidates.extend(srcset_candidates(image_tag.get("srcset")))
-    candidates.extend(
-        [
-            image_tag.get("data-lazy-src"),
-            image_tag.get("data-src"),
-            image_tag.get("data-original"),
-            image_tag.get("data-ll-src"),
-            image_tag.get("data-cfsrc"),
-            image_tag.get("data-echo"),
-            image_tag.get("data-hires"),
-            image_tag.get("data-image"),
-            image_tag.get("src"),
-        ]
-    )
 
-    # Fallback: check for <noscript> image HTML nested near the tag
-    if container is not None:
-        noscript = image_tag.find_next("noscript")
-        if noscript and noscript.string:
-            try:
-                ns_soup = BeautifulSoup(noscript.string, "lxml")
-                ns_img = ns_soup.find("img")
-                if ns_img:
-                    candidates.extend(srcset_candidates(ns_img.get("srcset")))
-                    candidates.append(ns_img.get("src"))
-            except Exception:
-                pass
-
-        # Absolute fallback: any other <img> inside the same product container
-        for extra_img in container.find_all("img"):
-            candidates.extend(srcset_candidates(extra_img.get("srcset")))
-            candidates.append(extra_img.get("src"))
-            candidates.append(extra_img.get("data-src"))
-
-    for candidate in candidates:
-        if candidate and not candidate.startswith("data:"):
-            return candidate
+def _find_detail_image_url(html: str, base_url: str, target_width: Optional[int] = None) -> Optional[str]:
+    """Locate the real product image URL in a rendered detail page."""
+
+    soup = html_parser.parse(html)
+
+    for selector in DETAIL_IMAGE_SELECTORS:
+        for img in selector.select(soup):
+            candidate = fallback_image_src(img, soup, target_width)
+            if not candidate:
+                continue
+            resolved = urljoin(base_url, candidate)
+            if resolved and "logo" not in resolved:
+                return resolved
+
     return None
 
 
-def fetch_existing_product_urls(wp_base: str, session: Optional[requests.Session] = None) -> Set[str]:
-    """Fetch existing product URLs from WordPress to avoid duplicates."""
+def _image_filename(image_url: str) -> str:
+    return os.path.basename(urlsplit(image_url).path) or "kuma-image.webp"
 
-    close_session = False
-    if session is None:
-        session = requests.Session()
-        close_session = True
 
-    endpoint = urljoin(wp_base.rstrip("/"), "/wp-json/lovedoll/v1/list")
-    urls: Set[str] = set()
+def _site_domain(url: str) -> str:
+    """Return the shop's registrable domain (``www.kuma-doll.com`` -> ``kuma-doll.com``)."""
 
-    try:
-        resp = session.get(endpoint, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        payload = resp.json()
-    except requests.RequestException as exc:
-        logger.warning("Could not fetch existing items; duplicate check may be incomplete: %s", exc)
-        payload = None
-    except ValueError:
-        logger.warning("Could not parse existing items (non-JSON response)")
-        payload = None
-
-    def collect(entry: dict) -> None:
-        for key in ("product_url", "product_link", "url"):
-            val = entry.get(key)
-            if isinstance(val, str):
-                urls.add(val)
-                return
-
-    if isinstance(payload, list):
-        for entry in payload:
-            if isinstance(entry, dict):
-                collect(entry)
-    elif isinstance(payload, dict):
-        items = payload.get("items")
-        if isinstance(items, list):
-            for entry in items:
-                if isinstance(entry, dict):
-                    collect(entry)
-
-    if urls:
-        logger.info("Loaded %d existing product URLs from WordPress", len(urls))
-    if close_session:
-        session.close()
-    return urls
+    host = (urlsplit(url).hostname or "").lower()
+    return ".".join(host.split(".")[-2:])
 
 
-def parse_item(item_html: str, base_url: str) -> Optional[Dict[str, object]]:
-    """Extract title, price, image URL, and product URL from a kuma-doll product block."""
+def _should_block(request_url: str, resource_type: str, site_domain: str) -> bool:
+    """Block resource types and third-party hosts the extraction does not need."""
 
-    soup = BeautifulSoup(item_html, "lxml")
-    container = soup if soup.name == "div" else soup.find("div", class_="product-item") or soup
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    if request_url.startswith(("data:", "blob:")):
+        return False
+    host = (urlsplit(request_url).hostname or "").lower()
+    return host != site_domain and not host.endswith("." + site_domain)
 
-    title_tag = container.select_one("a.title")
-    image_link = container.select_one("a.image")
-    image_tag = container.select_one("a.image img")
-    price_tag = container.select_one(".price span")
 
-    link_tag = image_link if image_link and image_link.get("href") else title_tag
+def _install_resource_blocking(context, site_url: str) -> None:
+    domain = _site_domain(site_url)
 
-    if not (title_tag and image_tag and price_tag and link_tag and link_tag.get("href")):
-        return None
+    def handle(route) -> None:
+        request = route.request
+        if _should_block(request.url, request.resource_type, domain):
+            route.abort()
+        else:
+            route.continue_()
 
-    price = normalize_price(price_tag.get_text(" ", strip=True))
-    if price is None:
-        return None
-    if price >= 1_000_000:
-        logger.info("Skipping item priced at or above 1,000,000: %s", price)
-        return None
+    context.route("**/*", handle)
 
-    image_src = _pick_image_src(image_tag, container)
-    if not image_src:
-        return None
 
-    return {
-        "title": title_tag.get_text(strip=True),
-        "price": price,
-        "image_url": urljoin(base_url, image_src),
-        "product_url": urljoin(base_url, link_tag.get("href")),
-    }
+async def _install_resource_blocking_async(context, site_url: str) -> None:
+    domain = _site_domain(site_url)
+
+    async def handle(route) -> None:
+        request = route.request
+        if _should_block(request.url, request.resource_type, domain):
+            await route.abort()
+        else:
+            await route.continue_()
 
+    await context.route("**/*", handle)
 
-def fetch_detail_image_with_playwright(context, product_url: str, base_url: str) -> Optional[Tuple[str, bytes, str]]:
-    """Fetch detail page and real image using Playwright in the same session."""
+
+def fetch_detail_image_with_playwright(
+    context,
+    product_url: str,
+    base_url: str,
+    index: Optional[ProductIndex] = None,
+    target_width: Optional[int] = None,
+) -> Optional[Tuple[str, Optional[bytes], str]]:
+    """Fetch detail page and real image using Playwright in the same session.
+
+    When ``index`` already knows the image URL as uploaded, the download is skipped and
+    ``None`` is returned in place of the image bytes.
+    """
 
     page = context.new_page()
     try:
         logger.info("[Playwright] Opening detail page: %s", product_url)
-        page.goto(product_url, wait_until="networkidle", timeout=REQUEST_TIMEOUT * 1000)
+        page.goto(product_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
         try:
-            page.wait_for_selector(PLAYWRIGHT_WAIT_SELECTOR, timeout=PLAYWRIGHT_WAIT_MS)
-            page.wait_for_timeout(10000)
+            page.wait_for_function(
+                DETAIL_IMAGE_READY_JS, arg=PLAYWRIGHT_WAIT_SELECTOR, polling=PLAYWRIGHT_POLL_MS, timeout=PLAYWRIGHT_WAIT_MS
+            )
         except PlaywrightTimeoutError:
             logger.warning("Timeout waiting for images to load on %s", product_url)
 
@@ -218,44 +202,73 @@ def fetch_detail_image_with_playwright(context, product_url: str, base_url: str)
     finally:
         page.close()
 
-    soup = BeautifulSoup(html, "lxml")
-    image_url: Optional[str] = None
+    image_url = _find_detail_image_url(html, base_url, target_width)
+    if not image_url:
+        logger.error("Could not locate image on detail page: %s", product_url)
+        return None
+    if index is not None and index.image_hash_for(image_url):
+        logger.info("Image already uploaded; skipping download: %s", image_url)
+        return image_url, None, _image_filename(image_url)
+
+    try:
+        logger.info("[Playwright] Downloading image with session: %s", image_url)
+        img_resp = context.request.get(image_url, timeout=REQUEST_TIMEOUT * 1000)
+        if not img_resp.ok:
+            raise RuntimeError(f"HTTP {img_resp.status}")
+        content = img_resp.body()
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Failed to fetch image %s: %s", image_url, exc)
+        return None
+
+    return image_url, content, _image_filename(image_url)
 
-    selectors = [
-        "div.product img",
-        "div#product img",
-        "div.product-gallery img",
-        "div.product-images img",
-        "img",
-    ]
 
-    for selector in selectors:
-        for img in soup.select(selector):
-            candidate = _pick_image_src(img, soup)
-            if not candidate:
-                continue
-            resolved = urljoin(base_url, candidate)
-            if resolved and "logo" not in resolved:
-                image_url = resolved
-                break
-        if image_url:
-            break
+async def fetch_detail_image_async(
+    context,
+    product_url: str,
+    base_url: str,
+    index: Optional[ProductIndex] = None,
+    target_width: Optional[int] = None,
+) -> Optional[Tuple[str, Optional[bytes], str]]:
+    """Async counterpart of ``fetch_detail_image_with_playwright`` for the worker pool."""
 
+    page = await context.new_page()
+    try:
+        logger.info("[Playwright] Opening detail page: %s", product_url)
+        await page.goto(product_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
+        try:
+            await page.wait_for_function(
+                DETAIL_IMAGE_READY_JS, arg=PLAYWRIGHT_WAIT_SELECTOR, polling=PLAYWRIGHT_POLL_MS, timeout=PLAYWRIGHT_WAIT_MS
+            )
+        except AsyncPlaywrightTimeoutError:
+            logger.warning("Timeout waiting for images to load on %s", product_url)
+
+        html = await page.content()
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Failed to open detail page %s: %s", product_url, exc)
+        return None
+    finally:
+        await page.close()
+
+    image_url = _find_detail_image_url(html, base_url, target_width)
     if not image_url:
         logger.error("Could not locate image on detail page: %s", product_url)
         return None
+    if index is not None and index.image_hash_for(image_url):
+        logger.info("Image already uploaded; skipping download: %s", image_url)
+        return image_url, None, _image_filename(image_url)
 
     try:
         logger.info("[Playwright] Downloading image with session: %s", image_url)
-        img_resp = context.request.get(image_url, timeout=REQUEST_TIMEOUT * 1000)
-        img_resp.raise_for_status()
-        content = img_resp.body()
+        img_resp = await context.request.get(image_url, timeout=REQUEST_TIMEOUT * 1000)
+        if not img_resp.ok:
+            raise RuntimeError(f"HTTP {img_resp.status}")
+        content = await img_resp.body()
     except Exception as exc:  # noqa: BLE001
         logger.error("Failed to fetch image %s: %s", image_url, exc)
         return None
 
-    filename = os.path.basename(urlsplit(image_url).path) or "kuma-image.webp"
-    return image_url, content, filename
+    return image_url, content, _image_filename(image_url)
 
 
 def build_page_url(base_url: str, page: int) -> str:
@@ -271,101 +284,415 @@ def build_page_url(base_url: str, page: int) -> str:
     return urlunsplit((parts.scheme, parts.netloc, parts.path, new_query, parts.fragment))
 
 
-def scrape_items(category_url: str, max_pages: int = MAX_PAGES_DEFAULT, delay: float = 1.0) -> List[Dict[str, object]]:
-    """Scrape kuma-doll with Playwright (list -> detail -> image) and return product dictionaries."""
+def _parse_list_page(
+    html: str,
+    category_url: str,
+    index: Optional[ProductIndex],
+    existing: Set[str],
+    seen: Set[str],
+    history: Optional[PriceHistory] = None,
+) -> Tuple[int, List[Dict[str, object]], List[str], Optional[str]]:
+    """Parse a rendered list page.
+
+    Products already on WordPress (``existing``), in the local index or already picked
+    up earlier in this run (``seen``, updated in place) are dropped here, before any
+    detail-page visit. Returns the number of product nodes, the products that still
+    need a detail page, every product URL on the page (for incremental checks) and
+    the next-page href. Every parsed price is appended to ``history``.
+    """
+
+    soup = html_parser.parse(html)
+    nodes = SELECTORS.item.select(soup)
+
+    pending: List[Dict[str, object]] = []
+    page_product_urls: List[str] = []
+    for node in nodes:
+        parsed = parse_node(node, category_url, SELECTORS)
+        if not parsed:
+            continue
+        product_url = str(parsed["product_url"])
+        page_product_urls.append(product_url)
+        if history is not None:
+            history.append(product_url, SHOP_NAME, parsed.get("price"))
+
+        if product_url in seen:
+            logger.info("Skipping duplicate product URL: %s", product_url)
+            continue
+        if product_url in existing:
+            logger.info("Skipping product already on WordPress: %s", product_url)
+            if index is not None:
+                index.touch(product_url, shop=SHOP_NAME, price=parsed["price"])  # type: ignore[arg-type]
+            continue
+        if index is not None and product_url in index:
+            logger.info("Skipping product already in local index: %s", product_url)
+            index.touch(product_url, shop=SHOP_NAME, price=parsed["price"])  # type: ignore[arg-type]
+            continue
+        seen.add(product_url)
+        pending.append(parsed)
+
+    return len(nodes), pending, page_product_urls, next_page_href(soup, SELECTORS)
+
+
+def _attach_detail_image(
+    parsed: Dict[str, object],
+    detail: Optional[Tuple[str, Optional[bytes], str]],
+    image_dir: Optional[str] = None,
+    index: Optional[ProductIndex] = None,
+    image_options: Optional[ImageOptions] = None,
+) -> bool:
+    """Spool the downloaded detail image to ``image_dir`` and reference it from ``parsed``.
+
+    Only the file path and the image's SHA-256 are kept on the item, so collected
+    products do not hold image bytes in memory until they are uploaded. Images the
+    index already knows carry just their hash, letting WordPress reuse the attachment.
+    With ``image_options.normalize`` the image is resized and re-encoded to WebP first,
+    and the file name always gets the extension of the actual image format.
+    Returns False when the image is missing.
+    """
+
+    if not detail:
+        logger.info("Skipping item; could not fetch detail image: %s", parsed.get("title"))
+        return False
+
+    image_url, image_bytes, filename = detail
+    parsed["image_url"] = image_url
+    parsed["image_name"] = filename
+    if image_bytes is None:
+        parsed["image_sha256"] = index.image_hash_for(image_url) if index is not None else None
+        return True
+
+    image_bytes, filename, _ = normalize_image(image_bytes, filename, image_options or ImageOptions())
+    parsed["image_name"] = filename
+    parsed["image_sha256"] = hashlib.sha256(image_bytes).hexdigest()
+    fd, path = tempfile.mkstemp(prefix="kuma-", suffix=os.path.splitext(filename)[1], dir=image_dir)
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(image_bytes)
+
+    parsed["image_path"] = path
+    return True
+
+
+def _list_rate_limiter(category_url: str, delay: float) -> DomainRateLimiter:
+    limiter = DomainRateLimiter()
+    if delay > 0:
+        limiter.set_rate(category_url, 1 / delay, burst=1)
+    return limiter
+
+
+def _load_list_page(context, page_url: str, rate_limiter: DomainRateLimiter) -> str:
+    """Render a list page once the shop's rate limit allows it, retrying throttled answers."""
+
+    host = host_of(page_url)
+    attempt = 0
+    while True:
+        rate_limiter.acquire(host)
+        page = context.new_page()
+        try:
+            logger.info("[Playwright] Fetching page: %s", page_url)
+            try:
+                response = page.goto(page_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
+            except PlaywrightTimeoutError:
+                rate_limiter.observe(host, None)
+                if attempt >= rate_limiter.max_retries:
+                    raise
+                attempt += 1
+                continue
+            if response is not None:
+                retry_wait = rate_limiter.observe(host, response.status, response.headers.get("retry-after"))
+                if retry_wait is not None and attempt < rate_limiter.max_retries:
+                    attempt += 1
+                    continue
+            try:
+                page.wait_for_function(
+                    LIST_STABLE_JS, arg=".product-item", polling=PLAYWRIGHT_POLL_MS, timeout=PLAYWRIGHT_WAIT_MS
+                )
+            except PlaywrightTimeoutError:
+                logger.warning("Timeout waiting for product items on %s", page_url)
+            return page.content()
+        finally:
+            page.close()
+
+
+async def _load_list_page_async(context, page_url: str, rate_limiter: DomainRateLimiter) -> str:
+    """Async variant of ``_load_list_page``."""
+
+    host = host_of(page_url)
+    attempt = 0
+    while True:
+        await asyncio.sleep(rate_limiter.reserve(host))
+        page = await context.new_page()
+        try:
+            logger.info("[Playwright] Fetching page: %s", page_url)
+            try:
+                response = await page.goto(page_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
+            except AsyncPlaywrightTimeoutError:
+                rate_limiter.observe(host, None)
+                if attempt >= rate_limiter.max_retries:
+                    raise
+                attempt += 1
+                continue
+            if response is not None:
+                retry_wait = rate_limiter.observe(host, response.status, response.headers.get("retry-after"))
+                if retry_wait is not None and attempt < rate_limiter.max_retries:
+                    attempt += 1
+                    continue
+            try:
+                await page.wait_for_function(
+                    LIST_STABLE_JS, arg=".product-item", polling=PLAYWRIGHT_POLL_MS, timeout=PLAYWRIGHT_WAIT_MS
+                )
+            except AsyncPlaywrightTimeoutError:
+                logger.warning("Timeout waiting for product items on %s", page_url)
+            return await page.content()
+        finally:
+            await page.close()
+
+
+def _resume_state(
+    checkpoint: Checkpoint, category_url: str
+) -> Tuple[List[Dict[str, object]], Set[str], int, str]:
+    """Return the collected products, seen URLs, first list page and list URL to continue from."""
+
+    return (
+        checkpoint.pending_items(),
+        checkpoint.known_urls(),
+        checkpoint.pages_done + 1,
+        checkpoint.next_url or category_url,
+    )
+
+
+def scrape_items(
+    category_url: str,
+    max_pages: int = MAX_PAGES_DEFAULT,
+    delay: float = 1.0,
+    index: Optional[ProductIndex] = None,
+    known: Optional[KnownProducts] = None,
+    known_tolerance: int = 0,
+    existing: Optional[Set[str]] = None,
+    limit: Optional[int] = None,
+    image_dir: Optional[str] = None,
+    image_options: Optional[ImageOptions] = None,
+    rate_limiter: Optional[DomainRateLimiter] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    history: Optional[PriceHistory] = None,
+    emit: Optional[NdjsonWriter] = None,
+) -> List[Dict[str, object]]:
+    """Scrape kuma-doll with Playwright (list -> detail -> image) and return product dictionaries.
+
+    Products already on WordPress (``existing``) or in ``index`` are skipped before their
+    detail page is opened, and scraping stops once ``limit`` products have been collected.
+    Detail images are picked and prepared according to ``image_options``, written to
+    ``image_dir`` (the system temp dir by default) and referenced through each item's
+    ``image_path``.
+    With ``known`` (incremental mode), pagination stops after the first list page whose
+    products are all already known, allowing ``known_tolerance`` unknown ones.
+    List pages go through ``rate_limiter`` (by default one allowing a page every ``delay``
+    seconds), which slows down and retries when the shop answers 429 / 503. A list page
+    that still cannot be loaded ends the crawl early; the products collected so far are
+    returned.
+    With a ``checkpoint``, collected products and the next list page are saved after
+    every page, and a resumed checkpoint's products are returned along with the new ones.
+    Every price seen on a list page is appended to ``history``.
+    With ``emit``, each product is written to that NDJSON stream as soon as its image
+    is attached instead of being collected, so only resumed products are returned.
+    """
 
     collected: List[Dict[str, object]] = []
+    existing = existing or set()
+    image_options = image_options or ImageOptions()
+    rate_limiter = rate_limiter or _list_rate_limiter(category_url, delay)
+    seen: Set[str] = set()
+    first_page = 1
+    if checkpoint is not None:
+        collected, seen, first_page, category_url = _resume_state(checkpoint, category_url)
+        if checkpoint.crawl_done:
+            return collected
+    complete = True
+    emitted = 0
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         context = browser.new_context(user_agent=HEADERS["User-Agent"])
+        _install_resource_blocking(context, category_url)
 
-        for page_num in range(1, max_pages + 1):
+        for page_num in range(first_page, max_pages + 1):
             page_url = build_page_url(category_url, page_num)
-            page = context.new_page()
             try:
-                logger.info("[Playwright] Fetching page: %s", page_url)
-                page.goto(page_url, wait_until="networkidle", timeout=REQUEST_TIMEOUT * 1000)
-                try:
-                    page.wait_for_selector(".product-item", timeout=PLAYWRIGHT_WAIT_MS)
-                except PlaywrightTimeoutError:
-                    logger.warning("Timeout waiting for product items on %s", page_url)
-                page.wait_for_timeout(2000)
-                html = page.content()
-            finally:
-                page.close()
-
-            soup = BeautifulSoup(html, "lxml")
-            items = soup.select(".product-item")
-            if not items:
+                html = _load_list_page(context, page_url, rate_limiter)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to fetch %s: %s", page_url, exc)
+                complete = False
+                break
+
+            node_count, pending, page_product_urls, next_href = _parse_list_page(
+                html, category_url, index, existing, seen, history
+            )
+            if not node_count:
                 logger.info("No products found on page %s; stopping.", page_url)
                 break
 
-            for item in items:
-                parsed = parse_item(str(item), category_url)
-                if not parsed:
+            for parsed in pending:
+                if limit is not None and len(collected) + emitted >= limit:
+                    break
+                detail = fetch_detail_image_with_playwright(
+                    context, parsed["product_url"], category_url, index, image_options.target_width
+                )
+                if not _attach_detail_image(parsed, detail, image_dir, index, image_options):
                     continue
-
-                detail = fetch_detail_image_with_playwright(context, parsed["product_url"], category_url)
-                if not detail:
-                    logger.info("Skipping item; could not fetch detail image: %s", parsed.get("title"))
+                if emit is not None:
+                    emit.write(parsed, SHOP_NAME)
+                    emitted += 1
                     continue
-
-                image_url, image_bytes, filename = detail
-                parsed["image_url"] = image_url
-                parsed["image_content"] = base64.b64encode(image_bytes).decode("ascii")
-                parsed["image_name"] = filename
                 collected.append(parsed)
+                if checkpoint is not None:
+                    checkpoint.add_pending(parsed)
 
-            logger.info("Collected %d items so far", len(collected))
+            logger.info("Collected %d items so far", len(collected) + emitted)
+            if limit is not None and len(collected) + emitted >= limit:
+                logger.info("Reached limit of %d items", limit)
+                break
 
-            next_link = soup.select_one("a.next, a.page-link[rel='next']")
-            if not next_link and page_num >= max_pages:
+            if known is not None and page_fully_known(page_product_urls, known, known_tolerance):
+                logger.info("Incremental mode: all products on %s are already known; stopping pagination", page_url)
                 break
-            if next_link and next_link.get("href"):
-                candidate = urljoin(category_url, next_link.get("href"))
+
+            if not next_href and page_num >= max_pages:
+                break
+            if next_href:
+                candidate = urljoin(category_url, next_href)
                 if candidate != page_url:
                     category_url = candidate
-                    continue
-
-            if delay > 0 and page_num < max_pages:
-                try:
-                    import time
-
-                    time.sleep(delay)
-                except Exception:
-                    pass
+            if checkpoint is not None:
+                checkpoint.page_done(category_url)
 
         context.close()
         browser.close()
 
+    if checkpoint is not None and complete:
+        checkpoint.crawl_done = True
+        checkpoint.save()
     return collected
 
 
-def post_to_wp(data: Dict[str, object], wp_base: str, session: Optional[requests.Session] = None) -> Optional[int]:
-    """Post a single product dictionary to the WordPress REST API."""
+async def scrape_items_async(
+    category_url: str,
+    max_pages: int = MAX_PAGES_DEFAULT,
+    delay: float = 1.0,
+    index: Optional[ProductIndex] = None,
+    known: Optional[KnownProducts] = None,
+    known_tolerance: int = 0,
+    existing: Optional[Set[str]] = None,
+    limit: Optional[int] = None,
+    image_dir: Optional[str] = None,
+    image_options: Optional[ImageOptions] = None,
+    workers: int = DETAIL_WORKERS_DEFAULT,
+    rate_limit: float = DETAIL_RATE_LIMIT_DEFAULT,
+    rate_limiter: Optional[DomainRateLimiter] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    history: Optional[PriceHistory] = None,
+    emit: Optional[NdjsonWriter] = None,
+    sink: Optional[ItemSink] = None,
+) -> List[Dict[str, object]]:
+    """Async variant of ``scrape_items`` that visits detail pages with a pool of workers.
+
+    List pages are still walked in order, but each page's detail pages are opened
+    concurrently as up to ``workers`` tabs of one browser context, and no more than
+    ``rate_limit`` detail pages per second are started against the shop. The result
+    order matches ``scrape_items``.
+    With ``sink`` (``pipeline.stream_and_post``), each product, starting with those of
+    a resumed checkpoint, is awaited into it as soon as its image is attached, so the
+    products are posted while later pages are crawled and nothing is returned.
+    """
 
-    close_session = False
-    if session is None:
-        session = requests.Session()
-        close_session = True
+    collected: List[Dict[str, object]] = []
+    existing = existing or set()
+    image_options = image_options or ImageOptions()
+    rate_limiter = rate_limiter or _list_rate_limiter(category_url, delay)
+    seen: Set[str] = set()
+    first_page = 1
+    if checkpoint is not None:
+        collected, seen, first_page, category_url = _resume_state(checkpoint, category_url)
+        if checkpoint.crawl_done:
+            return collected
+    complete = True
+    emitted = 0
+    if sink is not None:
+        for parsed in collected:
+            await sink(parsed)
+        emitted, collected = len(collected), []
+    limiter = HostLimiter(concurrency=workers, delay=1.0 / rate_limit if rate_limit > 0 else 0.0)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context(user_agent=HEADERS["User-Agent"])
+        await _install_resource_blocking_async(context, category_url)
+
+        async def fetch_detail(parsed: Dict[str, object], base_url: str) -> Optional[Tuple[str, Optional[bytes], str]]:
+            product_url = str(parsed["product_url"])
+            host = urlsplit(product_url).netloc
+            async with limiter.semaphore(host):
+                await limiter.wait_turn(host)
+                return await fetch_detail_image_async(context, product_url, base_url, index, image_options.target_width)
+
+        for page_num in range(first_page, max_pages + 1):
+            page_url = build_page_url(category_url, page_num)
+            try:
+                html = await _load_list_page_async(context, page_url, rate_limiter)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to fetch %s: %s", page_url, exc)
+                complete = False
+                break
 
-    endpoint = urljoin(wp_base.rstrip("/"), "/wp-json/lovedoll/v1/add-item")
-    try:
-        resp = session.post(endpoint, json=data, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        payload = resp.json()
-        post_id = payload.get("id") if isinstance(payload, dict) else None
-        logger.info("Posted: %s (ID: %s)", data.get("title"), post_id)
-        return post_id
-    except requests.RequestException as exc:
-        logger.error("Failed to POST %s: %s", data.get("title"), exc)
-    except ValueError:
-        logger.error("Non-JSON response when posting %s", data.get("title"))
-    finally:
-        if close_session:
-            session.close()
-    return None
+            node_count, pending, page_product_urls, next_href = _parse_list_page(
+                html, category_url, index, existing, seen, history
+            )
+            if not node_count:
+                logger.info("No products found on page %s; stopping.", page_url)
+                break
+
+            if limit is not None:
+                # Only open as many detail pages as the limit can still use.
+                pending = pending[: max(0, limit - len(collected) - emitted)]
+            details = await asyncio.gather(*(fetch_detail(parsed, category_url) for parsed in pending))
+            for parsed, detail in zip(pending, details):
+                if not _attach_detail_image(parsed, detail, image_dir, index, image_options):
+                    continue
+                if emit is not None:
+                    emit.write(parsed, SHOP_NAME)
+                    emitted += 1
+                    continue
+                if checkpoint is not None:
+                    checkpoint.add_pending(parsed)
+                if sink is not None:
+                    await sink(parsed)
+                    emitted += 1
+                    continue
+                collected.append(parsed)
+
+            logger.info("Collected %d items so far", len(collected) + emitted)
+            if limit is not None and len(collected) + emitted >= limit:
+                logger.info("Reached limit of %d items", limit)
+                break
+
+            if known is not None and page_fully_known(page_product_urls, known, known_tolerance):
+                logger.info("Incremental mode: all products on %s are already known; stopping pagination", page_url)
+                break
+
+            if not next_href and page_num >= max_pages:
+                break
+            if next_href:
+                candidate = urljoin(category_url, next_href)
+                if candidate != page_url:
+                    category_url = candidate
+            if checkpoint is not None:
+                checkpoint.page_done(category_url)
+
+        await context.close()
+        await browser.close()
+
+    if checkpoint is not None and complete:
+        checkpoint.crawl_done = True
+        checkpoint.save()
+    return collected
 
 
 def main() -> None:
@@ -374,35 +701,200 @@ def main() -> None:
     parser.add_argument("--wp-base", default=WP_BASE_DEFAULT, help="Base URL of the WordPress site")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of items to send")
     parser.add_argument("--max-pages", type=int, default=MAX_PAGES_DEFAULT, help="Maximum pages to scrape")
-    parser.add_argument("--delay", type=float, default=1.0, help="Seconds to wait between pages")
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds between list pages at full speed; throttling answers slow it further")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE_DEFAULT,
+        help="Products sent per WordPress request (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Stop paginating at the first list page whose products are all already known",
+    )
+    parser.add_argument(
+        "--known-tolerance",
+        type=int,
+        default=0,
+        help="Unknown products a page may hold and still count as known in --incremental mode",
+    )
+    parser.add_argument(
+        "--index",
+        default=str(DEFAULT_INDEX_PATH),
+        help="SQLite product index shared by all scrapers (default: %(default)s)",
+    )
+    parser.add_argument("--no-index", action="store_true", help="Do not read or update the local product index")
+    parser.add_argument(
+        "--emit",
+        choices=EMIT_CHOICES,
+        default=EMIT_WP,
+        help="wp: post products to WordPress; ndjson: write them (images embedded) as JSON lines for `ndjson_stream.py post`",
+    )
+    parser.add_argument("--output", default=STDIO, help="File for --emit ndjson; '-' writes to stdout (default)")
+    parser.add_argument(
+        "--parser",
+        choices=html_parser.BACKEND_CHOICES,
+        default=html_parser.DEFAULT_BACKEND,
+        help="HTML parser: lxml queries the lxml tree directly; bs4 uses BeautifulSoup (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--price-history",
+        default=str(DEFAULT_HISTORY_DIR),
+        help="Directory of the append-only price history (default: %(default)s)",
+    )
+    parser.add_argument("--no-price-history", action="store_true", help="Do not record scraped prices")
+    parser.add_argument(
+        "--checkpoint",
+        default=str(default_checkpoint_path(SHOP_NAME)),
+        help="State file recording crawl and post progress; its images are kept next to it (default: %(default)s)",
+    )
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not record progress for --resume")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint: post its collected products, then crawl on from its next page",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=f"Concurrent detail-page tabs of the async Playwright scraper (e.g. {DETAIL_WORKERS_DEFAULT}); with --emit ndjson, 1 uses the sync scraper",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=DETAIL_RATE_LIMIT_DEFAULT,
+        help="Maximum detail pages started per second against the shop in async mode (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--image-width",
+        type=int,
+        default=ImageOptions.target_width,
+        help="Target image width: the smallest srcset candidate at or above it is downloaded (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--normalize-images",
+        action="store_true",
+        help="Resize images to --image-width and re-encode them as WebP before upload (requires Pillow)",
+    )
+    parser.add_argument(
+        "--image-quality",
+        type=int,
+        default=ImageOptions.quality,
+        help="WebP quality used by --normalize-images (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--image-wait",
+        type=float,
+        default=IMAGE_WAIT_DEFAULT,
+        help="Seconds to wait for WordPress to finish background image sideloads (default: %(default)s)",
+    )
     args = parser.parse_args()
 
-    items = scrape_items(args.url, max_pages=args.max_pages, delay=args.delay)
-    if not items:
-        logger.warning("No items scraped; exiting")
-        raise SystemExit(1)
+    index = None if args.no_index else open_index(args.index)
+    history = None if args.no_price_history else open_history(args.price_history)
+    html_parser.set_backend(args.parser)
+    emit = open_writer(args.emit, args.output)
+    image_options = ImageOptions(
+        target_width=args.image_width, normalize=args.normalize_images, quality=args.image_quality
+    )
 
-    session = requests.Session()
+    # List pages (Playwright) and WordPress calls (requests) share one per-host rate limiter.
+    rate_limiter = _list_rate_limiter(args.url, args.delay)
+    session = rate_limited_session(rate_limiter)
     session.headers.update(HEADERS)
+    wp = WordPressClient(args.wp_base, session=session)
+    checkpoint = None if args.no_checkpoint else open_checkpoint(args.checkpoint, SHOP_NAME, args.url, args.resume)
+    # Detail images are spooled here between scraping and upload; with a checkpoint they
+    # must survive a crash, so they live next to the state file.
+    if checkpoint is not None:
+        image_dir = str(checkpoint.image_dir)
+        os.makedirs(image_dir, exist_ok=True)
+    else:
+        image_dir = tempfile.mkdtemp(prefix="kuma-images-")
 
-    existing_urls = fetch_existing_product_urls(args.wp_base, session=session)
-    seen: Set[str] = set(existing_urls)
-
-    sent = 0
-    for item in items:
-        product_url = item.get("product_url")
-        if product_url in seen:
-            logger.info("Skipping duplicate product URL: %s", product_url)
-            continue
-        if args.limit is not None and sent >= args.limit:
-            logger.info("Reached limit of %d items", args.limit)
-            break
-        post_to_wp(item, args.wp_base, session=session)
-        seen.add(product_url)
-        sent += 1
-
-    session.close()
-    logger.info("Finished. Sent %d items", sent)
+    try:
+        # Load what WordPress already has first so the browser never opens those detail pages.
+        # Emitted items are deduplicated on the post side instead.
+        existing_urls = fetch_existing_product_urls(wp) if emit is None else set()
+        known = KnownProducts(existing_urls, index) if args.incremental else None
+        scrape_kwargs = dict(
+            max_pages=args.max_pages,
+            delay=args.delay,
+            index=index,
+            known=known,
+            known_tolerance=args.known_tolerance,
+            existing=existing_urls,
+            limit=args.limit,
+            image_dir=image_dir,
+            image_options=image_options,
+            rate_limiter=rate_limiter,
+            checkpoint=checkpoint,
+            history=history,
+        )
+        if emit is not None:
+            if args.workers > 1:
+                items = asyncio.run(
+                    scrape_items_async(
+                        args.url, workers=args.workers, rate_limit=args.rate_limit, emit=emit, **scrape_kwargs
+                    )
+                )
+            else:
+                items = scrape_items(args.url, emit=emit, **scrape_kwargs)
+            # Products of a resumed checkpoint were collected before; stream them too.
+            for item in items:
+                emit.write(item, SHOP_NAME)
+                if checkpoint is not None:
+                    checkpoint.discard(item)
+            logger.info("Finished. Emitted %d items to %s", emit.count, args.output)
+            return
+
+        # Products are posted while later list pages are crawled; the scraper already
+        # drops known products and applies --limit.
+        posted_images: Dict[int, Dict[str, object]] = {}
+        stats = stream_and_post(
+            lambda sink: scrape_items_async(
+                args.url, workers=max(1, args.workers), rate_limit=args.rate_limit, sink=sink, **scrape_kwargs
+            ),
+            SHOP_NAME,
+            wp=wp,
+            existing=existing_urls,
+            index=index,
+            batch_size=args.batch_size,
+            checkpoint=checkpoint,
+            posted_images=posted_images,
+        )
+        if not stats.scraped:
+            # Known products are filtered out while scraping, so an empty result is normal on re-runs.
+            logger.info("No new items scraped; nothing to send")
+            return
+        logger.info("Finished. Sent %d of %d items (%d failed)", stats.posted, stats.scraped, stats.failed)
+
+        if posted_images and index is not None:
+            # Only remember image hashes once WordPress has actually stored the image.
+            statuses = wait_for_images(list(posted_images), wp, timeout=args.image_wait)
+            for item_id, item in posted_images.items():
+                if statuses.get(item_id) == "done":
+                    index.record_image(str(item["image_sha256"]), source_url=str(item["image_url"]))
+            still_pending = sum(1 for item_id in posted_images if statuses.get(item_id) == "pending")
+            failed = sum(1 for item_id in posted_images if statuses.get(item_id) == "failed")
+            if still_pending or failed:
+                logger.warning("Images still pending: %d, failed: %d", still_pending, failed)
+    finally:
+        if checkpoint is not None:
+            # Removes the state and its images once everything was crawled and posted.
+            checkpoint.finish()
+        else:
+            shutil.rmtree(image_dir, ignore_errors=True)
+        wp.log_timings()
+        session.close()
+        if index is not None:
+            index.close()
+        if history is not None:
+            history.close()
+        if emit is not None:
+            emit.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,473 @@
+"""
+Scrape several shops in one process and post their products to a WordPress REST API.
+
+Every shop is described by a ``SiteAdapter`` (see site_adapters.py). All shops share
+one pooled HTTP session, one WordPress listing fetch for the duplicate check, one
+in-run dedupe set and one posting pipeline, so a cron slot runs a single process
+instead of one script per shop. Every shop is streamed through pipeline.py: products
+are posted while later pages are still being fetched (kuma-doll through its async
+Playwright scraper, unless ``--emit ndjson`` is used).
+
+Installation:
+    pip install requests beautifulsoup4 lxml
+    pip install playwright && playwright install chromium   # only for kuma-doll
+
+Example usage:
+    python scrape_shops.py --shops yourdoll,sweet-doll,happiness-doll --wp-base "https://freya-era.com"
+    python scrape_shops.py --url "kuma-doll=https://www.kuma-doll.com/Products/list-r1.html" --shops kuma-doll
+
+The single-shop scripts (scrape_to_wp.py etc.) keep working unchanged.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List, Optional, Set
+
+import html_parser
+from async_fetch import DEFAULT_CONCURRENCY
+from checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpoint, default_checkpoint_path, open_checkpoint
+from http_cache import DEFAULT_CACHE_DIR, open_cache
+from image_utils import ImageOptions
+from ndjson_stream import EMIT_CHOICES, EMIT_WP, STDIO, NdjsonWriter, open_writer
+from pipeline import MAX_PAGES_DEFAULT, POST_WORKERS_DEFAULT, PipelineStats, scrape_and_post, stream_and_post
+from price_history import DEFAULT_HISTORY_DIR, PriceHistory, open_history
+from product_index import DEFAULT_INDEX_PATH, KnownProducts, ProductIndex, open_index
+from rate_limit import DEFAULT_RATE, DomainRateLimiter, rate_limited_session
+from scraper_common import (
+    IMAGE_WAIT_DEFAULT,
+    fetch_existing_product_urls,
+    wait_for_images,
+)
+from site_adapters import ADAPTERS, RENDER_PLAYWRIGHT, SiteAdapter
+from wp_client import WP_BASE_DEFAULT, WordPressClient
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; LovedollScraper/5.0; +https://freya-era.com)",
+}
+
+
+def scrape_browser_shop(
+    adapter: SiteAdapter,
+    url: str,
+    args: argparse.Namespace,
+    existing: Set[str],
+    seen: Set[str],
+    index: Optional[ProductIndex],
+    known: Optional[KnownProducts],
+    image_dir: str,
+    rate_limiter: Optional[DomainRateLimiter] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    history: Optional[PriceHistory] = None,
+    emit: Optional[NdjsonWriter] = None,
+) -> List[Dict[str, object]]:
+    """Run a Playwright shop's own ``scrape_items`` with the shared dedupe state."""
+
+    module = adapter.load()
+    kwargs = _browser_scrape_kwargs(
+        adapter, args, existing, seen, index, known, image_dir, rate_limiter, checkpoint, history
+    )
+    kwargs["emit"] = emit
+    if args.workers > 1:
+        items = asyncio.run(
+            module.scrape_items_async(url, workers=args.workers, rate_limit=args.rate_limit, **kwargs)
+        )
+    else:
+        items = module.scrape_items(url, **kwargs)
+
+    seen.update(str(item["product_url"]) for item in items)
+    return items
+
+
+def _browser_scrape_kwargs(
+    adapter: SiteAdapter,
+    args: argparse.Namespace,
+    existing: Set[str],
+    seen: Set[str],
+    index: Optional[ProductIndex],
+    known: Optional[KnownProducts],
+    image_dir: str,
+    rate_limiter: Optional[DomainRateLimiter],
+    checkpoint: Optional[Checkpoint],
+    history: Optional[PriceHistory],
+) -> Dict[str, object]:
+    return dict(
+        max_pages=args.max_pages,
+        delay=adapter.delay,
+        index=index,
+        known=known,
+        known_tolerance=args.known_tolerance,
+        # Products other shops already produced this run are skipped before their detail page.
+        existing=existing | seen,
+        limit=args.limit,
+        image_dir=image_dir,
+        image_options=ImageOptions(
+            target_width=args.image_width, normalize=args.normalize_images, quality=args.image_quality
+        ),
+        rate_limiter=rate_limiter,
+        checkpoint=checkpoint,
+        history=history,
+    )
+
+
+def stream_browser_shop(
+    adapter: SiteAdapter,
+    url: str,
+    args: argparse.Namespace,
+    wp: WordPressClient,
+    existing: Set[str],
+    seen: Set[str],
+    index: Optional[ProductIndex],
+    known: Optional[KnownProducts],
+    image_dir: str,
+    batch_size: int,
+    posted_images: Dict[int, Dict[str, object]],
+    rate_limiter: Optional[DomainRateLimiter] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    history: Optional[PriceHistory] = None,
+) -> PipelineStats:
+    """Run a Playwright shop's async scraper and post its products while it crawls (pipeline.py)."""
+
+    module = adapter.load()
+    kwargs = _browser_scrape_kwargs(
+        adapter, args, existing, seen, index, known, image_dir, rate_limiter, checkpoint, history
+    )
+    return stream_and_post(
+        lambda sink: module.scrape_items_async(
+            url, workers=max(1, args.workers), rate_limit=args.rate_limit, sink=sink, **kwargs
+        ),
+        shop=adapter.name,
+        wp=wp,
+        existing=existing,
+        index=index,
+        seen=seen,
+        batch_size=batch_size,
+        post_workers=args.post_workers,
+        checkpoint=checkpoint,
+        posted_images=posted_images,
+    )
+
+
+def parse_shop_urls(values: List[str]) -> Dict[str, str]:
+    urls: Dict[str, str] = {}
+    for value in values:
+        shop, sep, url = value.partition("=")
+        if not sep or shop not in ADAPTERS or not url:
+            raise argparse.ArgumentTypeError(f"--url expects SHOP=URL with SHOP in {', '.join(ADAPTERS)}: {value}")
+        urls[shop] = url
+    return urls
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape several shops in one process and post to WordPress")
+    parser.add_argument(
+        "--shops",
+        default=",".join(ADAPTERS),
+        help="Comma-separated shops to scrape, in order (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--url",
+        action="append",
+        default=[],
+        metavar="SHOP=URL",
+        help="Override a shop's listing URL (repeatable)",
+    )
+    parser.add_argument("--wp-base", default=WP_BASE_DEFAULT, help="WordPress base URL (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=None, help="Optional limit on products posted per shop")
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=MAX_PAGES_DEFAULT,
+        help="Maximum listing pages per shop (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum concurrent page fetches per host (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Products sent per WordPress request (default: each shop's own batch size)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help="Requests per second per host when the host answers normally; 429/503 slow it down (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--post-workers",
+        type=int,
+        default=POST_WORKERS_DEFAULT,
+        help="Concurrent WordPress requests while plain-HTML shops are crawled (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--http-cache",
+        default=str(DEFAULT_CACHE_DIR),
+        help="Directory for the conditional-GET page cache (default: %(default)s)",
+    )
+    parser.add_argument("--no-http-cache", action="store_true", help="Always download listing pages in full")
+    parser.add_argument(
+        "--resync",
+        action="store_true",
+        help="Also send products WordPress already has so changed prices, titles and images are updated (plain-HTML shops)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Stop paginating at the first page whose products are all already known",
+    )
+    parser.add_argument(
+        "--known-tolerance",
+        type=int,
+        default=0,
+        help="Unknown products a page may hold and still count as known in --incremental mode (default: 0)",
+    )
+    parser.add_argument(
+        "--index",
+        default=str(DEFAULT_INDEX_PATH),
+        help="SQLite product index shared by all scrapers (default: %(default)s)",
+    )
+    parser.add_argument("--no-index", action="store_true", help="Do not read or update the local product index")
+    parser.add_argument(
+        "--emit",
+        choices=EMIT_CHOICES,
+        default=EMIT_WP,
+        help="wp: post products to WordPress; ndjson: write them as JSON lines for `ndjson_stream.py post` (default: %(default)s)",
+    )
+    parser.add_argument("--output", default=STDIO, help="File for --emit ndjson; '-' writes to stdout (default)")
+    parser.add_argument(
+        "--parser",
+        choices=html_parser.BACKEND_CHOICES,
+        default=html_parser.DEFAULT_BACKEND,
+        help="HTML parser: lxml queries the lxml tree directly; bs4 uses BeautifulSoup (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--price-history",
+        default=str(DEFAULT_HISTORY_DIR),
+        help="Directory of the append-only price history (default: %(default)s)",
+    )
+    parser.add_argument("--no-price-history", action="store_true", help="Do not record scraped prices")
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=str(DEFAULT_CHECKPOINT_DIR),
+        help="Directory for the per-shop progress files used by --resume (default: %(default)s)",
+    )
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not record progress for --resume")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue each shop's interrupted run from its checkpoint instead of starting over",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Concurrent detail-page tabs for browser-rendered shops (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=2.0,
+        help="Maximum detail pages started per second in browser-rendered shops (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--image-width",
+        type=int,
+        default=ImageOptions.target_width,
+        help="Target image width for downloaded detail images (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--normalize-images",
+        action="store_true",
+        help="Resize detail images to --image-width and re-encode them as WebP (requires Pillow)",
+    )
+    parser.add_argument(
+        "--image-quality",
+        type=int,
+        default=ImageOptions.quality,
+        help="WebP quality used by --normalize-images (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--image-wait",
+        type=float,
+        default=IMAGE_WAIT_DEFAULT,
+        help="Seconds to wait for WordPress to finish background image sideloads (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    args.shops = [shop.strip() for shop in args.shops.split(",") if shop.strip()]
+    unknown = [shop for shop in args.shops if shop not in ADAPTERS]
+    if unknown or not args.shops:
+        parser.error(f"--shops must be a comma-separated subset of: {', '.join(ADAPTERS)}")
+    try:
+        args.url = parse_shop_urls(args.url)
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    index = None if args.no_index else open_index(args.index)
+    history = None if args.no_price_history else open_history(args.price_history)
+    html_parser.set_backend(args.parser)
+    emit = open_writer(args.emit, args.output)
+    cache = None if args.no_http_cache else open_cache(args.http_cache)
+
+    # One pool and one per-host rate limiter for every shop host and the WordPress host.
+    limiter = DomainRateLimiter(rate=args.rate)
+    session = rate_limited_session(
+        limiter, pool_connections=len(args.shops) + 1, pool_maxsize=max(1, args.concurrency + args.post_workers)
+    )
+    session.headers.update(HEADERS)
+    wp = WordPressClient(args.wp_base, session=session)
+    image_dir = tempfile.mkdtemp(prefix="shop-images-")
+
+    scraped_total = 0
+    posted_total = 0
+    posted_images: Dict[int, Dict[str, object]] = {}
+    try:
+        existing_urls = fetch_existing_product_urls(wp) if emit is None else set()
+        known = KnownProducts(existing_urls, index) if args.incremental else None
+        seen: Set[str] = set()
+
+        for shop in args.shops:
+            site = ADAPTERS[shop]
+            url = args.url.get(shop, site.default_url)
+            batch_size = args.batch_size or site.batch_size
+            if site.delay > 0:
+                limiter.set_rate(url, 1 / site.delay, burst=1)
+            checkpoint = None
+            if not args.no_checkpoint:
+                checkpoint = open_checkpoint(
+                    default_checkpoint_path(shop, args.checkpoint_dir), shop, url, resume=args.resume
+                )
+            logger.info("[%s] Scraping %s", shop, url)
+            try:
+                if site.render == RENDER_PLAYWRIGHT:
+                    # Spooled images must outlive a crash when the shop can be resumed.
+                    shop_image_dir = image_dir
+                    if checkpoint is not None:
+                        shop_image_dir = str(checkpoint.image_dir)
+                        os.makedirs(shop_image_dir, exist_ok=True)
+                    try:
+                        # Browser shops filter known products while scraping and apply --limit themselves.
+                        if emit is None:
+                            stats = stream_browser_shop(
+                                site,
+                                url,
+                                args,
+                                wp,
+                                existing_urls,
+                                seen,
+                                index,
+                                known,
+                                shop_image_dir,
+                                batch_size,
+                                posted_images,
+                                limiter,
+                                checkpoint,
+                                history,
+                            )
+                            scraped, posted = stats.scraped, stats.posted
+                        else:
+                            emitted_before = emit.count
+                            items = scrape_browser_shop(
+                                site,
+                                url,
+                                args,
+                                existing_urls,
+                                seen,
+                                index,
+                                known,
+                                shop_image_dir,
+                                limiter,
+                                checkpoint,
+                                history,
+                                emit,
+                            )
+                            # Only products of a resumed checkpoint come back; the rest were streamed already.
+                            for item in items:
+                                emit.write(item, shop)
+                                if checkpoint is not None:
+                                    checkpoint.discard(item)
+                            scraped = posted = emit.count - emitted_before
+                    finally:
+                        if checkpoint is not None:
+                            checkpoint.finish()
+                else:
+                    stats = scrape_and_post(
+                        url,
+                        site.extract_page,
+                        shop=shop,
+                        wp=wp,
+                        session=session,
+                        existing=existing_urls,
+                        index=index,
+                        seen=seen,
+                        max_pages=args.max_pages,
+                        page_url_for=site.pagination,
+                        concurrency=args.concurrency,
+                        headers=HEADERS,
+                        cache=cache,
+                        known=known,
+                        known_tolerance=args.known_tolerance,
+                        limit=args.limit,
+                        batch_size=batch_size,
+                        post_workers=args.post_workers,
+                        checkpoint=checkpoint,
+                        resync=args.resync,
+                        history=history,
+                        emit=emit,
+                    )
+                    scraped, posted = stats.scraped, stats.emitted if emit is not None else stats.posted
+            except Exception as exc:  # noqa: BLE001
+                # One broken shop (missing browser, layout change) must not cost the others their run.
+                logger.error("[%s] Scrape failed; skipping shop: %s", shop, exc)
+                continue
+
+            scraped_total += scraped
+            posted_total += posted
+            logger.info("[%s] %s %d/%d items", shop, "Emitted" if emit is not None else "Posted", posted, scraped)
+
+        if posted_images and index is not None:
+            # Only remember image hashes once WordPress has actually stored the image.
+            statuses = wait_for_images(list(posted_images), wp, timeout=args.image_wait)
+            for item_id, item in posted_images.items():
+                if statuses.get(item_id) == "done":
+                    index.record_image(str(item["image_sha256"]), source_url=str(item["image_url"]))
+    finally:
+        shutil.rmtree(image_dir, ignore_errors=True)
+        wp.log_timings()
+        session.close()
+        if index is not None:
+            index.close()
+        if history is not None:
+            history.close()
+        if emit is not None:
+            emit.close()
+
+    logger.info(
+        "%s %d items from %d shops (%d scraped)",
+        "Emitted" if emit is not None else "Posted",
+        posted_total,
+        len(args.shops),
+        scraped_total,
+    )
+    return 0 if scraped_total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+WordPress-side helpers shared by every shop scraper.
+
+All scrapers post to the same ``lovedoll/v1`` routes, so the product listing used
+for duplicate checks, the add-item / add-items posting (JSON or streamed multipart
+when an item carries a spooled image) and the background image-status polling live
+here instead of being copied into each script. Requests go through the pooled
+``WordPressClient`` (wp_client.py).
+
+Usage:
+    client = WordPressClient("https://freya-era.com", session=session)
+    existing = fetch_existing_product_urls(client)
+    ids = post_items_to_wp(items, client)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Set
+
+import requests
+
+from image_utils import DEFAULT_TARGET_WIDTH, declared_width, srcset_candidates
+from multipart_upload import form_fields, guess_content_type
+from wp_client import REQUEST_TIMEOUT, WordPressClient
+
+logger = logging.getLogger(__name__)
+
+LIST_PAGE_SIZE = 1000
+# Largest batch add-items accepts (LOVEDOLL_MAX_BATCH_ITEMS in lovedoll-products-api.php).
+MAX_BATCH_ITEMS = 50
+# add-item answers with the whole stored product; only these keys are read back.
+ITEM_RESPONSE_FIELDS = ("id", "result")
+# Local-only item keys that are never sent to WordPress as form/JSON fields.
+LOCAL_ITEM_KEYS = ("image_path", "shop")
+# WordPress sideloads images in the background; these control how long we poll for them.
+IMAGE_STATUS_BATCH = 100
+IMAGE_WAIT_DEFAULT = 120.0
+IMAGE_POLL_INTERVAL = 5.0
+
+
+def normalize_price(raw_text: str) -> Optional[int]:
+    """Convert price text like "44,650円" to integer 44650."""
+    digits = re.findall(r"[0-9]+", raw_text)
+    if not digits:
+        return None
+    try:
+        return int("".join(digits))
+    except ValueError:
+        return None
+
+
+def content_hash(item: Dict[str, object]) -> str:
+    """SHA-256 of an item's normalized title, price and image URL.
+
+    Sent as ``content_hash``: WordPress stores it per product and, for a product URL it
+    already has, only writes the fields that changed when the hash differs.
+    """
+
+    raw_price = item.get("price")
+    normalized = {
+        "title": " ".join(str(item.get("title") or "").split()),
+        "price": normalize_price(str(raw_price)) if raw_price is not None else None,
+        "image_url": str(item.get("image_url") or "").strip(),
+    }
+    encoded = json.dumps(normalized, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _wire_item(item: Dict[str, object]) -> Dict[str, object]:
+    """The item as sent to WordPress: without local-only keys, with its content hash."""
+
+    payload = {key: value for key, value in item.items() if key not in LOCAL_ITEM_KEYS}
+    payload["content_hash"] = content_hash(item)
+    return payload
+
+
+def pick_image_src(image_tag, target_width: int = DEFAULT_TARGET_WIDTH) -> Optional[str]:
+    """Pick the best available (non data URI) image URL from lazy-loaded attributes.
+
+    ``srcset`` candidates are ordered by their width descriptors so the smallest image
+    at or above ``target_width`` wins over the largest original.
+    """
+
+    base_width = declared_width(image_tag)
+    candidates: List[str] = []
+    candidates.extend(srcset_candidates(image_tag.get("data-lazy-srcset"), target_width, base_width))
+    candidates.extend(srcset_candidates(image_tag.get("data-srcset"), target_width, base_width))
+    candidates.extend(srcset_candidates(image_tag.get("srcset"), target_width, base_width))
+    candidates.extend(
+        [
+            image_tag.get("data-lazy-src"),
+            image_tag.get("data-src"),
+            image_tag.get("data-original"),
+            image_tag.get("data-ll-src"),
+            image_tag.get("data-cfsrc"),
+            image_tag.get("src"),
+        ]
+    )
+
+    for candidate in candidates:
+        if candidate and not candidate.startswith("data:"):
+            return candidate
+    return None
+
+
+def fetch_existing_product_urls(client: WordPressClient, modified_since: Optional[str] = None) -> Set[str]:
+    """Fetch existing product URLs from WordPress to avoid duplicates.
+
+    Uses the compact cursor-paginated listing (``?fields=url``) and follows
+    ``next_cursor`` until the catalog is exhausted. Older servers that only return
+    the legacy list payload are still understood.
+    """
+
+    urls: Set[str] = set()
+
+    def collect(entry: dict) -> None:
+        for key in ("product_url", "product_link", "url"):
+            val = entry.get(key)
+            if isinstance(val, str):
+                urls.add(val)
+                return
+
+    params: Dict[str, object] = {"fields": "url", "per_page": LIST_PAGE_SIZE}
+    if modified_since:
+        params["modified_since"] = modified_since
+
+    cursor: Optional[int] = 0
+    while cursor is not None:
+        params["cursor"] = cursor
+        try:
+            payload = client.get_json("list", params=params)
+        except requests.RequestException as exc:
+            logger.warning("Could not fetch existing items; duplicate check may be incomplete: %s", exc)
+            break
+        except ValueError:
+            logger.warning("Could not parse existing items (non-JSON response)")
+            break
+
+        entries = payload.get("items") if isinstance(payload, dict) else payload
+        if isinstance(entries, list):
+            for entry in entries:
+                if isinstance(entry, dict):
+                    collect(entry)
+
+        next_cursor = payload.get("next_cursor") if isinstance(payload, dict) else None
+        cursor = next_cursor if isinstance(next_cursor, int) and next_cursor > cursor else None
+
+    if urls:
+        logger.info("Loaded %d existing product URLs from WordPress", len(urls))
+    return urls
+
+
+def _image_file_part(item: Dict[str, object]):
+    image_name = str(item.get("image_name") or os.path.basename(str(item["image_path"])))
+    return image_name, str(item["image_path"]), guess_content_type(image_name, "image/webp")
+
+
+def post_to_wp(data: Dict[str, object], client: WordPressClient) -> Optional[int]:
+    """Post a single product dictionary to the WordPress add-item endpoint.
+
+    Items with a spooled ``image_path`` are sent as multipart with the image streamed
+    from disk. Every item carries its ``content_hash``, so a product WordPress already
+    has is updated in place when its title, price or image changed. Returns the
+    created (or existing) item's ID, or ``None`` on failure.
+    """
+
+    try:
+        if data.get("image_path"):
+            resp = client.post_multipart(
+                "add-item", fields=form_fields(_wire_item(data)), files={"image": _image_file_part(data)}
+            )
+        else:
+            resp = client.post("add-item", json=_wire_item(data), fields=ITEM_RESPONSE_FIELDS)
+        resp.raise_for_status()
+        payload = resp.json()
+        post_id = payload.get("id") if isinstance(payload, dict) else None
+        result = payload.get("result") if isinstance(payload, dict) else None
+        logger.info("Posted '%s' (ID: %s, %s)", data.get("title"), post_id, result or "created")
+        return post_id
+    except (requests.RequestException, OSError) as exc:
+        logger.error("Failed to post '%s': %s", data.get("title"), exc)
+    except ValueError:
+        logger.error("Unexpected response (not JSON) when posting '%s'", data.get("title"))
+    return None
+
+
+def post_items_to_wp(items: List[Dict[str, object]], client: WordPressClient) -> List[Optional[int]]:
+    """Send several product dictionaries to the WordPress batch endpoint in one request.
+
+    Returns the item IDs in input order (``None`` for items that failed). Items with a
+    spooled ``image_path`` are sent as one multipart request: the item list goes in the
+    ``items`` field as JSON and each image is streamed as file part ``image_<index>``.
+    Falls back to one add-item request per product when the batch endpoint is not available.
+    Lists longer than ``MAX_BATCH_ITEMS`` are sent as several requests, since WordPress
+    rejects larger batches as a whole.
+    """
+
+    if len(items) > MAX_BATCH_ITEMS:
+        return [
+            item_id
+            for start in range(0, len(items), MAX_BATCH_ITEMS)
+            for item_id in post_items_to_wp(items[start : start + MAX_BATCH_ITEMS], client)
+        ]
+
+    ids: List[Optional[int]] = [None] * len(items)
+
+    payload_items = [_wire_item(item) for item in items]
+    files = {f"image_{index}": _image_file_part(item) for index, item in enumerate(items) if item.get("image_path")}
+
+    try:
+        timeout = REQUEST_TIMEOUT * max(1, len(items))
+        if files:
+            resp = client.post_multipart(
+                "add-items", fields={"items": json.dumps(payload_items)}, files=files, timeout=timeout
+            )
+        else:
+            resp = client.post("add-items", json={"items": payload_items}, timeout=timeout)
+        if resp.status_code == 404:
+            logger.warning("Batch endpoint not available; posting items one by one")
+            return [post_to_wp(item, client) for item in items]
+        resp.raise_for_status()
+        payload = resp.json()
+    except (requests.RequestException, OSError) as exc:
+        logger.error("Failed to post batch of %d items: %s", len(items), exc)
+        return ids
+    except ValueError:
+        logger.error("Unexpected batch response (not JSON)")
+        return ids
+
+    results = payload.get("results") if isinstance(payload, dict) else None
+    for entry in results or []:
+        index = entry.get("index") if isinstance(entry, dict) else None
+        if not isinstance(index, int) or not 0 <= index < len(items):
+            continue
+        title = items[index].get("title")
+        if entry.get("error"):
+            logger.error("Failed to post '%s': %s", title, entry["error"])
+            continue
+        ids[index] = entry.get("id")
+        logger.info("Posted '%s' (ID: %s, %s)", title, ids[index], entry.get("result"))
+
+    return ids
+
+
+def fetch_image_statuses(post_ids: List[int], client: WordPressClient) -> Dict[int, str]:
+    """Return the WordPress image status (pending/done/failed/none) for each post ID.
+
+    Servers without the image-status endpoint sideload inside add-item, so every
+    post is reported as ``done`` there.
+    """
+
+    statuses: Dict[int, str] = {}
+    try:
+        for start in range(0, len(post_ids), IMAGE_STATUS_BATCH):
+            chunk = post_ids[start : start + IMAGE_STATUS_BATCH]
+            resp = client.get("image-status", params={"ids": ",".join(map(str, chunk))})
+            if resp.status_code == 404:
+                return {post_id: "done" for post_id in post_ids}
+            resp.raise_for_status()
+            payload = resp.json()
+            for entry in payload.get("items", []) if isinstance(payload, dict) else []:
+                if isinstance(entry, dict) and isinstance(entry.get("id"), int):
+                    statuses[entry["id"]] = str(entry.get("image_status"))
+    except requests.RequestException as exc:
+        logger.warning("Failed to fetch image status: %s", exc)
+    except ValueError:
+        logger.warning("Unexpected image status response (not JSON)")
+    return statuses
+
+
+def wait_for_images(
+    post_ids: List[int],
+    client: WordPressClient,
+    timeout: float = IMAGE_WAIT_DEFAULT,
+    interval: float = IMAGE_POLL_INTERVAL,
+) -> Dict[int, str]:
+    """Poll the image-status endpoint until no image is pending or ``timeout`` seconds pass."""
+
+    deadline = time.monotonic() + max(0.0, timeout)
+    statuses = fetch_image_statuses(post_ids, client)
+    while any(statuses.get(post_id) == "pending" for post_id in post_ids) and time.monotonic() < deadline:
+        time.sleep(interval)
+        statuses = fetch_image_statuses(post_ids, client)
+    return statuses
@@ -0,0 +1,155 @@
+"""
+Declarative descriptions of the shops the scrapers know about.
+
+Each ``SiteAdapter`` states what differs between shops: the listing URL, how
+pagination URLs are built, whether pages need a real browser (``render``), the
+politeness / batching defaults and where the product fields sit in the list-page
+markup (``selectors``). Every shop's list pages are parsed by the one shared parser
+in product_parser.py. The shop's scraper module (crawling, and the browser for
+kuma-doll) is only imported when the adapter is used, so HTTP-only runs do not need
+Playwright.
+
+Usage:
+    adapter = get_adapter("sweet-doll")
+    items, next_url = adapter.extract_page(page_url, html)
+"""
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Callable, Dict, Optional
+
+import product_parser
+from async_fetch import PageUrlBuilder, query_page_url, woocommerce_page_url
+from html_parser import compile as css
+from product_parser import PageExtraction, ProductSelectors, fallback_image_src, srcset_image_src
+
+RENDER_HTTP = "http"
+RENDER_PLAYWRIGHT = "playwright"
+
+PageExtractor = Callable[[str, str], PageExtraction]
+
+
+@dataclass(frozen=True)
+class SiteAdapter:
+    """How one shop is crawled and where its list pages keep the product fields."""
+
+    name: str
+    module: str
+    default_url: str
+    selectors: ProductSelectors
+    # "http": listing pages are plain HTML; "playwright": the module drives a browser.
+    render: str = RENDER_HTTP
+    pagination: Optional[PageUrlBuilder] = None
+    # Seconds between requests to the shop at full speed (its rate-limit ceiling).
+    delay: float = 0.0
+    batch_size: int = 10
+
+    def load(self) -> ModuleType:
+        return importlib.import_module(self.module)
+
+    def extract_page(self, page_url: str, html: str) -> PageExtraction:
+        """Parse one list page of this shop into its products and the next page URL."""
+
+        return product_parser.extract_page(page_url, html, self.selectors)
+
+    def parse_item(self, item_html: str, base_url: str) -> Optional[Dict[str, object]]:
+        return product_parser.parse_item(item_html, base_url, self.selectors)
+
+
+ADAPTERS: Dict[str, SiteAdapter] = {
+    adapter.name: adapter
+    for adapter in (
+        SiteAdapter(
+            name="yourdoll",
+            module="scrape_to_wp",
+            default_url="https://yourdoll.jp/product-category/all-sex-dolls/?orderby=date",
+            selectors=ProductSelectors(
+                item=css("div.product-grid-item"),
+                title=css("h3.wd-entities-title a"),
+                prices=(css("span.price"), css("span.woocommerce-Price-amount")),
+                image=css(".product-image-link img"),
+                image_noscript=css(".product-image-link noscript"),
+                links=tuple(
+                    css(selector)
+                    for selector in (
+                        "a.product-image-link", "h3.wd-entities-title a", "a.open-quick-view", "a.quick-view-button"
+                    )
+                ),
+                # Fallback: any anchor that links to a product path.
+                link_contains="/product/",
+                link_scan=css("a[href]"),
+                next=(css("a.next.page-numbers, a[rel='next']"),),
+                product_link_field=True,
+            ),
+            pagination=woocommerce_page_url,
+        ),
+        SiteAdapter(
+            name="sweet-doll",
+            module="scrape_sweet_to_wp",
+            default_url="https://sweet-doll.com/product-category/sedoll/",
+            selectors=ProductSelectors(
+                item=css("div.product-grid-item"),
+                title=css(".wd-entities-title a"),
+                prices=(css(".price .woocommerce-Price-amount"),),
+                image=css(".product-image-link img"),
+                # Prefer the product URL from the image link; fall back to the title link.
+                links=(css(".product-image-link"), css(".wd-entities-title a")),
+                next=(css("a.next.page-numbers"), css("a[rel~='next']")),
+                pick_image=srcset_image_src,
+                price_ceiling=None,
+            ),
+            pagination=woocommerce_page_url,
+        ),
+        SiteAdapter(
+            name="happiness-doll",
+            module="scrape_happiness_to_wp",
+            default_url="https://happiness-doll.com/products/list",
+            selectors=ProductSelectors(
+                item=css("li.ec-shelfGrid__item"),
+                title=css(".ec-shelfGrid__item-title"),
+                # Sale price first.
+                prices=tuple(css(selector) for selector in (".discount-price", ".price-flash", ".price02", ".price")),
+                image=css(".ec-shelfGrid__item-image img"),
+                links=(css("a[href]"),),
+                next=(
+                    css(
+                        "a[rel='next'], .ec-blockPagination__next a, li.ec-blockPagination__next a, "
+                        "a.ec-blockPagination__next"
+                    ),
+                ),
+            ),
+            pagination=query_page_url("pageno"),
+            delay=1.5,
+        ),
+        SiteAdapter(
+            name="kuma-doll",
+            module="scrape_kuma_to_wp",
+            default_url="https://www.kuma-doll.com/Products/list-r1.html",
+            selectors=ProductSelectors(
+                item=css(".product-item"),
+                item_block=css("div.product-item"),
+                title=css("a.title"),
+                prices=(css(".price span"),),
+                image=css("a.image img"),
+                links=(css("a.image"), css("a.title")),
+                next=(css("a.next, a.page-link[rel='next']"),),
+                pick_image=fallback_image_src,
+            ),
+            render=RENDER_PLAYWRIGHT,
+            pagination=query_page_url("page"),
+            delay=1.0,
+            batch_size=5,
+        ),
+    )
+}
+
+
+def get_adapter(name: str) -> SiteAdapter:
+    """Return the adapter registered as ``name``; raises ``KeyError`` for unknown shops."""
+
+    try:
+        return ADAPTERS[name]
+    except KeyError:
+        raise KeyError(f"Unknown shop {name!r}; known shops: {', '.join(ADAPTERS)}") from None
@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from async_fetch import FetchResult, crawl, query_page_url
+
+START = "https://shop.test/list"
+page_url = query_page_url("page")
+
+
+class FakeFetcher:
+    """Records the rounds of URLs ``crawl`` fetches; every page answers 200."""
+
+    def __init__(self, concurrency):
+        self.limiter = SimpleNamespace(concurrency=concurrency)
+        self.rounds = []
+
+    async def fetch_many(self, urls):
+        self.rounds.append(list(urls))
+        return [FetchResult(url=url, status=200) for url in urls]
+
+
+def _crawl(last_page, concurrency=4, max_pages=10, prefetch=True):
+    """Crawl a shop whose pages link to the next one up to ``last_page``."""
+
+    fetcher = FakeFetcher(concurrency)
+    handled = []
+
+    def handle_page(page):
+        handled.append(page.url)
+        number = len(handled)
+        return page_url(START, number + 1) if number < last_page else None
+
+    pages = asyncio.run(crawl(fetcher, START, handle_page, max_pages, page_url, prefetch=prefetch))
+    assert pages == len(handled)
+    return fetcher.rounds, handled
+
+
+def test_a_crawl_that_stops_on_the_first_page_fetches_nothing_ahead():
+    rounds, handled = _crawl(last_page=1)
+
+    assert rounds == [[START]]
+    assert handled == [START]
+
+
+def test_window_grows_with_each_confirmed_next_link():
+    rounds, handled = _crawl(last_page=10)
+
+    assert [len(window) for window in rounds] == [1, 2, 4, 3]
+    assert handled == [page_url(START, n) for n in range(1, 11)]
+
+
+@pytest.mark.parametrize("last_page", [2, 3, 5])
+def test_pages_fetched_ahead_stay_below_the_window(last_page):
+    rounds, handled = _crawl(last_page=last_page)
+
+    fetched = sum(len(window) for window in rounds)
+    assert len(handled) == last_page
+    assert fetched - last_page < 4
+
+
+def test_prefetch_can_be_turned_off():
+    rounds, _ = _crawl(last_page=5, prefetch=False)
+
+    assert rounds == [[page_url(START, n)] for n in range(1, 6)]
@@ -0,0 +1,75 @@
+import json
+
+from checkpoint import Checkpoint, open_checkpoint
+
+START = "https://shop.test/list"
+
+
+def _item(n):
+    return {"title": f"Doll {n}", "price": 1000 * n, "product_url": f"https://shop.test/product/{n}"}
+
+
+def test_resume_restores_progress(tmp_path):
+    path = tmp_path / "shop.json"
+    state = open_checkpoint(path, "shop", START)
+    state.add_pending(_item(1))
+    state.add_pending(_item(2))
+    state.mark_posted(_item(1), 11)
+    state.page_done("https://shop.test/list?page=2")
+
+    resumed = open_checkpoint(path, "shop", START, resume=True)
+
+    assert resumed.resumed
+    assert resumed.pages_done == 1
+    assert resumed.resume_url == "https://shop.test/list?page=2"
+    assert resumed.pending_items() == [_item(2)]
+    assert resumed.posted == {_item(1)["product_url"]: 11}
+
+
+def test_torn_checkpoint_starts_over(tmp_path):
+    path = tmp_path / "shop.json"
+    state = Checkpoint(path, "shop", START)
+    state.add_pending(_item(1))
+    state.page_done("https://shop.test/list?page=2")
+    saved = path.read_text(encoding="utf-8")
+    path.write_text(saved[: len(saved) // 2], encoding="utf-8")
+
+    resumed = open_checkpoint(path, "shop", START, resume=True)
+
+    assert not resumed.resumed
+    assert resumed.resume_url == START
+    assert resumed.pending_items() == []
+
+
+def test_malformed_pending_rows_are_skipped(tmp_path):
+    path = tmp_path / "shop.json"
+    Checkpoint(path, "shop", START).save()
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["pending"] = [_item(1), {"title": "no url"}, "garbage", None, _item(2)]
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    resumed = open_checkpoint(path, "shop", START, resume=True)
+
+    assert [item["product_url"] for item in resumed.pending_items()] == [_item(1)["product_url"], _item(2)["product_url"]]
+
+
+def test_checkpoint_for_another_start_url_is_ignored(tmp_path):
+    path = tmp_path / "shop.json"
+    Checkpoint(path, "shop", "https://shop.test/other").page_done(None)
+
+    assert not open_checkpoint(path, "shop", START, resume=True).resumed
+
+
+def test_finish_removes_completed_state(tmp_path):
+    path = tmp_path / "shop.json"
+    state = open_checkpoint(path, "shop", START)
+    state.add_pending(_item(1))
+    state.page_done(None)
+
+    state.finish()
+    assert path.exists()
+
+    state.mark_posted(_item(1), 11)
+    state.finish()
+    assert not path.exists()
+    assert not any(tmp_path.iterdir())
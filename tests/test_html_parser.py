@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+
+import html_parser
+from benchmarks.fixtures import FIXTURE_DIR
+from site_adapters import ADAPTERS
+
+LIST_PAGES = sorted(FIXTURE_DIR.glob("*/list-*.html"))
+
+
+@pytest.fixture
+def backend():
+    previous = html_parser.get_backend()
+
+    def use(name):
+        html_parser.set_backend(name)
+
+    yield use
+    html_parser.set_backend(previous)
+
+
+@pytest.mark.parametrize("page", LIST_PAGES, ids=lambda page: f"{page.parent.name}/{page.name}")
+def test_backends_extract_the_same_page(page: Path, backend):
+    adapter = ADAPTERS[page.parent.name]
+    html = page.read_text(encoding="utf-8")
+    page_url = f"http://fixtures.test/{page.parent.name}/{page.name}"
+
+    backend(html_parser.BACKEND_SOUP)
+    expected = adapter.extract_page(page_url, html)
+    backend(html_parser.BACKEND_LXML)
+    actual = adapter.extract_page(page_url, html)
+
+    assert expected[0], "fixture page should contain products"
+    assert actual == expected
+
+
+def test_fixture_pages_cover_every_shop():
+    assert {page.parent.name for page in LIST_PAGES} == set(ADAPTERS)
+
+
+@pytest.mark.parametrize(
+    "css, xpath",
+    [
+        ("a", "{axis}::a"),
+        ("A.Title", "{axis}::a[contains(concat(' ', normalize-space(@class), ' '), ' Title ')]"),
+        ("#main", "{axis}::*[@id='main']"),
+        ("a[href]", "{axis}::a[@href]"),
+        ("a[rel='next']", "{axis}::a[@rel='next']"),
+        ("a[rel~=next]", "{axis}::a[contains(concat(' ', normalize-space(@rel), ' '), ' next ')]"),
+        ("a[href^=\"/p\"]", "{axis}::a[starts-with(@href, '/p')]"),
+        ("a[href*='/product/']", "{axis}::a[contains(@href, '/product/')]"),
+        ("a[href*='']", "{axis}::a[false()]"),
+        ("div > a", "{axis}::a[parent::div]"),
+        ("ul li a", "{axis}::a[ancestor::li[ancestor::ul]]"),
+        ("a.next, a[rel='next']", "{axis}::a[contains(concat(' ', normalize-space(@class), ' '), ' next ')] | {axis}::a[@rel='next']"),
+    ],
+)
+def test_css_to_xpath(css, xpath):
+    assert html_parser.css_to_xpath(css) == xpath
+
+
+@pytest.mark.parametrize("css", ["a:first-child", "a + b", "a ~ b", "", "a,", "> a", "a[href|=en]"])
+def test_unsupported_selectors_are_rejected(css):
+    with pytest.raises(ValueError):
+        html_parser.css_to_xpath(css)
+
+
+SELECTOR_DOC = """
+<div id="main" class="list wide">
+  <ul><li class="item"><a class="title" href="/product/1" rel="bookmark next">One</a></li>
+      <li class="item"><span><a href="/other">Two</a></span></li></ul>
+  <a class="next page-numbers" href="?page=2">Next</a>
+</div>
+"""
+
+
+@pytest.mark.parametrize(
+    "css",
+    [
+        "a", ".item", "#main a", "div > a", "ul li a", "li > a", "a[rel~='next']", "a[href^='/product']",
+        "a[href*='page']", "li.item span a", "a.next.page-numbers, a.title", "div.wide > ul > li",
+    ],
+)
+def test_selectors_match_soupsieve(css, backend):
+    selector = html_parser.compile(css)
+
+    backend(html_parser.BACKEND_SOUP)
+    expected = [(tag.name, tag.get_text(strip=True)) for tag in selector.select(html_parser.parse(SELECTOR_DOC))]
+    backend(html_parser.BACKEND_LXML)
+    actual = [(tag.name, tag.get_text(strip=True)) for tag in selector.select(html_parser.parse(SELECTOR_DOC))]
+
+    assert actual == expected
@@ -0,0 +1,33 @@
+import pytest
+
+from image_utils import parse_srcset, srcset_candidates
+
+
+@pytest.mark.parametrize(
+    "value, entries",
+    [
+        ("a.jpg 300w, b.jpg 600w", [("a.jpg", 300.0, None), ("b.jpg", 600.0, None)]),
+        ("a.jpg 300w,b.jpg 600w,c.jpg 1200w", [("a.jpg", 300.0, None), ("b.jpg", 600.0, None), ("c.jpg", 1200.0, None)]),
+        ("a.jpg, b.jpg 2x", [("a.jpg", None, 1.0), ("b.jpg", None, 2.0)]),
+        ("data:image/gif;base64,R0lG 1x, b.jpg 2x", [("data:image/gif;base64,R0lG", None, 1.0), ("b.jpg", None, 2.0)]),
+        ("/img.php?w=300,h=200 300w", [("/img.php?w=300,h=200", 300.0, None)]),
+        ("a.jpg 1.5x,", [("a.jpg", None, 1.5)]),
+        ("a.jpg huge, b.jpg 600w", [("b.jpg", 600.0, None)]),
+        (" , ", []),
+        (None, []),
+    ],
+)
+def test_parse_srcset(value, entries):
+    assert parse_srcset(value) == entries
+
+
+def test_candidates_prefer_the_smallest_image_at_or_above_the_target():
+    srcset = "a.jpg 300w,b.jpg 600w,c.jpg 1200w,d.jpg 2400w"
+
+    assert srcset_candidates(srcset, target_width=800) == ["c.jpg", "d.jpg", "b.jpg", "a.jpg"]
+    assert srcset_candidates(srcset, target_width=3000) == ["d.jpg", "c.jpg", "b.jpg", "a.jpg"]
+
+
+def test_density_descriptors_use_the_declared_width():
+    assert srcset_candidates("a.jpg 1x, b.jpg 2x", target_width=800, base_width=500) == ["b.jpg", "a.jpg"]
+    assert srcset_candidates("a.jpg 1x, b.jpg 2x", target_width=800) == ["a.jpg", "b.jpg"]
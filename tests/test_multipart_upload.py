@@ -0,0 +1,58 @@
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import pytest
+
+import multipart_upload
+from multipart_upload import MultipartStream
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "doll.webp"
+    path.write_bytes(bytes(range(256)) * 1000 + b"tail")
+    return path
+
+
+def _stream(image):
+    return MultipartStream(
+        fields={"title": "ドール \"A\"\r\n", "price": 44650, "skip": None, "empty": ""},
+        files={"image": ('名前 "1".webp', str(image), None)},
+        boundary="b0undary",
+    )
+
+
+def test_length_matches_body(image):
+    stream = _stream(image)
+
+    assert len(stream) == len(stream.read())
+
+
+@pytest.mark.parametrize("size", [1, 7, 100, multipart_upload.CHUNK_SIZE - 1, multipart_upload.CHUNK_SIZE + 5])
+def test_chunked_reads_return_the_whole_body(image, size):
+    whole = _stream(image).read()
+    stream = _stream(image)
+
+    chunks = []
+    chunk = stream.read(size)
+    while chunk:
+        assert len(chunk) <= size
+        chunks.append(chunk)
+        chunk = stream.read(size)
+    stream.close()
+
+    assert b"".join(chunks) == whole
+
+
+def test_body_parses_as_multipart(image):
+    stream = _stream(image)
+    body = stream.read()
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {stream.content_type}\r\n\r\n".encode("ascii") + body
+    )
+
+    parts = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+    assert set(parts) == {"title", "price", "empty", "image"}
+    assert parts["price"].get_content() == "44650"
+    assert parts["image"].get_content_type() == "image/webp"
+    assert parts["image"].get_payload(decode=True) == image.read_bytes()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+
+import requests
+
+import pipeline
+from benchmarks.server import FixtureServer
+from checkpoint import open_checkpoint
+from ndjson_stream import EMIT_NDJSON, open_writer
+from pipeline import stream_and_post
+from site_adapters import ADAPTERS
+
+
+def _item(n, image_path=None):
+    item = {"title": f"Doll {n}", "price": 1000 * n, "product_url": f"https://shop.test/product/{n}"}
+    if image_path is not None:
+        item["image_path"] = str(image_path)
+        item["image_sha256"] = f"{n:064x}"
+    return item
+
+
+def test_streamed_products_are_posted_while_the_scraper_runs(monkeypatch, tmp_path):
+    posted = []
+    first_batch_posted = threading.Event()
+
+    def post_items(batch, wp):
+        posted.extend(item["product_url"] for item in batch)
+        first_batch_posted.set()
+        return [100 + int(item["product_url"].rsplit("/", 1)[1]) for item in batch]
+
+    monkeypatch.setattr(pipeline, "post_items_to_wp", post_items)
+
+    images = [tmp_path / f"{n}.webp" for n in range(1, 4)]
+    for image in images:
+        image.write_bytes(b"img")
+    checkpoint = open_checkpoint(tmp_path / "kuma.json", "kuma-doll", "https://shop.test/list")
+
+    async def scrape(sink):
+        for n, image in enumerate(images, start=1):
+            item = _item(n, image)
+            checkpoint.add_pending(item)
+            await sink(item)
+            if n == 1:
+                # The crawl only goes on once the first product has been posted.
+                assert await asyncio.get_running_loop().run_in_executor(None, first_batch_posted.wait, 5)
+        # Products the scraper returns (e.g. from a resumed checkpoint) are posted last.
+        return [_item(4)]
+
+    existing, seen, posted_images = set(), set(), {}
+    stats = stream_and_post(
+        scrape, "kuma-doll", wp=None, existing=existing, seen=seen, batch_size=2,
+        checkpoint=checkpoint, posted_images=posted_images,
+    )
+
+    urls = [_item(n)["product_url"] for n in range(1, 5)]
+    assert sorted(posted) == urls
+    assert (stats.scraped, stats.posted, stats.failed) == (4, 4, 0)
+    assert existing == seen == set(urls)
+    assert sorted(posted_images) == [101, 102, 103]
+    assert not any(image.exists() for image in images)
+    assert checkpoint.pending_items() == []
+    assert checkpoint.posted == {url: 100 + n for n, url in enumerate(urls, start=1)}
+
+
+def test_failed_products_keep_their_image_for_resume(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "post_items_to_wp", lambda batch, wp: [None] * len(batch))
+    image = tmp_path / "1.webp"
+    image.write_bytes(b"img")
+    checkpoint = open_checkpoint(tmp_path / "kuma.json", "kuma-doll", "https://shop.test/list")
+
+    async def scrape(sink):
+        item = _item(1, image)
+        checkpoint.add_pending(item)
+        await sink(item)
+        return []
+
+    stats = stream_and_post(scrape, "kuma-doll", wp=None, existing=set(), checkpoint=checkpoint)
+
+    assert (stats.posted, stats.failed) == (0, 1)
+    assert image.exists()
+    assert [item["product_url"] for item in checkpoint.pending_items()] == [_item(1)["product_url"]]
+
+
+def test_already_removed_images_do_not_stop_the_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "post_items_to_wp", lambda batch, wp: [7] * len(batch))
+
+    async def scrape(sink):
+        await sink(_item(1, tmp_path / "gone.webp"))
+        await sink(_item(2))
+        return []
+
+    stats = stream_and_post(scrape, "kuma-doll", wp=None, existing=set())
+
+    assert (stats.posted, stats.failed) == (2, 0)
+
+
+def test_limit_stops_the_crawl_on_the_page_that_reached_it(monkeypatch):
+    monkeypatch.setattr(pipeline, "post_items_to_wp", lambda batch, wp: list(range(len(batch))))
+    adapter = ADAPTERS["yourdoll"]
+
+    with FixtureServer() as server, requests.Session() as session:
+        first_page, _ = adapter.extract_page(server.url_for("yourdoll"), requests.get(server.url_for("yourdoll")).text)
+        server.reset_counts()
+        stats = pipeline.scrape_and_post(
+            server.url_for("yourdoll"), adapter.extract_page, shop="yourdoll", wp=None, session=session,
+            existing=set(), max_pages=3, page_url_for=adapter.pagination, limit=len(first_page),
+        )
+        pages_served = server.pages_served
+
+    assert stats.posted == len(first_page)
+    assert pages_served == 1
+
+
+def test_every_emitted_product_is_counted(tmp_path):
+    adapter = ADAPTERS["yourdoll"]
+    output = tmp_path / "items.ndjson"
+    emit = open_writer(EMIT_NDJSON, str(output))
+
+    with FixtureServer() as server, requests.Session() as session:
+        stats = pipeline.scrape_and_post(
+            server.url_for("yourdoll"), adapter.extract_page, shop="yourdoll", wp=None, session=session,
+            existing=set(), max_pages=2, page_url_for=adapter.pagination, batch_size=2, post_workers=4, emit=emit,
+        )
+    emit.close()
+
+    assert stats.emitted == stats.scraped == len(output.read_text().splitlines())
@@ -0,0 +1,108 @@
+from array import array
+
+import pytest
+
+from price_history import COLUMNS, PriceHistory, analyze, load_history, product_key
+
+np = pytest.importorskip("numpy")
+
+DAY = 86400
+T0 = 1_717_200_000  # 2024-06-01
+
+
+def _columns(rows):
+    """Columns for ``analyze`` from ``(key, ts, price)`` rows of one shop."""
+
+    key, ts, price = zip(*rows)
+    return {
+        "key": np.array(key, dtype=np.int64),
+        "ts": np.array(ts, dtype=np.int64),
+        "price": np.array(price, dtype=np.int32),
+        "shop": np.zeros(len(rows), dtype=np.int32),
+    }
+
+
+def _naive_new_lows(rows):
+    lows = set()
+    for key in {row[0] for row in rows}:
+        history = sorted((ts, price) for k, ts, price in rows if k == key)
+        for index in range(1, len(history)):
+            if history[index][1] < min(price for _, price in history[:index]):
+                lows.add((key, history[index][0]))
+    return lows
+
+
+def test_running_min_does_not_leak_across_products():
+    rows = [
+        # Product 1 is cheap; product 2 must be compared only with its own earlier prices.
+        (1, T0, 10_000), (1, T0 + DAY, 12_000),
+        (2, T0, 90_000), (2, T0 + DAY, 80_000), (2, T0 + 2 * DAY, 85_000), (2, T0 + 3 * DAY, 70_000),
+        (3, T0 + DAY, 50_000),
+    ]
+    lows = analyze(_columns(rows))["new_lows"]
+
+    assert list(zip(lows["key"], lows["ts"])) == [(2, T0 + DAY), (2, T0 + 3 * DAY)]
+    assert list(lows["previous_low"]) == [90_000, 80_000]
+
+
+def test_grouped_running_min_matches_per_product_scan():
+    rng = np.random.default_rng(7)
+    keys = rng.integers(-(2**62), 2**62, size=40)
+    rows = [
+        (int(key), T0 + int(day) * DAY, int(rng.integers(1, 400_000)))
+        for key in keys
+        for day in rng.choice(60, size=int(rng.integers(1, 12)), replace=False)
+    ]
+    lows = analyze(_columns(rows))["new_lows"]
+
+    assert set(zip(lows["key"].tolist(), lows["ts"].tolist())) == _naive_new_lows(rows)
+
+
+def test_drops_respect_since():
+    rows = [(5, T0, 300), (5, T0 + DAY, 200), (5, T0 + 2 * DAY, 250), (5, T0 + 3 * DAY, 100)]
+    drops = analyze(_columns(rows), since=T0 + 2 * DAY)["drops"]
+
+    assert list(drops["ts"]) == [T0 + 3 * DAY]
+    assert list(drops["previous"]) == [250]
+
+
+def test_torn_rows_are_dropped_on_load(tmp_path):
+    with PriceHistory(tmp_path) as history:
+        history.append("https://shop.test/product/a", "shop", 1000, ts=T0)
+        history.append("https://shop.test/product/b", "shop", 2000, ts=T0 + 60)
+
+    # A run that died between column writes: the key and ts of a third row made it to disk.
+    partition = next((tmp_path / "shop").glob("*-*"))
+    for name, code in COLUMNS[:2]:
+        with open(partition / f"{name}.bin", "ab") as handle:
+            array(code, [product_key("https://shop.test/product/c")]).tofile(handle)
+
+    columns, shops, products = load_history(tmp_path)
+
+    assert shops == ["shop"]
+    assert {name: len(column) for name, column in columns.items()} == {"key": 2, "ts": 2, "price": 2, "shop": 2}
+    assert list(columns["price"]) == [1000, 2000]
+    assert products[int(columns["key"][1])] == "https://shop.test/product/b"
+
+
+def test_rows_stay_aligned_when_appending_after_a_tear(tmp_path):
+    with PriceHistory(tmp_path) as history:
+        history.append("https://shop.test/product/a", "shop", 1000, ts=T0)
+
+    partition = next((tmp_path / "shop").glob("*-*"))
+    torn_key = product_key("https://shop.test/product/torn")
+    with open(partition / "key.bin", "ab") as handle:
+        array("q", [torn_key]).tofile(handle)
+    with open(partition / "ts.bin", "ab") as handle:
+        # Only half of the timestamp made it to disk.
+        handle.write(b"\x01\x02\x03\x04")
+
+    with PriceHistory(tmp_path) as history:
+        history.append("https://shop.test/product/b", "shop", 2000, ts=T0 + 60)
+
+    columns, _, products = load_history(tmp_path)
+
+    assert [products[int(key)] for key in columns["key"]] == ["https://shop.test/product/a", "https://shop.test/product/b"]
+    assert list(columns["ts"]) == [T0, T0 + 60]
+    assert list(columns["price"]) == [1000, 2000]
+    assert {path.stat().st_size for path in partition.glob("*.bin")} == {16, 8}
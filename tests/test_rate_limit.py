@@ -0,0 +1,119 @@
+import io
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+import rate_limit
+from rate_limit import DomainRateLimiter, RateLimitedAdapter, parse_retry_after
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze ``time.monotonic`` in rate_limit; advance it with ``clock.now += seconds``."""
+
+    class Clock:
+        # New buckets are stamped with the real clock; start well after it.
+        now = rate_limit.time.monotonic() + 1000.0
+
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: Clock.now)
+    return Clock
+
+
+def test_burst_is_free_then_requests_queue_at_rate(clock):
+    limiter = DomainRateLimiter(rate=2.0, burst=3)
+
+    assert [limiter.reserve("shop.test") for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Each further reservation queues behind the previous one.
+    assert [limiter.reserve("shop.test") for _ in range(3)] == pytest.approx([0.5, 1.0, 1.5])
+
+
+def test_tokens_refill_with_time_up_to_capacity(clock):
+    limiter = DomainRateLimiter(rate=2.0, burst=2)
+    limiter.reserve("shop.test")
+    limiter.reserve("shop.test")
+
+    clock.now += 0.5
+    assert limiter.reserve("shop.test") == 0.0
+    assert limiter.reserve("shop.test") == pytest.approx(0.5)
+
+    clock.now += 60
+    assert [limiter.reserve("shop.test") for _ in range(3)] == pytest.approx([0.0, 0.0, 0.5])
+
+
+def test_hosts_have_separate_buckets(clock):
+    limiter = DomainRateLimiter(rate=1.0, burst=1)
+    limiter.set_rate("https://slow.test/page", 0.5, burst=1)
+
+    assert limiter.reserve("https://slow.test/a") == 0.0
+    assert limiter.reserve("https://slow.test/b") == pytest.approx(2.0)
+    assert limiter.reserve("https://fast.test/a") == 0.0
+
+
+def test_throttling_halves_rate_and_pauses_host(clock):
+    limiter = DomainRateLimiter(rate=4.0, burst=4)
+
+    assert limiter.observe("shop.test", 429, "7") == 7.0
+    assert limiter.current_rate("shop.test") == 2.0
+    assert limiter.reserve("shop.test") == pytest.approx(7.0)
+
+    for _ in range(rate_limit.RECOVER_AFTER):
+        assert limiter.observe("shop.test", 200) is None
+    assert limiter.current_rate("shop.test") == 3.0
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [(None, None), ("", None), ("12", 12.0), ("-3", 0.0), ("100000", rate_limit.MAX_RETRY_AFTER), ("soon", None)],
+)
+def test_parse_retry_after(value, seconds):
+    assert parse_retry_after(value) == seconds
+
+
+def _send(monkeypatch, method, *outcomes):
+    """Send ``method`` through a RateLimitedAdapter whose transport answers with ``outcomes`` in turn.
+
+    An outcome is ``(status, headers)`` or an exception to raise; the last one repeats.
+    Returns how many times the request reached the transport.
+    """
+
+    calls = []
+
+    def transport(adapter, request, **kwargs):
+        calls.append(request)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response.raw = io.BytesIO(b"")
+        response.request = request
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", transport)
+    limiter = DomainRateLimiter(rate=1000.0, burst=100, max_retries=2, backoff_base=0.0)
+    request = requests.Request(method, "http://wp.test/wp-json/lovedoll/v1/add-item", data={"a": "1"}).prepare()
+    try:
+        RateLimitedAdapter(limiter).send(request)
+    except (requests.ConnectionError, requests.Timeout):
+        pass
+    return len(calls)
+
+
+def test_get_is_retried_on_server_errors(monkeypatch):
+    assert _send(monkeypatch, "GET", (502, {})) == 3
+
+
+def test_post_is_not_replayed_after_the_server_may_have_acted(monkeypatch):
+    assert _send(monkeypatch, "POST", (502, {})) == 1
+    assert _send(monkeypatch, "POST", (503, {})) == 1
+    assert _send(monkeypatch, "POST", requests.ReadTimeout("read timed out")) == 1
+
+
+def test_post_is_retried_when_refused_or_never_sent(monkeypatch):
+    assert _send(monkeypatch, "POST", (503, {"Retry-After": "0"}), (201, {})) == 2
+    refused = requests.ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "refused")))
+    assert _send(monkeypatch, "POST", refused) == 3
@@ -0,0 +1,47 @@
+import json
+
+import requests
+
+from scraper_common import MAX_BATCH_ITEMS, post_items_to_wp
+
+
+class FakeWordPress:
+    """Answers add-items like lovedoll-products-api.php, including its batch size limit."""
+
+    def __init__(self):
+        self.batches = []
+
+    def post(self, route, **kwargs):
+        assert route == "add-items"
+        items = kwargs["json"]["items"]
+        self.batches.append(len(items))
+        response = requests.Response()
+        if len(items) > MAX_BATCH_ITEMS:
+            response.status_code = 400
+            response._content = b'{"code": "too_many_items"}'
+            return response
+        response.status_code = 200
+        response._content = json.dumps(
+            {"results": [{"index": index, "id": int(item["product_url"].rsplit("/", 1)[1])} for index, item in enumerate(items)]}
+        ).encode("utf-8")
+        return response
+
+
+def _items(count):
+    return [{"title": f"Doll {n}", "price": 1000, "product_url": f"https://shop.test/product/{n}"} for n in range(count)]
+
+
+def test_large_batches_are_split_to_the_server_limit():
+    wp = FakeWordPress()
+
+    ids = post_items_to_wp(_items(2 * MAX_BATCH_ITEMS + 7), wp)
+
+    assert wp.batches == [MAX_BATCH_ITEMS, MAX_BATCH_ITEMS, 7]
+    assert ids == list(range(2 * MAX_BATCH_ITEMS + 7))
+
+
+def test_batches_within_the_limit_are_sent_once():
+    wp = FakeWordPress()
+
+    assert post_items_to_wp(_items(3), wp) == [0, 1, 2]
+    assert wp.batches == [3]
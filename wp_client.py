@@ -0,0 +1,201 @@
+"""
+Pooled client for the site's own WordPress REST API (``lovedoll/v1`` and ``wp/v2``).
+
+Every job that talks to WordPress (the scrapers, the blog publisher, the ranking
+fetchers) goes through ``WordPressClient`` instead of calling ``requests`` directly:
+
+    * one keep-alive connection pool per process (no new TLS handshake per call);
+    * gzip-compressed responses and ``_fields`` projection, so only the needed
+      keys travel over the wire;
+    * retries with backoff on 429 / 5xx / connection errors via rate_limit.py;
+    * per-route timing (calls, errors, seconds, response bytes) for the job log.
+
+Usage:
+    client = WordPressClient("https://freya-era.com")
+    rankings = client.get_json("website_ranking", namespace=WP_NAMESPACE, fields=["id", "title"])
+    client.log_timings()
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional
+
+import requests
+
+from multipart_upload import FilePart, post_multipart
+from rate_limit import DomainRateLimiter, rate_limited_session
+
+logger = logging.getLogger(__name__)
+
+WP_BASE_DEFAULT = "https://freya-era.com"
+REQUEST_TIMEOUT = 15
+LOVEDOLL_NAMESPACE = "lovedoll/v1"
+WP_NAMESPACE = "wp/v2"
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+@dataclass
+class CallTiming:
+    """Aggregated timing for one ``METHOD namespace/route``."""
+
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+
+def _wire_bytes(resp: requests.Response) -> int:
+    """Bytes received for the body before decompression (falls back to the decoded size)."""
+
+    try:
+        received = resp.raw.tell() if resp.raw is not None else 0
+    except (AttributeError, OSError, ValueError):
+        received = 0
+    return received or len(resp.content or b"")
+
+
+class WordPressClient:
+    """Thread-safe wrapper around one pooled, rate-limited ``requests.Session``."""
+
+    def __init__(
+        self,
+        wp_base: str = WP_BASE_DEFAULT,
+        session: Optional[requests.Session] = None,
+        limiter: Optional[DomainRateLimiter] = None,
+        timeout: float = REQUEST_TIMEOUT,
+        pool_maxsize: int = 4,
+    ):
+        """Use ``session`` when the caller already has a pool (it is then left open);
+        otherwise a rate-limited session of ``pool_maxsize`` connections is created.
+        """
+
+        self.wp_base = wp_base.rstrip("/")
+        self.timeout = timeout
+        self._owns_session = session is None
+        self.session = session or rate_limited_session(limiter, pool_connections=1, pool_maxsize=pool_maxsize)
+        self._timings: Dict[str, CallTiming] = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, route: str, namespace: str = LOVEDOLL_NAMESPACE) -> str:
+        return f"{self.wp_base}/wp-json/{namespace}/{route.lstrip('/')}"
+
+    def _record(self, key: str, started: float, resp: Optional[requests.Response]) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            timing = self._timings.setdefault(key, CallTiming())
+            timing.calls += 1
+            timing.seconds += elapsed
+            if resp is None or resp.status_code >= 400:
+                timing.errors += 1
+            if resp is not None:
+                timing.bytes += _wire_bytes(resp)
+        logger.debug("%s took %.3fs (%s)", key, elapsed, resp.status_code if resp is not None else "error")
+
+    def request(
+        self,
+        method: str,
+        route: str,
+        namespace: str = LOVEDOLL_NAMESPACE,
+        params: Optional[Mapping[str, object]] = None,
+        fields: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Send a request to ``/wp-json/<namespace>/<route>`` and return the response.
+
+        ``fields`` is sent as WordPress' ``_fields`` projection. Status codes are not
+        checked here; transport errors are raised after the session's retries.
+        """
+
+        params = dict(params or {})
+        if fields:
+            params["_fields"] = ",".join(fields)
+        request_headers = dict(DEFAULT_HEADERS)
+        request_headers.update(headers or {})
+
+        key = f"{method.upper()} {namespace}/{route.lstrip('/')}"
+        started = time.perf_counter()
+        resp: Optional[requests.Response] = None
+        try:
+            resp = self.session.request(
+                method,
+                self.endpoint(route, namespace),
+                params=params or None,
+                headers=request_headers,
+                timeout=timeout or self.timeout,
+                **kwargs,
+            )
+            return resp
+        finally:
+            self._record(key, started, resp)
+
+    def get(self, route: str, **kwargs) -> requests.Response:
+        return self.request("GET", route, **kwargs)
+
+    def post(self, route: str, **kwargs) -> requests.Response:
+        return self.request("POST", route, **kwargs)
+
+    def get_json(self, route: str, **kwargs) -> object:
+        """GET ``route`` and return its decoded JSON; raises for HTTP errors and non-JSON bodies."""
+
+        resp = self.get(route, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def post_multipart(
+        self,
+        route: str,
+        fields: Mapping[str, object],
+        files: Mapping[str, FilePart],
+        namespace: str = LOVEDOLL_NAMESPACE,
+        timeout: Optional[float] = None,
+    ) -> requests.Response:
+        """POST a streamed multipart body (see multipart_upload.py); streamed bodies are not retried."""
+
+        key = f"POST {namespace}/{route.lstrip('/')}"
+        started = time.perf_counter()
+        resp: Optional[requests.Response] = None
+        try:
+            resp = post_multipart(
+                self.session, self.endpoint(route, namespace), fields=fields, files=files, timeout=timeout or self.timeout
+            )
+            return resp
+        finally:
+            self._record(key, started, resp)
+
+    @property
+    def timings(self) -> Dict[str, CallTiming]:
+        with self._lock:
+            return {key: CallTiming(**vars(timing)) for key, timing in self._timings.items()}
+
+    def log_timings(self, level: int = logging.INFO) -> None:
+        """Log one line per route: calls, errors, total / average seconds and response bytes."""
+
+        for key, timing in sorted(self.timings.items()):
+            logger.log(
+                level,
+                "WordPress %s: %d calls (%d errors), %.2fs total, %.3fs avg, %d bytes",
+                key,
+                timing.calls,
+                timing.errors,
+                timing.seconds,
+                timing.seconds / timing.calls if timing.calls else 0.0,
+                timing.bytes,
+            )
+
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> "WordPressClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()